@@ -0,0 +1,354 @@
+import copy
+import pandas as pd
+import numpy as np
+from schema import parse_session, parse_day, normalize_sessions, day_to_iso
+from forecast import TrailingForecast
+from patterns import SLOTS, week_spans, spread, week_sums, heatmap_table
+
+OPEN_STATUSES = ("Todo", "In Progress")
+
+def _num(x):
+    try:
+        v = float(x)
+    except (TypeError, ValueError):
+        return None
+    return None if np.isnan(v) else v
+
+def _key(x):
+    return None if x is None or (isinstance(x, float) and np.isnan(x)) else x
+
+class AggregateStore:
+    """Running sums behind the dashboard analytics.
+
+    Keeps per-hour mood/energy/minute sums and counts, the same per
+    hour-of-week slot (minutes split across the hours a session spans, see
+    :mod:`patterns`), per-subject minutes, per-subject open-task counts and
+    a daily rollup (minutes, sessions and mood/energy sums per day) with a
+    :class:`forecast.TrailingForecast` over it. Each row's contribution can
+    be recovered by id, so adding, deleting or re-statusing a row is O(1).
+    ``from_frames`` is the full rebuild path; it works on the typed session
+    columns from :func:`schema.normalize_sessions` and can take the daily
+    rollup from a saved ``rollup_table`` instead of regrouping the sessions.
+    """
+    def __init__(self, track_rows=True, window=28):
+        self.track_rows = track_rows
+        self.hour_n = np.zeros(24, dtype=np.int64)
+        self.hour_mood = np.zeros(24)
+        self.hour_energy = np.zeros(24)
+        self.hour_min = np.zeros(24)
+        self.week_n = np.zeros(SLOTS, dtype=np.int64)
+        self.week_min = np.zeros(SLOTS)
+        self.week_mood = np.zeros(SLOTS)
+        self.week_energy = np.zeros(SLOTS)
+        self.subject_min = {}
+        self.subject_sessions = {}
+        self.subject_open = {}
+        self.day_min = {}
+        self.day_n = {}
+        self.day_mood = {}
+        self.day_energy = {}
+        self.forecast = TrailingForecast(window)
+        self.open_tasks = 0
+        self.remaining_min = 0.0
+        # Σ session ids, saved with the rollup to tell whether it still matches the sessions
+        self.session_id_sum = 0
+        # Bulk-loaded sessions stay as typed array blocks; single adds are kept by id
+        self._blocks = []
+        self._block_pos = {}
+        self._indexed_blocks = 0
+        self._sessions = {}
+        self._tasks = {}
+
+    # --- Sessions ---
+    def add_session(self, row: dict):
+        """Fold in one raw session row (raises ValueError if it does not parse)."""
+        t = parse_session(row)
+        rid = int(row["id"])
+        if rid in self._sessions:
+            self.remove_session(rid)
+        t0, span = week_spans(t["day"], t["start_min"], t["end_min"], t["duration_min"])
+        c = (t["start_min"] // 60, t["mood"], t["energy"], t["duration_min"], t["subject"], t["day"], int(t0), int(span))
+        self._sessions[rid] = c
+        self._apply_session(c, 1)
+        self.session_id_sum += rid
+
+    def remove_session(self, row_id: int):
+        c = self._sessions.pop(int(row_id), None)
+        if c is None:
+            c = self._pop_base(int(row_id))
+        if c is not None:
+            self._apply_session(c, -1)
+            self.session_id_sum -= int(row_id)
+
+    def _pop_base(self, row_id: int):
+        # id -> (block, row) is built lazily, only once something is removed
+        while self._indexed_blocks < len(self._blocks):
+            k = self._indexed_blocks
+            ids = self._blocks[k]["id"].tolist()
+            self._block_pos.update(zip(ids, zip([k] * len(ids), range(len(ids)))))
+            self._indexed_blocks += 1
+        pos = self._block_pos.pop(row_id, None)
+        if pos is None:
+            return None
+        b, i = self._blocks[pos[0]], pos[1]
+        code = b["code"][i]
+        subject = b["cats"][code] if code >= 0 else None
+        return (int(b["hour"][i]), int(b["mood"][i]), int(b["energy"][i]), int(b["minutes"][i]),
+                subject, int(b["day"][i]), int(b["t0"][i]), int(b["span"][i]))
+
+    def _apply_session(self, c, sign):
+        hour, mood, energy, minutes, subject, day, t0, span = c
+        self.hour_n[hour] += sign
+        self.hour_mood[hour] += sign * mood
+        self.hour_energy[hour] += sign * energy
+        self.hour_min[hour] += sign * minutes
+        self.week_n[t0 // 60] += sign
+        slot, spent, _ = spread([t0], [span])
+        np.add.at(self.week_min, slot, sign * spent)
+        np.add.at(self.week_mood, slot, sign * mood * spent)
+        np.add.at(self.week_energy, slot, sign * energy * spent)
+        if subject is not None:
+            _bump(self.subject_sessions, subject, sign, self.subject_min, sign * minutes)
+        old = self.day_min.get(day, 0)
+        _bump(self.day_n, day, sign, self.day_min, sign * minutes,
+              self.day_mood, sign * mood, self.day_energy, sign * energy)
+        self.forecast.change(self.day_min, day, old, self.day_min.get(day, 0))
+
+    # --- Tasks ---
+    def add_task(self, row: dict):
+        rid = int(row["id"])
+        if rid in self._tasks:
+            self.remove_task(rid)
+        c = (_key(row.get("subject")), _num(row.get("estimated_min")) or 0.0, row.get("status") in OPEN_STATUSES)
+        self._tasks[rid] = c
+        self._apply_task(c, 1)
+
+    def remove_task(self, row_id: int):
+        c = self._tasks.pop(int(row_id), None)
+        if c is not None:
+            self._apply_task(c, -1)
+
+    def update_task(self, row_id: int, **fields):
+        c = self._tasks.get(int(row_id))
+        if c is None or "status" not in fields:
+            return
+        self._apply_task(c, -1)
+        c = (c[0], c[1], fields["status"] in OPEN_STATUSES)
+        self._tasks[int(row_id)] = c
+        self._apply_task(c, 1)
+
+    def _apply_task(self, c, sign):
+        subject, est, is_open = c
+        if not is_open:
+            return
+        self.open_tasks += sign
+        self.remaining_min += sign * est
+        if subject is not None:
+            self.subject_open[subject] = self.subject_open.get(subject, 0) + sign
+            if self.subject_open[subject] == 0:
+                del self.subject_open[subject]
+
+    # --- Readers ---
+    def hour_table(self) -> pd.DataFrame:
+        hours = np.flatnonzero(self.hour_n > 0)
+        n = self.hour_n[hours]
+        return pd.DataFrame({
+            "hour": hours,
+            "avg_mood": self.hour_mood[hours] / n,
+            "avg_energy": self.hour_energy[hours] / n,
+            "total_min": self.hour_min[hours],
+        })
+
+    def heatmap_table(self) -> pd.DataFrame:
+        """Hour-of-week grid, see :func:`patterns.heatmap_table`."""
+        return heatmap_table(self.week_n, self.week_min, self.week_mood, self.week_energy)
+
+    def subject_table(self) -> pd.DataFrame:
+        subjects = list(self.subject_min) + [s for s in self.subject_open if s not in self.subject_min]
+        out = pd.DataFrame({
+            "subject": subjects,
+            "minutes_spent": [float(self.subject_min.get(s, 0)) for s in subjects],
+            "open_tasks": [float(self.subject_open.get(s, 0)) for s in subjects],
+        })
+        return out.sort_values("minutes_spent", ascending=False)
+
+    def daily_minutes(self) -> np.ndarray:
+        """Minutes per study day, in date order."""
+        return np.array([self.day_min[d] for d in sorted(self.day_min)], dtype=float)
+
+    def rollup_table(self) -> pd.DataFrame:
+        """One row per study day: ISO date, minutes, sessions and mood/energy sums."""
+        days = sorted(self.day_min)
+        return pd.DataFrame({
+            "date": [day_to_iso(d) for d in days],
+            "minutes": [float(self.day_min[d]) for d in days],
+            "sessions": [int(self.day_n[d]) for d in days],
+            "mood_sum": [float(self.day_mood[d]) for d in days],
+            "energy_sum": [float(self.day_energy[d]) for d in days],
+        }, columns=["date", "minutes", "sessions", "mood_sum", "energy_sum"])
+
+    def capacity(self, days: int) -> float:
+        """Average minutes per calendar day over the ``days`` days up to the latest study day."""
+        end = self.forecast.end
+        if end is None or days <= 0:
+            return 0.0
+        total = sum(self.day_min.get(d, 0) for d in range(end - days + 1, end + 1))
+        return float(total) / days
+
+    def freeze(self) -> "AggregateStore":
+        """Copy of the totals without per-row bookkeeping, safe to read while this store keeps changing."""
+        f = AggregateStore(window=self.forecast.window)
+        for name in ("hour_n", "hour_mood", "hour_energy", "hour_min", "week_n", "week_min", "week_mood", "week_energy"):
+            setattr(f, name, getattr(self, name).copy())
+        for name in ("subject_min", "subject_sessions", "subject_open", "day_min", "day_n", "day_mood", "day_energy"):
+            setattr(f, name, dict(getattr(self, name)))
+        f.forecast = copy.copy(self.forecast)
+        f.open_tasks = self.open_tasks
+        f.remaining_min = self.remaining_min
+        f.session_id_sum = self.session_id_sum
+        return f
+
+    def merge(self, other: "AggregateStore"):
+        """Add another store's totals into this one, e.g. partials from chunks or profiles.
+
+        Per-row bookkeeping is not carried over, so merged rows cannot be removed.
+        """
+        self.hour_n += other.hour_n
+        self.hour_mood += other.hour_mood
+        self.hour_energy += other.hour_energy
+        self.hour_min += other.hour_min
+        self.week_n += other.week_n
+        self.week_min += other.week_min
+        self.week_mood += other.week_mood
+        self.week_energy += other.week_energy
+        for name, n in other.subject_sessions.items():
+            _bump(self.subject_sessions, name, n, self.subject_min, other.subject_min[name])
+        for day, n in other.day_n.items():
+            _bump(self.day_n, day, n, self.day_min, other.day_min[day],
+                  self.day_mood, other.day_mood[day], self.day_energy, other.day_energy[day])
+        self.forecast.rebuild(self.day_min)
+        for name, n in other.subject_open.items():
+            self.subject_open[name] = self.subject_open.get(name, 0) + n
+        self.open_tasks += other.open_tasks
+        self.remaining_min += other.remaining_min
+        self.session_id_sum += other.session_id_sum
+        return self
+
+    # --- Rebuild ---
+    @classmethod
+    def from_frames(cls, tasks: pd.DataFrame = None, sessions: pd.DataFrame = None, window=28,
+                    rollup=None) -> "AggregateStore":
+        """Rebuild from a tasks frame and a raw or already-typed sessions frame.
+
+        ``rollup`` is a saved ``(session_id_sum, rollup_table())`` pair; it is
+        used for the daily rollup if it still matches ``sessions``.
+        """
+        agg = cls(window=window)
+        if sessions is not None and not sessions.empty:
+            if "start_min" not in sessions.columns:
+                sessions, _ = normalize_sessions(sessions)
+            agg.add_sessions_typed(sessions, rollup)
+        if tasks is not None and not tasks.empty:
+            agg.add_tasks(tasks)
+        return agg
+
+    def add_sessions_typed(self, s: pd.DataFrame, rollup=None):
+        """Fold in a block of typed sessions (see ``schema.normalize_sessions``) with vectorized ops.
+
+        ``rollup`` is as in ``from_frames``; it only applies to an empty store.
+        """
+        if s.empty:
+            return
+        hour = s["start_min"].to_numpy() // 60
+        mood = s["mood"].to_numpy()
+        energy = s["energy"].to_numpy()
+        minutes = s["duration_min"].to_numpy()
+        day = s["day"].to_numpy()
+        self.hour_n += np.bincount(hour, minlength=24)
+        self.hour_mood += np.bincount(hour, weights=mood, minlength=24)
+        self.hour_energy += np.bincount(hour, weights=energy, minlength=24)
+        self.hour_min += np.bincount(hour, weights=minutes, minlength=24)
+        t0, span = week_spans(day, s["start_min"].to_numpy(), s["end_min"].to_numpy(), minutes)
+        for total, part in zip((self.week_n, self.week_min, self.week_mood, self.week_energy),
+                               week_sums(t0, span, mood, energy)):
+            total += part
+
+        cats = s["subject"].cat.categories
+        codes = s["subject"].cat.codes.to_numpy()
+        known = codes >= 0
+        counts = np.bincount(codes[known], minlength=len(cats))
+        totals = np.bincount(codes[known], weights=minutes[known], minlength=len(cats))
+        for name, n, total in zip(cats, counts.tolist(), totals.tolist()):
+            if n:
+                _bump(self.subject_sessions, name, n, self.subject_min, total)
+
+        ids = s["id"].to_numpy()
+        if rollup is None or self.day_n or not self._load_rollup(ids, day, minutes, mood, energy, *rollup):
+            days, inv = np.unique(day, return_inverse=True)
+            per_day = zip(days.tolist(), np.bincount(inv).tolist(), np.bincount(inv, weights=minutes).tolist(),
+                          np.bincount(inv, weights=mood).tolist(), np.bincount(inv, weights=energy).tolist())
+            for d, n, total, m, e in per_day:
+                _bump(self.day_n, d, n, self.day_min, total, self.day_mood, m, self.day_energy, e)
+        self.session_id_sum += int(ids.sum())
+        self.forecast.rebuild(self.day_min)
+
+        if not self.track_rows:
+            return
+        self._blocks.append({"id": ids, "hour": hour, "mood": mood, "energy": energy,
+                             "minutes": minutes, "code": codes, "cats": list(cats), "day": day,
+                             "t0": t0.astype(np.int32), "span": span.astype(np.int16)})
+
+    def _load_rollup(self, ids, day, minutes, mood, energy, id_sum, table: pd.DataFrame) -> bool:
+        # Take the per-day sums from a saved rollup_table if its ids and sums
+        # (plain and day-weighted) are those of these rows; O(rows) vectorized,
+        # without the sort the regrouping needs
+        days = np.array([parse_day(d) for d in table["date"]], dtype=np.int64)
+        n, total = table["sessions"].to_numpy(np.int64), table["minutes"].to_numpy(float)
+        m, e = table["mood_sum"].to_numpy(float), table["energy_sum"].to_numpy(float)
+        day = day.astype(np.int64)
+        ok = (int(id_sum) == int(ids.sum()) and int(n.sum()) == len(ids)
+              and int(days @ n) == int(day.sum())
+              and np.allclose([total.sum(), days @ total, m.sum(), e.sum()],
+                              [minutes.sum(), day @ minutes, mood.sum(), energy.sum()], rtol=0, atol=1e-6))
+        if ok:
+            for d, k, t, mo, en in zip(days.tolist(), n.tolist(), total.tolist(), m.tolist(), e.tolist()):
+                _bump(self.day_n, d, k, self.day_min, t, self.day_mood, mo, self.day_energy, en)
+        return ok
+
+    def add_tasks(self, t: pd.DataFrame):
+        """Fold in a frame of task rows."""
+        est = pd.to_numeric(t["estimated_min"], errors="coerce").fillna(0.0)
+        subject = t["subject"].astype(object).where(t["subject"].notna(), None)
+        is_open = t["status"].isin(OPEN_STATUSES)
+        for rid, c in zip(t["id"].astype(int).tolist(), zip(subject.tolist(), est.tolist(), is_open.tolist())):
+            self._tasks[rid] = c
+            self._apply_task(c, 1)
+
+    def verify(self, tasks: pd.DataFrame, sessions: pd.DataFrame) -> bool:
+        """Compare against a full rebuild from ``tasks``/``sessions``."""
+        ref = AggregateStore.from_frames(tasks, sessions)
+        def same(a, b, key):
+            a, b = a.sort_values(key).reset_index(drop=True), b.sort_values(key).reset_index(drop=True)
+            if len(a) != len(b) or not (a[key] == b[key]).all():
+                return False
+            num = [c for c in a.columns if c != key]
+            return np.allclose(a[num].to_numpy(float), b[num].to_numpy(float), equal_nan=True)
+        return (same(self.hour_table(), ref.hour_table(), "hour")
+                and same(self.subject_table(), ref.subject_table(), "subject")
+                and same(self.rollup_table(), ref.rollup_table(), "date")
+                and np.array_equal(self.week_n, ref.week_n)
+                and np.allclose(np.c_[self.week_min, self.week_mood, self.week_energy],
+                                np.c_[ref.week_min, ref.week_mood, ref.week_energy])
+                and self.open_tasks == ref.open_tasks
+                and abs(self.remaining_min - ref.remaining_min) < 1e-6)
+
+def _bump(counts: dict, key, sign, totals: dict, amount, *more):
+    # ``more`` is further (totals, amount) pairs kept alongside ``totals``
+    counts[key] = counts.get(key, 0) + sign
+    pairs = ((totals, amount),) + tuple(zip(more[::2], more[1::2]))
+    for t, a in pairs:
+        t[key] = t.get(key, 0) + a
+    if counts[key] <= 0:
+        del counts[key]
+        for t, _ in pairs:
+            del t[key]
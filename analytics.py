@@ -1,79 +1,122 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from aggregates import AggregateStore, OPEN_STATUSES
+from patterns import WEEKDAYS, best_window, streaks
+from schema import parse_day
+from instrument import timed
 
-def _parse_date(df, col="date"):
-    if col in df.columns:
-        df[col] = pd.to_datetime(df[col], errors="coerce").dt.date
-    return df
+PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
 
-def productivity_by_hour(sessions: pd.DataFrame) -> pd.DataFrame:
+def _aggregates(tasks=None, sessions=None) -> AggregateStore:
+    # Analytics read from an AggregateStore; raw frames go through the full rebuild
+    for src in (tasks, sessions):
+        if isinstance(src, AggregateStore):
+            return src
+    return AggregateStore.from_frames(tasks, sessions)
+
+@timed("analytics.productivity_by_hour")
+def productivity_by_hour(sessions) -> pd.DataFrame:
     """Return average mood/energy and minutes by start hour."""
-    if sessions.empty:
-        return pd.DataFrame(columns=["hour","avg_mood","avg_energy","total_min"])
-    df = sessions.copy()
-    _parse_date(df, "date")
-    # derive hour from start_time
-    def hourify(x):
-        try:
-            return int(str(x).split(":")[0])
-        except Exception:
-            return None
-    df["hour"] = df["start_time"].map(hourify)
-    g = df.groupby("hour").agg(
-        avg_mood=("mood","mean"),
-        avg_energy=("energy","mean"),
-        total_min=("duration_min","sum")
-    ).reset_index().sort_values("hour")
-    return g
+    return _aggregates(sessions=sessions).hour_table()
+
+@timed("analytics.focus_heatmap")
+def focus_heatmap(sessions) -> pd.DataFrame:
+    """Sessions, minutes and minute-weighted mood/energy for each weekday × hour (168 rows)."""
+    return _aggregates(sessions=sessions).heatmap_table()
+
+@timed("analytics.study_streaks")
+def study_streaks(sessions, today=None) -> dict:
+    """Current and longest run of consecutive study days, plus gap stats (see ``patterns.streaks``)."""
+    agg = _aggregates(sessions=sessions)
+    day = parse_day(str(today or datetime.now().date()))
+    return streaks(np.fromiter(agg.day_min, dtype=np.int64, count=len(agg.day_min)), day)
 
-def subject_pareto(tasks: pd.DataFrame, sessions: pd.DataFrame) -> pd.DataFrame:
+@timed("analytics.subject_pareto")
+def subject_pareto(tasks, sessions=None) -> pd.DataFrame:
     """Which subjects consume most time vs open tasks (80/20)."""
-    s = sessions.copy()
-    t = tasks.copy()
-    if s.empty and t.empty:
-        return pd.DataFrame(columns=["subject","minutes_spent","open_tasks"])
-    s_minutes = s.groupby("subject")["duration_min"].sum().rename("minutes_spent")
-    t_open = t[t["status"].isin(["Todo","In Progress"])].groupby("subject")["id"].count().rename("open_tasks")
-    out = pd.concat([s_minutes, t_open], axis=1).fillna(0).reset_index()
-    out = out.sort_values("minutes_spent", ascending=False)
-    return out
+    return _aggregates(tasks, sessions).subject_table()
 
-def forecast_hours_needed(tasks: pd.DataFrame, sessions: pd.DataFrame) -> float:
+@timed("analytics.forecast_hours_needed")
+def forecast_hours_needed(tasks, sessions=None) -> float:
     """Estimate hours needed to finish remaining tasks based on velocity."""
-    remaining_min = tasks[tasks["status"].isin(["Todo","In Progress"])]["estimated_min"].sum()
+    agg = _aggregates(tasks, sessions)
+    remaining_min = agg.remaining_min
     if remaining_min <= 0:
         return 0.0
-    # Velocity: rolling average of last 7 days minutes from sessions
-    if sessions.empty:
+    if agg.forecast.end is None:
         return remaining_min / 60.0
-    s = sessions.copy()
-    s["date"] = pd.to_datetime(s["date"], errors="coerce")
-    daily = s.groupby(s["date"].dt.date)["duration_min"].sum().reset_index()
-    if daily.empty:
-        return remaining_min / 60.0
-    # Fit simple linear trend to infer tomorrow+ productivity
-    x = np.arange(len(daily))
-    y = daily["duration_min"].to_numpy()
-    # Handle constant or tiny arrays
-    if len(x) >= 2 and np.std(y) > 0:
-        coeffs = np.polyfit(x, y, 1)
-        # predicted next 7 days mins (non-negative)
-        preds = np.clip(np.polyval(coeffs, np.arange(len(daily), len(daily)+7)), 0, None)
-        weekly_capacity = preds.sum()
-    else:
-        weekly_capacity = y.mean() * 7.0
+    # Linear trend over the trailing window, projected over the next 7 days
+    weekly_capacity = agg.forecast.projected(7)
     if weekly_capacity <= 1e-6:
         return remaining_min / 60.0
     weeks_needed = remaining_min / weekly_capacity
     return round(weeks_needed * 7 * 24, 2)  # convert weeks to hours
 
-def best_focus_window(prod_hour_df: pd.DataFrame) -> str:
-    """Return a human-friendly best hour-of-day window based on mood+energy."""
+@timed("analytics.rolling_capacity")
+def rolling_capacity(aggs) -> dict:
+    """Minutes per day over the last 7 and 30 days, the EWMA rate and the projected next week."""
+    agg = _aggregates(sessions=aggs)
+    return {
+        "last_7d": round(agg.capacity(7), 1),
+        "last_30d": round(agg.capacity(30), 1),
+        "ewma": round(agg.forecast.ewma(), 1),
+        "next_7d": round(agg.forecast.projected(7), 1),
+    }
+
+@timed("analytics.task_etas")
+def task_etas(tasks: pd.DataFrame, aggs, today=None) -> pd.DataFrame:
+    """Open tasks in deadline order with the day each would be finished at the current pace.
+
+    Work is assumed to be done in deadline (then priority) order at the EWMA
+    daily rate, so a task's ETA covers its own estimate plus everything due
+    before it. ``on_track`` is False when the ETA falls after the deadline.
+    """
+    cols = ["id", "title", "deadline", "estimated_min", "cumulative_min", "eta", "on_track"]
+    agg = _aggregates(sessions=aggs)
+    if tasks is None or tasks.empty:
+        return pd.DataFrame(columns=cols)
+    t = tasks[tasks["status"].isin(OPEN_STATUSES)]
+    if t.empty:
+        return pd.DataFrame(columns=cols)
+    rank = t["priority"].astype(str).map(PRIORITY_RANK).fillna(len(PRIORITY_RANK))
+    due = pd.to_datetime(t["deadline"].astype(str), errors="coerce")
+    t = t.assign(_due=due, _rank=rank).sort_values(["_due", "_rank", "id"], na_position="last")
+    est = pd.to_numeric(t["estimated_min"], errors="coerce").fillna(0.0)
+    cumulative = est.cumsum()
+    today = pd.Timestamp(today or datetime.now().date())
+    rate = agg.forecast.ewma() or agg.capacity(30)
+    if rate > 1e-6:
+        eta = today + pd.to_timedelta(np.ceil(cumulative.to_numpy() / rate), unit="D")
+        eta = pd.Series(eta, index=t.index)
+        on_track = (eta <= t["_due"]) | t["_due"].isna()
+        eta = eta.dt.strftime("%Y-%m-%d")
+    else:
+        eta = pd.Series(None, index=t.index, dtype=object)
+        on_track = t["_due"].isna()
+    return pd.DataFrame({
+        "id": t["id"].to_numpy(), "title": t["title"].astype(str).to_numpy(),
+        "deadline": t["deadline"].astype(object).where(t["deadline"].notna(), None).to_numpy(), "estimated_min": est.to_numpy(),
+        "cumulative_min": cumulative.to_numpy(), "eta": eta.to_numpy(), "on_track": on_track.to_numpy(),
+    }, columns=cols)
+
+@timed("analytics.best_focus_window")
+def best_focus_window(prod_hour_df: pd.DataFrame, span=2) -> str:
+    """Return a human-friendly best focus window based on mood+energy.
+
+    Given ``focus_heatmap`` output this is the best ``span``-hour block of
+    the week ("Tue 09:00–11:00"); given ``productivity_by_hour`` output, the
+    best single hour of the day.
+    """
+    if "weekday" in prod_hour_df.columns:
+        pick = best_window(prod_hour_df, span)
+        if pick is None:
+            return "No data yet — run a few sessions."
+        day, hr = pick
+        return f"{WEEKDAYS[day]} {hr:02d}:00–{hr+span:02d}:00"
     if prod_hour_df.empty:
         return "No data yet — run a few sessions."
-    df = prod_hour_df.copy()
-    df["score"] = df["avg_mood"].fillna(0)*0.6 + df["avg_energy"].fillna(0)*0.4
+    df = prod_hour_df.assign(score=prod_hour_df["avg_mood"].fillna(0)*0.6 + prod_hour_df["avg_energy"].fillna(0)*0.4)
     best = df.sort_values(["score","total_min"], ascending=False).head(1)
     hr = int(best["hour"].iloc[0])
     return f"{hr:02d}:00–{hr+1:02d}:00"
@@ -0,0 +1,308 @@
+"""
+Reproducible benchmarks for NeuroStudy Coach hot paths.
+
+    python bench.py                       # 1k / 100k / 1M rows, JSON to stdout
+    python bench.py --sizes 1000 100000 --out bench_results.json
+    python bench.py --compare old.json --out new.json
+
+Data comes from a seeded synthetic generator, so numbers are comparable
+between commits. Each case reports the best wall time over ``--repeat`` runs
+and the peak traced allocation (tracemalloc) of one extra run. The UI cases
+use a real Tk root when a display is available and a mocked Treeview otherwise.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+SUBJECTS = ["Math", "Physics", "Chemistry", "Biology", "Python", "History",
+            "English", "Economics", "Statistics", "Art", "Music", "Philosophy"]
+NOTE_WORDS = ["focus", "review", "flashcards", "exercises", "lecture", "notes", "summary",
+              "tired", "flow", "distracted", "practice", "exam", "reading", "project", "quiz"]
+
+# --- Synthetic data ---
+def generate_sessions(n: int, seed: int = 42, days: int = 3 * 365) -> pd.DataFrame:
+    """Sessions with Zipf-skewed subjects, morning/evening peaks and hour-dependent mood."""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(SUBJECTS) + 1) ** 1.1
+    subject = rng.choice(len(SUBJECTS), size=n, p=weights / weights.sum())
+    peak = rng.random(n) < 0.6
+    hour = np.where(peak, rng.normal(10, 1.5, n), rng.normal(20, 1.8, n))
+    hour = np.clip(np.round(hour), 6, 23).astype(int)
+    minute = rng.choice([0, 15, 30, 45], size=n)
+    duration = rng.choice([25, 50, 75, 100], size=n, p=[0.5, 0.3, 0.15, 0.05])
+    end = np.minimum(hour * 60 + minute + duration, 24 * 60 - 1)
+    mood = np.clip(np.round(rng.normal(7 - np.abs(hour - 10) * 0.15, 1.5)), 1, 10).astype(int)
+    energy = np.clip(np.round(mood + rng.normal(-0.5, 1.2, n)), 1, 10).astype(int)
+    start_day = np.datetime64("2023-01-01")
+    date = (start_day + np.sort(rng.integers(0, days, n)).astype("timedelta64[D]")).astype(str)
+    words = np.array(NOTE_WORDS)
+    notes = pd.Series(words[rng.integers(0, len(words), n)]) + " " + pd.Series(words[rng.integers(0, len(words), n)])
+    fmt = lambda m: pd.Series(m // 60).astype(str).str.zfill(2) + ":" + pd.Series(m % 60).astype(str).str.zfill(2)
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "date": date,
+        "start_time": fmt(hour * 60 + minute).to_numpy(),
+        "end_time": fmt(end).to_numpy(),
+        "duration_min": duration,
+        "subject": np.array(SUBJECTS)[subject],
+        "mood": mood,
+        "energy": energy,
+        "notes": notes.to_numpy(),
+    })
+
+def generate_tasks(n: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 1)
+    deadline = (np.datetime64("2026-01-01") + rng.integers(0, 365, n).astype("timedelta64[D]")).astype(str)
+    deadline = np.where(rng.random(n) < 0.3, "", deadline)
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "title": [f"Task {i}" for i in range(1, n + 1)],
+        "subject": np.array(SUBJECTS)[rng.integers(0, len(SUBJECTS), n)],
+        "deadline": deadline,
+        "priority": rng.choice(["Low", "Medium", "High"], size=n, p=[0.3, 0.5, 0.2]),
+        "estimated_min": rng.choice([25, 50, 60, 90, 120, 180], size=n),
+        "status": rng.choice(["Todo", "In Progress", "Done"], size=n, p=[0.4, 0.2, 0.4]),
+    })
+
+# --- Headless UI stand-ins ---
+class _MockTree:
+    """Just enough of ttk.Treeview for _df_to_tree and VirtualTable."""
+    def __init__(self):
+        self._items, self._n, self._sel, self._cfg = {}, 0, (), {}
+    def insert(self, parent, index, values=()):
+        self._n += 1
+        iid = f"I{self._n}"
+        self._items[iid] = values
+        return iid
+    def delete(self, *iids):
+        for iid in iids:
+            self._items.pop(iid, None)
+    def item(self, iid, values=None, **_kw):
+        if values is not None:
+            self._items[iid] = values
+        return {"values": self._items[iid]}
+    def get_children(self, *_a):
+        return tuple(self._items)
+    def heading(self, *a, **kw): pass
+    def column(self, *a, **kw): pass
+    def selection(self): return self._sel
+    def selection_set(self, items): self._sel = tuple(items)
+    def __setitem__(self, key, value): self._cfg[key] = value
+
+class _MockWidget:
+    def config(self, **kw): pass
+    def set(self, *a): pass
+    def __setitem__(self, key, value): pass
+
+def _ui_targets():
+    """(tree factory, table factory, root or None) using real Tk when possible."""
+    from widgets import VirtualTable
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+        root.withdraw()
+        return (lambda: ttk.Treeview(root), lambda: VirtualTable(root, height=30), root)
+    except Exception:
+        def table():
+            t = VirtualTable.__new__(VirtualTable)
+            t._init_state("id", 10, 30)
+            t.tree, t.vsb, t.count_label, t._col_box = _MockTree(), _MockWidget(), _MockWidget(), _MockWidget()
+            return t
+        return (_MockTree, table, None)
+
+# --- Runner ---
+def measure(fn, setup=None, repeat=3):
+    """Best-of-``repeat`` seconds and traced peak MB for ``fn(setup())``."""
+    best = float("inf")
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        t0 = time.perf_counter()
+        fn(arg) if setup else fn()
+        best = min(best, time.perf_counter() - t0)
+    arg = setup() if setup else None
+    tracemalloc.start()
+    try:
+        fn(arg) if setup else fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak / 1e6
+
+def run(sizes, repeat=3, seed=42, only=None, log=sys.stderr):
+    from storage import Storage, DEFAULT_SETTINGS
+    from controllers import AppController
+    from analytics import (productivity_by_hour, subject_pareto, forecast_hours_needed, best_focus_window, task_etas,
+                           focus_heatmap, study_streaks)
+    from aggregates import AggregateStore
+    from planner import Planner
+    from ui import _df_to_tree
+
+    results = []
+    def case(group, name, rows, fn, setup=None, reps=repeat):
+        if only and not any(o in f"{group}.{name}" for o in only):
+            return
+        seconds, peak = measure(fn, setup, reps)
+        results.append({"group": group, "name": name, "rows": rows, "seconds": round(seconds, 6),
+                        "peak_mb": round(peak, 3)})
+        print(f"{group:10s} {name:28s} {rows:>9d} rows  {seconds*1000:10.2f} ms  {peak:9.1f} MB", file=log)
+
+    def resident(name, rows, frames):
+        # Deep size of what stays cached after a load, not the transient peak
+        if only and not any(o in f"memory.{name}" for o in only):
+            return
+        mb = sum(f.memory_usage(deep=True).sum() for f in frames) / 1e6
+        results.append({"group": "memory", "name": name, "rows": rows, "seconds": 0.0, "peak_mb": round(mb, 3)})
+        print(f"{'memory':10s} {name:28s} {rows:>9d} rows  {'':>10s}     {mb:9.1f} MB", file=log)
+
+    make_tree, make_table, root = _ui_targets()
+    for n in sizes:
+        sessions = generate_sessions(n, seed)
+        tasks = generate_tasks(max(10, n // 100), seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = Storage(base_dir=tmp)
+            storage.save_sessions(sessions)
+            storage.save_tasks(tasks)
+
+            # Storage I/O
+            case("storage", "save_sessions", n, lambda: storage.save_sessions(sessions))
+            case("storage", "load_sessions_cold", n, lambda s: s.load_sessions(),
+                 setup=lambda: Storage(base_dir=tmp))
+            storage.load_sessions()
+            case("storage", "load_sessions_cached", n, storage.load_sessions)
+            resident("sessions_frame", n, [storage.load_sessions()])
+            resident("sessions_typed", n, [storage.load_sessions_typed()])
+            case("storage", "load_sessions_typed", n, lambda s: s.load_sessions_typed(),
+                 setup=lambda: Storage(base_dir=tmp))
+
+            # Controller write paths (journaled single-row writes)
+            controller = AppController(storage)
+            controller.aggregates()
+            ids = iter(range(1, n + 1))
+            case("controller", "add_session", n, lambda: controller.add_session(
+                "2026-01-05", "09:00", "09:25", 25, "Math", 7, 6, "bench"))
+            case("controller", "delete_session", n, lambda: controller.delete_session(next(ids)))
+            case("controller", "update_task_status", n, lambda: controller.update_task_status(1, "Done"))
+            case("controller", "aggregates_rebuild", n, lambda c: c.aggregates(),
+                 setup=lambda: AppController(storage), reps=1)
+            case("controller", "add_sessions_bulk_1k", n,
+                 lambda: controller.add_sessions_bulk(sessions.head(1000)), reps=1)
+            # Search over session notes: index build, then typed queries with filters
+            case("search", "index_build", n, lambda c: c.search_index("sessions"),
+                 setup=lambda: AppController(storage), reps=1)
+            controller.search_index("sessions")
+            case("search", "word", n, lambda: controller.search_sessions("flashcards"))
+            case("search", "prefixes_subject", n, lambda: controller.search_sessions("fl rev", "Math"))
+            case("search", "date_range", n, lambda: controller.search_sessions(
+                "focus", start="2025-01-01", end="2025-03-31"))
+            storage.compact()
+
+        # Month-partitioned sessions: range queries and manifest totals
+        with tempfile.TemporaryDirectory() as tmp:
+            Storage(base_dir=tmp, backend="partitioned").save_sessions(sessions)
+            last = str(sessions["date"].max())[:7] + "-01"
+            fresh = lambda: Storage(base_dir=tmp, backend="partitioned")
+            case("partitioned", "load_sessions_cold", n, lambda s: s.load_sessions(), setup=fresh)
+            case("partitioned", "load_last_month_cold", n, lambda s: s.load_sessions(start=last), setup=fresh)
+            case("partitioned", "session_totals_cold", n, lambda s: s.session_totals(), setup=fresh)
+
+        # Analytics over raw frames (full rebuild path) and over aggregates
+        case("analytics", "productivity_by_hour", n, lambda: productivity_by_hour(sessions))
+        case("analytics", "subject_pareto", n, lambda: subject_pareto(tasks, sessions))
+        case("analytics", "forecast_hours_needed", n, lambda: forecast_hours_needed(tasks, sessions))
+        prod = productivity_by_hour(sessions)
+        case("analytics", "best_focus_window", n, lambda: best_focus_window(prod))
+        aggs = AggregateStore.from_frames(tasks, sessions)
+        case("analytics", "forecast_hours_needed_aggs", n, lambda: forecast_hours_needed(aggs))
+        case("analytics", "task_etas", n, lambda: task_etas(tasks, aggs))
+        case("analytics", "focus_heatmap", n, lambda: focus_heatmap(sessions))
+        heat = focus_heatmap(aggs)
+        case("analytics", "focus_heatmap_aggs", n, lambda: focus_heatmap(aggs))
+        case("analytics", "best_focus_window_week", n, lambda: best_focus_window(heat))
+        case("analytics", "study_streaks", n, lambda: study_streaks(aggs))
+
+        # Study plan over the open tasks (n // 100 tasks), full build and one edit + re-plan
+        settings = DEFAULT_SETTINGS
+        case("planner", "from_frame", n, lambda: Planner.from_frame(tasks))
+        planner = Planner.from_frame(tasks)
+        case("planner", "plan", n, lambda: planner.plan(settings, heat, 240))
+        edited = int(tasks["id"].iloc[0])
+        case("planner", "edit_replan", n, lambda: (planner.update_task(edited, status="Todo", deadline="2026-01-02"),
+                                                   planner.plan(settings, heat, 240)))
+
+        # UI table paths
+        case("ui", "df_to_tree", n, lambda t: _df_to_tree(t, sessions), setup=make_tree, reps=1)
+        case("ui", "virtual_table_set_frame", n, lambda t: t.set_frame(sessions), setup=make_table)
+        table = make_table()
+        table.set_frame(sessions)
+        case("ui", "virtual_table_scroll", n, lambda: table.scroll(25))
+        case("ui", "virtual_table_sort", n, lambda: table.sort_by("subject"))
+        # Row deltas from controller change events, instead of set_frame on the reloaded frame
+        live = make_table()
+        live.set_frame(sessions)
+        new_ids, old_ids = iter(range(n + 1, n + 100)), iter(sessions["id"].tolist())
+        case("ui", "virtual_table_add_row", n, lambda: live.apply_changes(sessions.head(1).assign(id=next(new_ids))))
+        case("ui", "virtual_table_delete_row", n, lambda: live.apply_changes(deleted=[next(old_ids)]))
+
+    if root is not None:
+        root.destroy()
+    return results
+
+def _git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def compare(old: dict, new: dict) -> str:
+    """Side-by-side timing ratios for cases present in both result sets."""
+    key = lambda r: (r["group"], r["name"], r["rows"])
+    before = {key(r): r for r in old["results"]}
+    lines = [f"{'case':40s} {'rows':>9s} {'old ms':>10s} {'new ms':>10s} {'ratio':>7s}"]
+    for r in new["results"]:
+        o = before.get(key(r))
+        if o is None:
+            continue
+        ratio = r["seconds"] / o["seconds"] if o["seconds"] else float("inf")
+        lines.append(f"{r['group'] + '.' + r['name']:40s} {r['rows']:>9d} {o['seconds']*1000:10.2f} "
+                     f"{r['seconds']*1000:10.2f} {ratio:7.2f}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--only", nargs="*", help="run only cases whose group.name contains one of these")
+    p.add_argument("--out", help="write JSON results here instead of stdout")
+    p.add_argument("--compare", help="previous JSON results to compare against")
+    args = p.parse_args(argv)
+
+    out = {
+        "meta": {"commit": _git_rev(), "python": platform.python_version(), "pandas": pd.__version__,
+                 "numpy": np.__version__, "platform": platform.platform(), "seed": args.seed,
+                 "repeat": args.repeat, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": run(args.sizes, args.repeat, args.seed, args.only),
+    }
+    text = json.dumps(out, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print(compare(json.load(f), out), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
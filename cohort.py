@@ -0,0 +1,242 @@
+"""
+Cohort analytics over many profiles (one data directory per student).
+
+Each profile is read in a worker process with the same chunked path as
+``report``, and only its frozen :class:`aggregates.AggregateStore` plus a
+few per-profile numbers travel back; the parent merges the stores into
+cohort totals. Profiles that are missing or fail to load are listed with
+their error and left out of the totals, so one bad directory never holds up
+the rest.
+"""
+import glob
+import io
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+import pandas as pd
+from aggregates import AggregateStore
+from storage import DEFAULT_SETTINGS
+from analytics import (productivity_by_hour, subject_pareto, forecast_hours_needed, rolling_capacity,
+                       focus_heatmap, best_focus_window, study_streaks)
+
+PROFILE_COLUMNS = ["profile", "sessions", "rejected", "open_tasks", "forecast_hours", "ewma_min", "next_7d_min",
+                   "current_streak", "error"]
+DISTRIBUTION_METRICS = ["forecast_hours", "ewma_min", "next_7d_min", "sessions", "current_streak"]
+POLL_S = 0.1
+_started = None  # worker side: queue of (profile, pid) as jobs start
+
+def profile_dirs(patterns) -> list:
+    """Data directories named by ``patterns`` (paths or globs), in order, without duplicates.
+
+    A pattern matching nothing is kept as is, so it is reported as missing.
+    """
+    out, seen = [], set()
+    for pattern in patterns:
+        matches = sorted(p for p in glob.glob(pattern) if os.path.isdir(p)) if glob.has_magic(pattern) else [pattern]
+        for path in matches or [pattern]:
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                out.append(path)
+    return out
+
+def _size(path) -> int:
+    try:
+        return sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+    except OSError:
+        return 0
+
+def _failed(path, error) -> dict:
+    return {"profile": path, "aggs": None, "error": error}
+
+def profile_partial(job) -> dict:
+    """Worker: one profile's frozen aggregates and headline numbers, or its error.
+
+    ``job`` is ``(base_dir, backend, chunksize)``. The profile is opened
+    read-only: one without its data files fails instead of being seeded with
+    sample rows. Never raises, so a corrupt profile comes back as a result
+    instead of failing the batch.
+    """
+    from storage import Storage
+    from report import stream_aggregates
+    base_dir, backend, chunksize = job
+    if not os.path.isdir(base_dir):
+        return _failed(base_dir, "missing")
+    storage = None
+    try:
+        storage = Storage(base_dir=base_dir, backend=backend, read_only=True)
+        aggs, rows, rejected, _ = stream_aggregates(storage, chunksize)
+        aggs.add_tasks(storage.load_tasks())
+        capacity = rolling_capacity(aggs)
+        return {
+            "profile": base_dir, "aggs": aggs.freeze(), "error": None,
+            "sessions": rows, "rejected": rejected, "open_tasks": aggs.open_tasks,
+            "forecast_hours": forecast_hours_needed(aggs), "ewma_min": capacity["ewma"],
+            "next_7d_min": capacity["next_7d"], "current_streak": study_streaks(aggs)["current"],
+        }
+    except FileNotFoundError as e:
+        return _failed(base_dir, str(e))
+    except Exception as e:
+        return _failed(base_dir, f"{type(e).__name__}: {e}")
+    finally:
+        if storage is not None:
+            try:
+                storage.close()
+            except Exception:
+                pass
+
+def _init_worker(started):
+    global _started
+    _started = started
+
+def _run_job(job):
+    _started.put((job[0], os.getpid()))
+    return profile_partial(job)
+
+def run_cohort(patterns, workers=None, backend="csv", chunksize=100_000, timeout=None) -> dict:
+    """Analyze every profile in ``patterns`` and merge them into cohort totals.
+
+    Profiles are spread over ``workers`` processes (default: one per CPU;
+    1 runs in-process), largest first so a big profile does not finish the
+    batch alone. A profile whose worker process dies is reported as such and
+    the rest carry on; ``timeout`` (seconds, for the whole batch) also gives
+    up on workers that hang.
+    """
+    dirs = profile_dirs(patterns)
+    jobs = [(d, backend, chunksize) for d in sorted(dirs, key=_size, reverse=True)]
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    results = {}
+    if workers == 1:
+        for job in jobs:
+            results[job[0]] = profile_partial(job)
+    else:
+        results.update(_run_pool(jobs, workers, timeout))
+    return merge_partials([results[d] for d in dirs])
+
+def _run_pool(jobs, workers, timeout):
+    # The pool replaces a worker that dies but never answers for its job, so
+    # workers report which job they are on and a job whose process is gone fails
+    started = multiprocessing.SimpleQueue()  # unbuffered, so a start is recorded even if the worker dies right after
+    pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(started,))
+    deadline = None if timeout is None else time.monotonic() + timeout
+    results, owner, gone = {}, {}, set()
+    try:
+        pending = {job[0]: pool.apply_async(_run_job, (job,)) for job in jobs}
+        while pending:
+            while not started.empty():
+                path, pid = started.get()
+                owner[path] = pid
+            alive = {p.pid for p in multiprocessing.active_children()}
+            expired = deadline is not None and time.monotonic() > deadline
+            for path, res in list(pending.items()):
+                if res.ready():
+                    try:
+                        results[path] = res.get()
+                    except Exception as e:
+                        results[path] = _failed(path, f"{type(e).__name__}: {e}")
+                elif path in gone and owner[path] not in alive:
+                    results[path] = _failed(path, "worker process died")
+                elif expired:
+                    results[path] = _failed(path, "timed out")
+                else:
+                    # Death counts when seen twice in a row: a just-forked worker can report before it is listed
+                    if path in owner and owner[path] not in alive:
+                        gone.add(path)
+                    else:
+                        gone.discard(path)
+                    continue
+                del pending[path]
+            if pending:
+                time.sleep(POLL_S)
+    finally:
+        pool.terminate()
+        pool.join()
+    return results
+
+def merge_partials(partials) -> dict:
+    """Cohort totals from ``profile_partial`` results, in profile order.
+
+    The merged forecast keeps the first loaded profile's ``forecast_window``.
+    """
+    loaded = [p["aggs"] for p in partials if p["aggs"] is not None]
+    total = AggregateStore(track_rows=False, window=loaded[0].forecast.window if loaded
+                           else DEFAULT_SETTINGS["forecast_window"])
+    for aggs in loaded:
+        total.merge(aggs)
+    profiles = pd.DataFrame([{c: p.get(c) for c in PROFILE_COLUMNS} for p in partials], columns=PROFILE_COLUMNS)
+    profiles = profiles.astype({c: "Int64" for c in ("sessions", "rejected", "open_tasks", "current_streak")})
+    ok = profiles[profiles["error"].isna()]
+    heat = focus_heatmap(total)
+    return {
+        "profiles": profiles,
+        "loaded": int(len(ok)),
+        "failed": int(len(profiles) - len(ok)),
+        "productivity": productivity_by_hour(total),
+        "heatmap": heat,
+        "best_window": best_focus_window(heat),
+        "pareto": subject_pareto(total),
+        "distribution": distribution(ok),
+    }
+
+def distribution(profiles: pd.DataFrame) -> pd.DataFrame:
+    """Spread of the per-profile numbers: count, mean and 10/50/90th percentiles."""
+    rows = []
+    for m in DISTRIBUTION_METRICS:
+        v = pd.to_numeric(profiles[m], errors="coerce").dropna().to_numpy(dtype=float)
+        q = np.percentile(v, [10, 50, 90]) if len(v) else [np.nan] * 3
+        rows.append({"metric": m, "count": len(v), "mean": v.mean() if len(v) else np.nan,
+                     "p10": q[0], "p50": q[1], "p90": q[2]})
+    return pd.DataFrame(rows, columns=["metric", "count", "mean", "p10", "p50", "p90"])
+
+# --- Output formats ---
+def to_text(cohort: dict) -> str:
+    lines = ["👥 Cohort Insights", "",
+             f"• Profiles: {cohort['loaded']} loaded, {cohort['failed']} failed",
+             f"• Best focus window (based on mood/energy): {cohort['best_window']}", "",
+             "📌 Per-profile spread (p10 / median / p90):"]
+    for _, r in cohort["distribution"].iterrows():
+        if r["count"]:
+            lines.append(f"  - {r['metric']}: {r['p10']:.1f} / {r['p50']:.1f} / {r['p90']:.1f} (mean {r['mean']:.1f})")
+    lines += ["", "📌 Productivity by Hour:"]
+    for _, r in cohort["productivity"].iterrows():
+        lines.append(f"  - {int(r['hour']):02d}:00 → avg mood {r['avg_mood']:.1f}, energy {r['avg_energy']:.1f}, "
+                     f"total {int(r['total_min'])} min")
+    lines += ["", "📌 Subject Pareto:"]
+    for _, r in cohort["pareto"].iterrows():
+        lines.append(f"  - {r['subject']}: {int(r['minutes_spent'])} min spent, {int(r['open_tasks'])} tasks open")
+    failed = cohort["profiles"][cohort["profiles"]["error"].notna()]
+    if not failed.empty:
+        lines += ["", f"⚠️ {len(failed)} profile(s) left out:"]
+        for _, r in failed.head(20).iterrows():
+            lines.append(f"  - {r['profile']}: {r['error']}")
+    return "\n".join(lines) + "\n"
+
+def to_json(cohort: dict) -> str:
+    out = dict(cohort)
+    for key in ("profiles", "productivity", "heatmap", "pareto", "distribution"):
+        df = cohort[key]
+        out[key] = df.astype(object).where(df.notna(), None).to_dict("records")
+    return json.dumps(out, indent=2, ensure_ascii=False, default=lambda o: o.item() if hasattr(o, "item") else str(o)) + "\n"
+
+def to_csv(cohort: dict) -> str:
+    """Long format like ``report.to_csv``: one ``section,key,metric,value`` row per number."""
+    rows = [("summary", "", k, cohort[k]) for k in ("loaded", "failed", "best_window")]
+    for _, r in cohort["distribution"].iterrows():
+        for m in ("count", "mean", "p10", "p50", "p90"):
+            rows.append(("distribution", r["metric"], m, r[m]))
+    for _, r in cohort["productivity"].iterrows():
+        for m in ("avg_mood", "avg_energy", "total_min"):
+            rows.append(("productivity", int(r["hour"]), m, r[m]))
+    for _, r in cohort["pareto"].iterrows():
+        for m in ("minutes_spent", "open_tasks"):
+            rows.append(("pareto", r["subject"], m, r[m]))
+    for _, r in cohort["profiles"].iterrows():
+        for m in PROFILE_COLUMNS[1:]:
+            rows.append(("profile", r["profile"], m, r[m]))
+    buf = io.StringIO()
+    pd.DataFrame(rows, columns=["section","key","metric","value"]).to_csv(buf, index=False)
+    return buf.getvalue()
+
+FORMATS = {"text": to_text, "json": to_json, "csv": to_csv}
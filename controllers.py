@@ -1,19 +1,222 @@
-from storage import Storage
+import threading
+from collections import OrderedDict
+from storage import Storage, DEFAULT_SETTINGS
+from aggregates import AggregateStore
+from snapshot import AnalyticsSnapshot
+from search import InvertedIndex, in_mask
+from planner import Planner
+from instrument import timed
+from schema import parse_session, normalize_sessions, normalize_tasks, typed_to_rows, category_mask
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+
+class Change:
+    """What one controller write did, for listeners.
+
+    ``kind`` is ``"sessions"``, ``"tasks"`` or ``"settings"``. ``added``,
+    ``updated`` and ``deleted`` are row ids; ``rows`` holds the added rows
+    as stored and ``fields`` the values set on every updated id.
+    """
+    def __init__(self, kind, added=(), updated=(), deleted=(), rows=None, fields=None):
+        self.kind = kind
+        self.added = [int(i) for i in added]
+        self.updated = [int(i) for i in updated]
+        self.deleted = [int(i) for i in deleted]
+        self.rows = rows
+        self.fields = dict(fields or {})
+
+    def __repr__(self):
+        return (f"Change({self.kind!r}, added={len(self.added)}, updated={len(self.updated)}, "
+                f"deleted={len(self.deleted)})")
 
 class AppController:
+    SNAPSHOT_CACHE = 4
+    REBUILD_TRIES = 3  # lock-free rebuilds raced by writes before one is made under the lock
+
     def __init__(self, storage: Storage):
         self.storage = storage
+        self._aggs = None
+        self._aggs_version = None
+        self._aggs_epoch = 0  # bumped when the aggregates are dropped for a settings change
+        self._rollup_saved = None  # data version of the last saved daily rollup
+        # Guards the aggregates: refreshes read them on a worker thread while the UI writes
+        self.lock = threading.RLock()
+        self._snapshots = OrderedDict()
+        self._indexes = {}  # "sessions"/"tasks" -> [data version, InvertedIndex]
+        self._planner = None
+        self._planner_version = None
+        self._listeners = []
+
+    # --- Change events ---
+    def subscribe(self, listener):
+        """Call ``listener(change)`` with a :class:`Change` after every write, on the writing thread."""
+        self._listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, change: Change):
+        for listener in list(self._listeners):
+            listener(change)
+
+    # --- Aggregates ---
+    @timed("controller.aggregates")
+    def aggregates(self) -> AggregateStore:
+        """Incrementally maintained analytics aggregates, rebuilt only if storage changed externally.
+
+        The rebuild runs without holding ``lock``, so writes from the UI thread
+        go on meanwhile; it is swapped in only if no write landed during it.
+        """
+        for _ in range(self.REBUILD_TRIES):
+            with self.lock:
+                if self._aggs_live():
+                    return self._aggs
+                version, epoch = self.storage.data_version, self._aggs_epoch
+            aggs = self._build_aggregates()
+            with self.lock:
+                if self._aggs_live():
+                    return self._aggs
+                if self.storage.data_version == version and self._aggs_epoch == epoch:
+                    self._aggs, self._aggs_version = aggs, version
+                    return aggs
+        with self.lock:
+            if not self._aggs_live():
+                version = self.storage.data_version
+                self._aggs, self._aggs_version = self._build_aggregates(), version
+            return self._aggs
+
+    def _build_aggregates(self) -> AggregateStore:
+        window = int(self.storage.load_settings()["forecast_window"])
+        return AggregateStore.from_frames(self.storage.load_tasks(), self.storage.load_sessions_typed(),
+                                          window=window, rollup=self.storage.load_daily_rollup())
+
+    @timed("controller.snapshot")
+    def snapshot(self) -> AnalyticsSnapshot:
+        """Shared analytics for the current data version (LRU of ``SNAPSHOT_CACHE`` versions)."""
+        self.aggregates()
+        with self.lock:
+            # Current unless storage changed outside the app since the line above
+            aggs = self.aggregates()
+            version = self._aggs_version
+            snap = self._snapshots.get(version)
+            if snap is None:
+                snap = AnalyticsSnapshot(version, aggs.freeze(), self.storage)
+                self._snapshots[version] = snap
+                while len(self._snapshots) > self.SNAPSHOT_CACHE:
+                    self._snapshots.popitem(last=False)
+            else:
+                self._snapshots.move_to_end(version)
+            return snap
+
+    def _aggs_live(self) -> bool:
+        return self._aggs is not None and self._aggs_version == self.storage.data_version
+
+    def _aggs_apply(self, live: bool, method: str, *args, **kwargs):
+        # Only fold a write in if the aggregates were current before it
+        if live:
+            getattr(self._aggs, method)(*args, **kwargs)
+            self._aggs_version = self.storage.data_version
+
+    # --- Search ---
+    SEARCH_TEXT = {"sessions": "notes", "tasks": "title"}
+
+    @timed("controller.search_index")
+    def search_index(self, kind: str) -> InvertedIndex:
+        """Inverted index over session notes or task titles, rebuilt only if storage changed externally."""
+        with self.lock:
+            version = self.storage.data_version
+            entry = self._indexes.get(kind)
+            if entry is None or entry[0] != version:
+                if kind == "sessions":
+                    notes = self.storage.load_session_notes()
+                    index = InvertedIndex.from_texts(notes.index.to_numpy(), notes.to_numpy())
+                else:
+                    tasks = self.storage.load_tasks()
+                    index = InvertedIndex.from_texts(tasks["id"].to_numpy(), tasks["title"].to_numpy())
+                entry = self._indexes[kind] = [version, index]
+            return entry[1]
+
+    def _index_live(self) -> list:
+        version = self.storage.data_version
+        return [kind for kind, entry in self._indexes.items() if entry[0] == version]
+
+    def _index_apply(self, live: list, kind=None, method=None, *args):
+        # Like _aggs_apply: every index that was current stays current, the written one gets the change
+        version = self.storage.data_version
+        for k in live:
+            if k == kind:
+                getattr(self._indexes[k][1], method)(*args)
+            self._indexes[k][0] = version
+
+    def _search(self, kind, frame, query, subject, date_col, start, end) -> pd.DataFrame:
+        # One boolean pass per criterion over plain arrays, then a single take from the frame
+        mask = self.search_index(kind).match(query or "")
+        keep = np.ones(len(frame), dtype=bool) if mask is None else in_mask(frame["id"].to_numpy(), mask)
+        if subject:
+            keep &= (frame["subject"] == subject).to_numpy()
+        if start or end:
+            dates = frame[date_col]
+            ok = lambda d: ((d >= start) if start else True) & ((d <= end) if end else True) & (d != "")
+            keep &= category_mask(dates, ok) if isinstance(dates.dtype, pd.CategoricalDtype) \
+                else (ok(dates.astype(str)) & dates.notna()).to_numpy()
+        return frame.iloc[np.flatnonzero(keep)]
+
+    @timed("controller.search_sessions")
+    def search_sessions(self, query="", subject=None, start=None, end=None) -> pd.DataFrame:
+        """Sessions whose notes contain every word of ``query`` (as prefixes), by subject and date range."""
+        return self._search("sessions", self.storage.load_sessions(), query, subject, "date", start, end)
+
+    @timed("controller.search_tasks")
+    def search_tasks(self, query="", subject=None, start=None, end=None) -> pd.DataFrame:
+        """Tasks whose title contains every word of ``query`` (as prefixes), by subject and deadline range."""
+        return self._search("tasks", self.storage.load_tasks(), query, subject, "deadline", start, end)
+
+    # --- Plan ---
+    DEFAULT_DAILY_MIN = 120
+
+    @timed("controller.planner")
+    def planner(self) -> Planner:
+        """Open tasks in deadline order, kept current by the task write paths."""
+        with self.lock:
+            if self._planner is None or self._planner_version != self.storage.data_version:
+                self._planner = Planner.from_frame(self.storage.load_tasks())
+                self._planner_version = self.storage.data_version
+            return self._planner
+
+    def _plan_live(self) -> bool:
+        return self._planner is not None and self._planner_version == self.storage.data_version
+
+    def _plan_apply(self, live: bool, method=None, *args, **kwargs):
+        # Like _aggs_apply; session writes only move the version along
+        if live:
+            if method:
+                getattr(self._planner, method)(*args, **kwargs)
+            self._planner_version = self.storage.data_version
+
+    @timed("controller.plan")
+    def plan(self, now=None) -> pd.DataFrame:
+        """Pomodoro blocks for the open tasks from ``now`` on (see ``planner.Planner.plan``).
+
+        Blocks go in the best hours of the focus heatmap. The daily study time
+        is the ``plan_daily_min`` setting, or the current pace when it is 0.
+        """
+        settings = self.get_settings()
+        snap = self.snapshot()
+        with self.lock:
+            daily = int(settings["plan_daily_min"] or 0) or round(snap.get("capacity")["ewma"]) \
+                or self.DEFAULT_DAILY_MIN
+            return self.planner().plan(settings, snap.get("heatmap"), daily, now)
 
     # --- Sessions ---
+    @timed("controller.list_sessions")
     def list_sessions(self) -> pd.DataFrame:
         return self.storage.load_sessions()
 
+    @timed("controller.add_session")
     def add_session(self, date, start_time, end_time, duration_min, subject, mood, energy, notes):
-        df = self.storage.load_sessions()
         new = {
-            "id": self.storage.next_session_id(),
             "date": date,
             "start_time": start_time,
             "end_time": end_time,
@@ -23,44 +226,140 @@ class AppController:
             "energy": int(energy or 0),
             "notes": notes or ""
         }
-        df = pd.concat([df, pd.DataFrame([new])], ignore_index=True)
-        self.storage.save_sessions(df)
+        parse_session(new)  # reject malformed input before it reaches storage
+        with self.lock:
+            live, ilive, plive = self._aggs_live(), self._index_live(), self._plan_live()
+            new = self.storage.insert_session(new)
+            self._aggs_apply(live, "add_session", new)
+            self._index_apply(ilive, "sessions", "add", new["id"], new["notes"])
+            self._plan_apply(plive)
+        self._emit(Change("sessions", added=[new["id"]], rows=pd.DataFrame([new])))
         return new
 
+    @timed("controller.add_sessions_bulk")
+    def add_sessions_bulk(self, df: pd.DataFrame):
+        """Validate, coerce and insert many sessions in one commit.
+
+        Incoming ids are ignored; new ones are assigned as a block. Returns
+        ``(inserted, rejects)``.
+        """
+        raw = df.drop(columns=["id"], errors="ignore").reset_index(drop=True)
+        typed, rejects = normalize_sessions(raw)
+        notes = raw["notes"].fillna("").astype(str).to_numpy()[typed["id"].to_numpy()] if "notes" in raw.columns else None
+        rows = typed_to_rows(typed, notes)
+        if rows.empty:
+            return rows, rejects
+        with self.lock:
+            live, ilive, plive = self._aggs_live(), self._index_live(), self._plan_live()
+            rows = self.storage.insert_sessions(rows.drop(columns=["id"]))
+            self._aggs_apply(live, "add_sessions_typed", typed.assign(id=rows["id"].to_numpy()))
+            self._index_apply(ilive, "sessions", "add_many", rows["id"].tolist(), rows["notes"].tolist())
+            self._plan_apply(plive)
+        self._emit(Change("sessions", added=rows["id"].tolist(), rows=rows))
+        return rows, rejects
+
+    @timed("controller.session_notes")
+    def session_notes(self, ids) -> list:
+        """Notes for the given session ids, in order; notes are not part of ``list_sessions``."""
+        return self.storage.load_session_notes(ids).tolist()
+
+    @timed("controller.session_rejects")
+    def session_rejects(self) -> pd.DataFrame:
+        return self.storage.session_rejects()
+
+    @timed("controller.delete_session")
     def delete_session(self, row_id: int):
-        df = self.storage.load_sessions()
-        df = df[df["id"] != row_id]
-        self.storage.save_sessions(df)
+        with self.lock:
+            live, ilive, plive = self._aggs_live(), self._index_live(), self._plan_live()
+            self.storage.delete_session(row_id)
+            self._aggs_apply(live, "remove_session", row_id)
+            self._index_apply(ilive, "sessions", "remove", row_id)
+            self._plan_apply(plive)
+        self._emit(Change("sessions", deleted=[row_id]))
 
     # --- Tasks ---
+    @timed("controller.list_tasks")
     def list_tasks(self) -> pd.DataFrame:
         return self.storage.load_tasks()
 
+    @timed("controller.add_task")
     def add_task(self, title, subject, deadline, priority, estimated_min, status):
-        df = self.storage.load_tasks()
         new = {
-            "id": self.storage.next_task_id(),
             "title": title, "subject": subject, "deadline": deadline,
             "priority": priority, "estimated_min": int(estimated_min or 0),
             "status": status
         }
-        df = pd.concat([df, pd.DataFrame([new])], ignore_index=True)
-        self.storage.save_tasks(df)
+        with self.lock:
+            live, ilive, plive = self._aggs_live(), self._index_live(), self._plan_live()
+            new = self.storage.insert_task(new)
+            self._aggs_apply(live, "add_task", new)
+            self._index_apply(ilive, "tasks", "add", new["id"], new["title"])
+            self._plan_apply(plive, "add_task", new)
+        self._emit(Change("tasks", added=[new["id"]], rows=pd.DataFrame([new])))
         return new
 
+    @timed("controller.add_tasks_bulk")
+    def add_tasks_bulk(self, df: pd.DataFrame):
+        """Validate, coerce and insert many tasks in one commit; returns ``(inserted, rejects)``."""
+        clean, rejects = normalize_tasks(df.drop(columns=["id"], errors="ignore"))
+        if clean.empty:
+            return clean, rejects
+        with self.lock:
+            live, ilive, plive = self._aggs_live(), self._index_live(), self._plan_live()
+            rows = self.storage.insert_tasks(clean)
+            self._aggs_apply(live, "add_tasks", rows)
+            self._index_apply(ilive, "tasks", "add_many", rows["id"].tolist(), rows["title"].tolist())
+            self._plan_apply(plive, "add_tasks", rows)
+        self._emit(Change("tasks", added=rows["id"].tolist(), rows=rows))
+        return rows, rejects
+
+    @timed("controller.update_task_status")
     def update_task_status(self, row_id: int, status: str):
-        df = self.storage.load_tasks()
-        df.loc[df["id"] == row_id, "status"] = status
-        self.storage.save_tasks(df)
+        with self.lock:
+            live, ilive, plive = self._aggs_live(), self._index_live(), self._plan_live()
+            self.storage.update_task(row_id, status=status)
+            self._aggs_apply(live, "update_task", row_id, status=status)
+            self._index_apply(ilive)
+            self._plan_apply(plive, "update_task", row_id, status=status)
+        self._emit(Change("tasks", updated=[row_id], fields={"status": status}))
 
+    @timed("controller.delete_task")
     def delete_task(self, row_id: int):
-        df = self.storage.load_tasks()
-        df = df[df["id"] != row_id]
-        self.storage.save_tasks(df)
+        with self.lock:
+            live, ilive, plive = self._aggs_live(), self._index_live(), self._plan_live()
+            self.storage.delete_task(row_id)
+            self._aggs_apply(live, "remove_task", row_id)
+            self._index_apply(ilive, "tasks", "remove", row_id)
+            self._plan_apply(plive, "remove_task", row_id)
+        self._emit(Change("tasks", deleted=[row_id]))
+
+    # --- Shutdown ---
+    @timed("controller.flush")
+    def flush(self):
+        """Write out buffered edits, then the daily rollup if it changed since it was last saved."""
+        self.storage.flush()
+        with self.lock:
+            if self._aggs_live() and self._rollup_saved != self._aggs_version:
+                self.storage.save_daily_rollup(self._aggs.session_id_sum, self._aggs.rollup_table())
+                self._rollup_saved = self._aggs_version
+
+    def close(self):
+        self.flush()
+        self.storage.close()
 
     # --- Settings ---
+    @timed("controller.get_settings")
     def get_settings(self) -> dict:
         return self.storage.load_settings()
 
+    @timed("controller.save_settings")
     def save_settings(self, data: dict):
-        self.storage.save_settings(data)
+        with self.lock:
+            self.storage.save_settings(data)
+            window = int(data.get("forecast_window", DEFAULT_SETTINGS["forecast_window"]))
+            if self._aggs is None or self._aggs.forecast.window != window:
+                # Rebuilt with the new window on next read; a rebuild in flight is discarded
+                self._aggs = None
+                self._aggs_epoch += 1
+                self._snapshots.clear()
+        self._emit(Change("settings"))
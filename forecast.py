@@ -0,0 +1,106 @@
+import numpy as np
+
+class TrailingForecast:
+    """Least-squares trend and EWMA of daily minutes over the last ``window`` calendar days.
+
+    The window ends at the latest study day. Running sums (Σy, Σy², Σd·y and
+    the EWMA numerator) are updated by ``change()`` whenever a day's minutes
+    move, so reading a forecast never touches the history. Days without
+    sessions count as zero minutes.
+    """
+    def __init__(self, window=28, decay=0.9):
+        self.window = int(window)
+        self.decay = float(decay)
+        self.end = None
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self.sy = 0.0
+        self.sy2 = 0.0
+        self.sdy = 0.0
+        self.sew = 0.0
+
+    @property
+    def start(self):
+        return None if self.end is None else self.end - self.window + 1
+
+    def _add(self, day, y0, y1):
+        # Move day ``day`` from y0 to y1 minutes inside the window
+        self.sy += y1 - y0
+        self.sy2 += y1 * y1 - y0 * y0
+        self.sdy += day * (y1 - y0)
+        self.sew += self.decay ** (self.end - day) * (y1 - y0)
+
+    def rebuild(self, day_min: dict):
+        """Recompute the sums from a day -> minutes map; O(window)."""
+        self.end = max(day_min) if day_min else None
+        self._reset_sums()
+        if self.end is None:
+            return
+        for d in range(self.start, self.end + 1):
+            self._add(d, 0.0, float(day_min.get(d, 0.0)))
+
+    def change(self, day_min: dict, day: int, old: float, new: float):
+        """Day ``day`` went from ``old`` to ``new`` minutes; ``day_min`` is already updated."""
+        if self.end is None or day > self.end:
+            if self.end is not None and day - self.end < self.window:
+                self._slide(day_min, day)
+            else:
+                self.rebuild(day_min)
+            return
+        if day == self.end and new == 0 and day not in day_min:
+            # The latest study day is gone; the window moves back to the previous one
+            self.rebuild(day_min)
+            return
+        if day >= self.start:
+            self._add(day, float(old), float(new))
+
+    def _slide(self, day_min: dict, new_end: int):
+        while self.end < new_end:
+            leaving = self.start
+            y = float(day_min.get(leaving, 0.0))
+            self.sy -= y
+            self.sy2 -= y * y
+            self.sdy -= leaving * y
+            self.sew = (self.sew - self.decay ** (self.window - 1) * y) * self.decay
+            self.end += 1
+            y = float(day_min.get(self.end, 0.0))
+            self.sy += y
+            self.sy2 += y * y
+            self.sdy += self.end * y
+            self.sew += y
+
+    # --- Readers ---
+    def mean(self) -> float:
+        return self.sy / self.window if self.end is not None else 0.0
+
+    def ewma(self) -> float:
+        """Exponentially weighted daily minutes, most recent day weighted highest."""
+        if self.end is None:
+            return 0.0
+        weight = (1 - self.decay ** self.window) / (1 - self.decay) if self.decay < 1 else self.window
+        return self.sew / weight
+
+    def trend(self):
+        """``(slope, intercept)`` of minutes per day against x = 0..window-1, or None if flat."""
+        if self.end is None:
+            return None
+        n = self.window
+        sx = n * (n - 1) / 2.0
+        sxx = (n - 1) * n * (2 * n - 1) / 6.0
+        sxy = self.sdy - self.start * self.sy
+        var_y = self.sy2 / n - (self.sy / n) ** 2
+        den = n * sxx - sx * sx
+        if n < 2 or den == 0 or var_y <= 1e-12:
+            return None
+        slope = (n * sxy - sx * self.sy) / den
+        return slope, (self.sy - slope * sx) / n
+
+    def projected(self, days=7) -> float:
+        """Minutes expected over the next ``days`` days from the trend (mean if flat)."""
+        fit = self.trend()
+        if fit is None:
+            return self.mean() * days
+        slope, intercept = fit
+        x = np.arange(self.window, self.window + days)
+        return float(np.clip(intercept + slope * x, 0, None).sum())
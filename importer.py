@@ -0,0 +1,76 @@
+import os
+import time
+import pandas as pd
+
+class ImportReport:
+    """Counts, timing and a sample of rejected rows for one import run."""
+    SAMPLE_REJECTS = 100
+
+    def __init__(self, kind, path):
+        self.kind = kind
+        self.path = path
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rows_rejected = 0
+        self.chunks = 0
+        self.seconds = 0.0
+        self.rejects = pd.DataFrame()
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows_read / self.seconds if self.seconds > 0 else 0.0
+
+    def _add_rejects(self, rejects: pd.DataFrame):
+        self.rows_rejected += len(rejects)
+        room = self.SAMPLE_REJECTS - len(self.rejects)
+        if room > 0 and not rejects.empty:
+            sample = rejects.head(room)
+            self.rejects = sample if self.rejects.empty else pd.concat([self.rejects, sample], ignore_index=True)
+
+    def summary(self) -> str:
+        return (f"{self.kind}: {self.rows_imported} imported, {self.rows_rejected} rejected "
+                f"of {self.rows_read} rows in {self.chunks} chunk(s), "
+                f"{self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/s)")
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "path": self.path, "rows_read": self.rows_read,
+                "rows_imported": self.rows_imported, "rows_rejected": self.rows_rejected,
+                "chunks": self.chunks, "seconds": round(self.seconds, 3),
+                "rows_per_sec": round(self.rows_per_sec, 1)}
+
+def read_chunks(path, chunksize=50_000, fmt=None):
+    """Yield DataFrame chunks from a CSV or JSON-lines file without loading it whole."""
+    fmt = fmt or ("jsonl" if os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson", ".json") else "csv")
+    if fmt == "csv":
+        # Everything as text: the schema layer does the type coercion
+        reader = pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False, na_values=[""])
+    elif fmt == "jsonl":
+        reader = pd.read_json(path, lines=True, chunksize=chunksize, dtype=False)
+    else:
+        raise ValueError(f"Unknown import format: {fmt!r}")
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+def import_file(controller, path, kind="sessions", chunksize=50_000, fmt=None, progress=None) -> ImportReport:
+    """Stream ``path`` into storage, one validated commit per chunk.
+
+    Memory stays bounded by ``chunksize``. ``progress(report)`` is called after
+    every chunk.
+    """
+    if kind not in ("sessions", "tasks"):
+        raise ValueError(f"Unknown import kind: {kind!r}")
+    add = controller.add_sessions_bulk if kind == "sessions" else controller.add_tasks_bulk
+    report = ImportReport(kind, path)
+    start = time.perf_counter()
+    for chunk in read_chunks(path, chunksize, fmt):
+        inserted, rejects = add(chunk)
+        report.rows_read += len(chunk)
+        report.rows_imported += len(inserted)
+        report.chunks += 1
+        report._add_rejects(rejects)
+        report.seconds = time.perf_counter() - start
+        if progress:
+            progress(report)
+    report.seconds = time.perf_counter() - start
+    return report
@@ -0,0 +1,112 @@
+import cProfile
+import functools
+import io
+import json
+import pstats
+import threading
+import time
+from collections import deque
+
+class _State:
+    enabled = False
+
+_state = _State()
+_lock = threading.Lock()
+_stats = {}
+
+WINDOW = 500  # latencies kept per name for the rolling percentiles
+
+class _Stat:
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+def enable(on=True):
+    _state.enabled = bool(on)
+
+def enabled() -> bool:
+    return _state.enabled
+
+def record(name: str, seconds: float):
+    with _lock:
+        s = _stats.get(name)
+        if s is None:
+            s = _stats[name] = _Stat()
+        s.count += 1
+        s.total += seconds
+        s.max = max(s.max, seconds)
+        s.recent.append(seconds)
+
+def timed(name: str):
+    """Decorator recording the call latency under ``name`` while instrumentation is on.
+
+    When off, the only overhead is one attribute check per call.
+    """
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not _state.enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - t0)
+        return inner
+    return wrap
+
+class timer:
+    """Context manager form of :func:`timed` for ad-hoc blocks."""
+    def __init__(self, name: str):
+        self.name = name
+        self.t0 = None
+
+    def __enter__(self):
+        if _state.enabled:
+            self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.t0 is not None:
+            record(self.name, time.perf_counter() - self.t0)
+        return False
+
+def summary() -> dict:
+    """name -> count, total, p50, p95 (over the last ``WINDOW`` calls) and max, in milliseconds."""
+    import numpy as np  # not at module level: the app imports this before its first paint
+    with _lock:
+        items = [(name, s.count, s.total, s.max, np.fromiter(s.recent, dtype=float)) for name, s in _stats.items()]
+    out = {}
+    for name, count, total, mx, recent in sorted(items):
+        p50, p95 = np.percentile(recent, [50, 95]) if len(recent) else (0.0, 0.0)
+        out[name] = {"count": count, "total_ms": total * 1000, "p50_ms": p50 * 1000,
+                     "p95_ms": p95 * 1000, "max_ms": mx * 1000}
+    return out
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+def to_json(extra=None) -> str:
+    out = {"enabled": _state.enabled, "window": WINDOW, "timings": summary()}
+    if extra:
+        out.update(extra)
+    return json.dumps(out, indent=2, default=float) + "\n"
+
+def profile(fn, path=None, top=25) -> str:
+    """Run ``fn()`` under cProfile; dump the raw stats to ``path`` and return the top entries as text."""
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        fn()
+    finally:
+        prof.disable()
+    if path:
+        prof.dump_stats(path)
+    buf = io.StringIO()
+    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+    return buf.getvalue()
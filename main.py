@@ -6,13 +6,35 @@ Run: python main.py
 import tkinter as tk
 from tkinter import ttk, messagebox
 import os
-from storage import Storage
-from controllers import AppController
-from ui import DashboardTab, SessionsTab, TasksTab, AnalyticsTab, SettingsTab
+import threading
+import instrument
+import warmstart
+from ui import DashboardTab, SessionsTab, TasksTab, PlanTab, AnalyticsTab, SettingsTab, DiagnosticsTab
 
 APP_TITLE = "NeuroStudy Coach — Adaptive Study Planner & Focus Analytics"
+DATA_DIR = "data"
+
+# Built the first time they are selected: (attribute, label, class)
+LAZY_TABS = (
+    ("sessions_tab", "⏱️ Sessions", SessionsTab),
+    ("tasks_tab", "📝 Tasks", TasksTab),
+    ("plan_tab", "🗓️ Plan", PlanTab),
+    ("analytics_tab", "📈 Analytics", AnalyticsTab),
+    ("settings_tab", "⚙️ Settings", SettingsTab),
+    ("diagnostics_tab", "🩺 Diagnostics", DiagnosticsTab),
+)
+
+def load_data_layer():
+    """Import pandas-backed modules and open storage; runs off the Tk thread."""
+    from storage import Storage
+    from controllers import AppController
+    import widgets, report  # noqa: F401  (warm the imports the tabs need)
+    storage = Storage(base_dir=DATA_DIR, backend=os.environ.get("NEUROSTUDY_BACKEND", "csv"))
+    return AppController(storage)
 
 class App(tk.Tk):
+    BOOT_POLL_MS = 30
+
     def __init__(self):
         super().__init__()
         self.title(APP_TITLE)
@@ -24,39 +46,113 @@ class App(tk.Tk):
         except Exception:
             pass
 
-        # Shared services
-        self.storage = Storage(base_dir="data")
-        self.controller = AppController(self.storage)
+        # Timings are cheap next to disk and pandas work; NEUROSTUDY_DIAGNOSTICS=0 turns them off
+        instrument.enable(os.environ.get("NEUROSTUDY_DIAGNOSTICS", "1") != "0")
+
+        # Shared services arrive from a worker thread once pandas and storage are loaded
+        self.storage = None
+        self.controller = None
 
         # Notebook
         self.nb = ttk.Notebook(self)
         self.nb.pack(fill="both", expand=True)
 
-        # Tabs
-        self.dashboard_tab = DashboardTab(self.nb, self.controller)
-        self.sessions_tab  = SessionsTab(self.nb, self.controller)
-        self.tasks_tab     = TasksTab(self.nb, self.controller)
-        self.analytics_tab = AnalyticsTab(self.nb, self.controller)
-        self.settings_tab  = SettingsTab(self.nb, self.controller)
-
+        # The dashboard paints last run's snapshot right away; other tabs get an empty page for now
+        self.dashboard_tab = DashboardTab(self.nb)
         self.nb.add(self.dashboard_tab, text="📊 Dashboard")
-        self.nb.add(self.sessions_tab,  text="⏱️ Sessions")
-        self.nb.add(self.tasks_tab,     text="📝 Tasks")
-        self.nb.add(self.analytics_tab, text="📈 Analytics")
-        self.nb.add(self.settings_tab,  text="⚙️ Settings")
+        cached = warmstart.load(DATA_DIR)
+        if cached:
+            try:
+                self.dashboard_tab.show_cached(cached)
+            except (KeyError, TypeError, ValueError):
+                pass
+        self._pages = {}
+        for attr, text, cls in LAZY_TABS:
+            page = ttk.Frame(self.nb)
+            self.nb.add(page, text=text)
+            self._pages[str(page)] = (attr, cls)
+            setattr(self, attr, None)
+
+        self._stale = set()
+        self.nb.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        self._boot = {}
+        threading.Thread(target=self._load, daemon=True).start()
+        self.after(self.BOOT_POLL_MS, self._poll_boot)
+
+    # --- Startup ---
+    def _load(self):
+        try:
+            self._boot["controller"] = load_data_layer()
+        except Exception as e:
+            self._boot["error"] = e
+
+    def _poll_boot(self):
+        if not self._boot:
+            self.after(self.BOOT_POLL_MS, self._poll_boot)
+            return
+        if "error" in self._boot:
+            messagebox.showerror("Error", f"Could not open the data folder: {self._boot['error']}")
+            self.destroy()
+            return
+        self.controller = self._boot["controller"]
+        self.storage = self.controller.storage
+        # Writes are made on the Tk thread; handle their changes once the writing callback returns
+        self.controller.subscribe(lambda change: self.after_idle(self._on_change, change))
+        self.dashboard_tab.attach(self.controller)
+        self._on_tab_changed()
+
+    def _on_close(self):
+        # Edits are group-committed a moment after they are made; write out the last ones
+        if self.controller is not None:
+            try:
+                self.controller.close()
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not save the last changes: {e}")
+        self.destroy()
+
+    def _tab(self, page_name, build=False):
+        """The tab shown on notebook page ``page_name``, building it if asked and not built yet."""
+        if page_name == str(self.dashboard_tab):
+            return self.dashboard_tab
+        attr, cls = self._pages[page_name]
+        tab = getattr(self, attr)
+        if tab is None and build and self.controller is not None:
+            extra = {"tabs": self._built_tabs} if cls is DiagnosticsTab else {}
+            tab = cls(self.nb.nametowidget(page_name), self.controller, **extra)
+            tab.pack(fill="both", expand=True)
+            setattr(self, attr, tab)
+            self._stale.add(tab)
+        return tab
+
+    def _built_tabs(self):
+        tabs = [self.dashboard_tab, self.sessions_tab, self.tasks_tab, self.plan_tab, self.analytics_tab]
+        return [t for t in tabs if t is not None]
 
-        self.bind("<<DataChanged>>", self._on_data_changed)
-        self.after(300, self.dashboard_tab.refresh)
+    def _on_change(self, change):
+        # Only tabs showing the changed kind react: the one on screen patches itself
+        # (or refreshes), the others catch up when selected
+        current = self._tab(self.nb.select())
+        for tab in self._built_tabs():
+            if change.kind not in tab.SHOWS:
+                continue
+            if tab is not current:
+                self._stale.add(tab)
+            elif hasattr(tab, "on_change"):
+                tab.on_change(change)
+            else:
+                tab.refresh()
 
-    def _on_data_changed(self, _evt=None):
-        # Refresh everybody lightly
-        self.dashboard_tab.refresh()
-        self.tasks_tab.refresh()
-        self.sessions_tab.refresh()
-        self.analytics_tab.refresh()
+    def _on_tab_changed(self, _evt=None):
+        current = self._tab(self.nb.select(), build=True)
+        if current in self._stale:
+            self._stale.discard(current)
+            current.refresh()
 
 if __name__ == "__main__":
     # Ensure data directory exists
-    os.makedirs("data", exist_ok=True)
+    os.makedirs(DATA_DIR, exist_ok=True)
     app = App()
     app.mainloop()
@@ -0,0 +1,93 @@
+"""
+Headless entry point for NeuroStudy Coach.
+
+    python -m neurostudy report --data-dir data [--format text|json|csv] [--output FILE]
+    python -m neurostudy import sessions history.csv --data-dir data
+    python -m neurostudy cohort "profiles/*" [--workers N] [--format text|json|csv] [--output FILE]
+"""
+import argparse
+import os
+import sys
+
+def _storage(args, read_only=False):
+    # Read-only for analytics: a mistyped --data-dir must not be filled with sample data
+    from storage import Storage
+    if not os.path.isdir(args.data_dir):
+        raise SystemExit(f"Data directory not found: {args.data_dir}")
+    try:
+        return Storage(base_dir=args.data_dir, backend=args.backend, read_only=read_only)
+    except FileNotFoundError as e:
+        raise SystemExit(f"No NeuroStudy data in {args.data_dir}: {e}")
+
+def cmd_report(args):
+    from report import build_report, FORMATS
+    report = build_report(_storage(args, read_only=True), chunksize=args.chunksize)
+    text = FORMATS[args.format](report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+def cmd_cohort(args):
+    from cohort import run_cohort, FORMATS
+    cohort = run_cohort(args.dirs, workers=args.workers, backend=args.backend, chunksize=args.chunksize,
+                        timeout=args.timeout)
+    text = FORMATS[args.format](cohort)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0 if cohort["loaded"] else 1
+
+def cmd_import(args):
+    from controllers import AppController
+    from importer import import_file
+    controller = AppController(_storage(args))
+    try:
+        report = import_file(controller, args.path, kind=args.kind, chunksize=args.chunksize, fmt=args.fmt,
+                             progress=lambda r: print(r.summary(), file=sys.stderr))
+    finally:
+        controller.storage.close()
+    print(report.summary())
+    if report.rows_rejected:
+        print(report.rejects.to_string(max_rows=20))
+    return 0
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="neurostudy", description="NeuroStudy Coach command line tools")
+    p.add_argument("--data-dir", default="data")
+    p.add_argument("--backend", default=os.environ.get("NEUROSTUDY_BACKEND", "csv"), choices=["csv", "sqlite", "partitioned"])
+    sub = p.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("report", help="compute the analytics report without the GUI")
+    r.add_argument("--format", default="text", choices=["text", "json", "csv"])
+    r.add_argument("--output", help="write to this file instead of stdout")
+    r.add_argument("--chunksize", type=int, default=100_000, help="session rows read per chunk")
+    r.set_defaults(func=cmd_report)
+
+    i = sub.add_parser("import", help="stream sessions or tasks from a CSV/JSON-lines file")
+    i.add_argument("kind", choices=["sessions", "tasks"])
+    i.add_argument("path")
+    i.add_argument("--format", dest="fmt", choices=["csv", "jsonl"])
+    i.add_argument("--chunksize", type=int, default=50_000)
+    i.set_defaults(func=cmd_import)
+
+    c = sub.add_parser("cohort", help="merge the analytics of many data directories (one per student)")
+    c.add_argument("dirs", nargs="+", help="data directories or globs, e.g. 'profiles/*'")
+    c.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    c.add_argument("--timeout", type=float, help="give up on profiles not done after this many seconds")
+    c.add_argument("--format", default="text", choices=["text", "json", "csv"])
+    c.add_argument("--output", help="write to this file instead of stdout")
+    c.add_argument("--chunksize", type=int, default=100_000, help="session rows read per chunk")
+    c.set_defaults(func=cmd_cohort)
+    return p
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from storage import (CsvBackend, SESSION_COLUMNS, _filter_dates, _session_notes, _sample_rows, _shared, replace_file,
+                     write_synced)
+from schema import compact_sessions, concat_compact
+
+INVALID = "invalid"  # partition for rows whose date is not YYYY-MM-DD
+_ISO_DATE = r"^\d{4}-\d{2}-\d{2}$"
+
+def _month_keys(dates: pd.Series) -> np.ndarray:
+    text = dates.astype(str).str.strip()
+    return np.where(text.str.match(_ISO_DATE), text.str[:7], INVALID)
+
+def _entry(df: pd.DataFrame) -> dict:
+    """Manifest entry for the raw rows of one partition."""
+    dates = df["date"].astype(str).str.strip()
+    dates = dates[dates.str.match(_ISO_DATE)]
+    ids = pd.to_numeric(df["id"], errors="coerce").dropna()
+    minutes = pd.to_numeric(df["duration_min"], errors="coerce").fillna(0)
+    g = minutes.groupby(df["subject"].astype(object).fillna("").astype(str)).agg(["size", "sum"])
+    return {
+        "rows": len(df),
+        "min_date": dates.min() if len(dates) else None,
+        "max_date": dates.max() if len(dates) else None,
+        "min_id": int(ids.min()) if len(ids) else None,
+        "max_id": int(ids.max()) if len(ids) else None,
+        "subjects": {s: {"sessions": int(r["size"]), "minutes": float(r["sum"])} for s, r in g.iterrows()},
+    }
+
+def _merge_entry(a: dict, b: dict) -> dict:
+    def pick(f, x, y):
+        return y if x is None else x if y is None else f(x, y)
+    subjects = {s: dict(v) for s, v in a["subjects"].items()}
+    for s, v in b["subjects"].items():
+        cur = subjects.setdefault(s, {"sessions": 0, "minutes": 0.0})
+        cur["sessions"] += v["sessions"]
+        cur["minutes"] += v["minutes"]
+    return {
+        "rows": a["rows"] + b["rows"],
+        "min_date": pick(min, a["min_date"], b["min_date"]),
+        "max_date": pick(max, a["max_date"], b["max_date"]),
+        "min_id": pick(min, a["min_id"], b["min_id"]),
+        "max_id": pick(max, a["max_id"], b["max_id"]),
+        "subjects": subjects,
+    }
+
+class PartitionedBackend(CsvBackend):
+    """Sessions split into one CSV per month under ``<base_dir>/sessions/``.
+
+    ``manifest.json`` records each partition's date and id range, row count
+    and per-subject totals, so range queries open only the partitions that
+    overlap and whole-history totals need no partition at all. Inserts append
+    to their month's file; a delete rewrites that one month. Tasks use the
+    regular CSV snapshot + journal. A new layout is filled from
+    ``sessions.csv`` when it exists, otherwise seeded with the sample rows.
+    """
+    TABLES = ("tasks",)
+
+    def __init__(self, base_dir="data", read_only=False):
+        self.part_dir = os.path.join(base_dir, "sessions")
+        self.manifest_path = os.path.join(self.part_dir, "manifest.json")
+        self._parts = {}       # month -> (file stamp, compact frame)
+        self._notes = {}       # month -> (file stamp, notes by id)
+        self._view = None      # (stamps, whole-history frame)
+        self._parts_stamp = None
+        if read_only and not os.path.isdir(self.part_dir):
+            raise FileNotFoundError(f"Missing session partitions: {self.part_dir}")
+        super().__init__(base_dir, read_only=read_only)
+        if not os.path.exists(self.manifest_path) and not read_only:
+            self._migrate()
+        self._manifest = self._read_manifest()
+
+    # --- Manifest ---
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)["partitions"]
+        except (OSError, ValueError, KeyError):
+            return self.rebuild_manifest()
+
+    def _save_manifest(self):
+        data = {"version": 1, "partitions": self._manifest}
+        replace_file(self.manifest_path, lambda f: json.dump(data, f, indent=1, sort_keys=True))
+
+    def rebuild_manifest(self) -> dict:
+        """Recompute the manifest from the partition files (after editing them by hand)."""
+        with self._lock:
+            self._manifest = {}
+            for name in sorted(os.listdir(self.part_dir)):
+                if name.endswith(".csv"):
+                    month = name[:-4]
+                    self._manifest[month] = _entry(self._read_csv(self._part_path(month), "sessions"))
+            if not self.read_only:
+                self._save_manifest()
+            return self._manifest
+
+    def _migrate(self):
+        os.makedirs(self.part_dir, exist_ok=True)
+        legacy = self.paths["sessions"]
+        if os.path.exists(legacy):
+            csv = CsvBackend(self.base_dir)
+            df = csv.load_sessions()
+            df = df.assign(notes=csv.load_session_notes(df["id"]).to_numpy())
+        else:
+            df = pd.DataFrame(_sample_rows()[0])
+        self._manifest = {}
+        self._write_all(df)
+
+    # --- Partitions ---
+    def _part_path(self, month) -> str:
+        return os.path.join(self.part_dir, f"{month}.csv")
+
+    def _months(self, start=None, end=None) -> list:
+        """Partitions whose date range overlaps [start, end], in month order."""
+        out = []
+        for month, e in sorted(self._manifest.items()):
+            if start is None and end is None:
+                out.append(month)
+            elif month != INVALID and e["min_date"] is not None:
+                if (end is None or e["min_date"] <= str(end)) and (start is None or e["max_date"] >= str(start)):
+                    out.append(month)
+        return out
+
+    def _stamps(self, months) -> tuple:
+        return tuple(self._stat(self._part_path(m)) for m in months)
+
+    def _part(self, month) -> pd.DataFrame:
+        stamp = self._stat(self._part_path(month))
+        cached = self._parts.get(month)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, compact_sessions(self._read_csv(self._part_path(month), "sessions", notes=False)))
+            self._parts[month] = cached
+        return cached[1]
+
+    def _load_months(self, months) -> pd.DataFrame:
+        frames = [self._part(m) for m in months]
+        frames = [f for f in frames if not f.empty] or frames[:1]
+        if not frames:
+            return compact_sessions(pd.DataFrame(columns=[c for c in SESSION_COLUMNS if c != "notes"]))
+        return concat_compact(*frames) if len(frames) > 1 else _shared(frames[0])
+
+    def _write_all(self, df: pd.DataFrame):
+        # Full rewrite: one file per month, stale month files removed
+        self._writable()
+        with self._lock:
+            self.flush()
+            df = df.reindex(columns=SESSION_COLUMNS)
+            months = _month_keys(df["date"])
+            keep = set()
+            for month, part in df.groupby(months, sort=True):
+                replace_file(self._part_path(month), lambda f: part.to_csv(f, index=False))
+                self._manifest[month] = _entry(part)
+                keep.add(month)
+            for month in list(self._manifest):
+                if month not in keep:
+                    if os.path.exists(self._part_path(month)):
+                        os.remove(self._part_path(month))
+                    del self._manifest[month]
+            self._save_manifest()
+            self._parts_changed()
+
+    def _append_rows(self, df: pd.DataFrame):
+        # Session rows are written straight to their month; the group commit only
+        # covers the tasks journal and the id sequence, flushed first to keep ids ahead
+        self._writable()
+        with self._lock:
+            self.flush()
+            df = df.reindex(columns=SESSION_COLUMNS)
+            for month, part in df.groupby(_month_keys(df["date"]), sort=True):
+                path = self._part_path(month)
+                exists = os.path.exists(path) and os.path.getsize(path) > 0
+                if exists:
+                    with open(path, "rb") as f:
+                        f.seek(-1, os.SEEK_END)
+                        needs_newline = f.read(1) != b"\n"
+                def write(f):
+                    if exists and needs_newline:
+                        f.write("\n")
+                    part.to_csv(f, header=not exists, index=False)
+                write_synced(path, write, mode="a")
+                old = self._manifest.get(month)
+                self._manifest[month] = _entry(part) if old is None else _merge_entry(old, _entry(part))
+            self._save_manifest()
+            self._parts_changed()
+
+    def _parts_changed(self):
+        self._parts_stamp = self._stamps_all()
+        self._version += 1
+
+    def _stamps_all(self) -> tuple:
+        return (self._stat(self.manifest_path),) + self._stamps(sorted(self._manifest))
+
+    @property
+    def data_version(self) -> int:
+        return self._sync()
+
+    def _sync(self) -> int:
+        """Pick up changes made behind our back; returns the data version."""
+        with self._lock:
+            for kind in self.TABLES:
+                self._check(kind)
+            stamp = self._stamps_all()
+            if stamp != self._parts_stamp:
+                if self._parts_stamp is not None and stamp[0] != self._parts_stamp[0]:
+                    self._manifest = self._read_manifest()
+                    stamp = self._stamps_all()
+                self._parts_stamp = stamp
+                self._version += 1
+            return self._version
+
+    def _load_ids(self) -> dict:
+        ids = super()._load_ids()
+        if "sessions" not in ids:
+            ids["sessions"] = max([e["max_id"] for e in self._manifest.values() if e["max_id"] is not None] or [0])
+            if not self.read_only:
+                self._save_ids(ids)
+        return ids
+
+    # --- Sessions ---
+    def load_sessions(self, start=None, end=None) -> pd.DataFrame:
+        with self._lock:
+            self._sync()
+            if start is None and end is None:
+                months = self._months()
+                stamps = self._stamps(months)
+                if self._view is None or self._view[0] != stamps:
+                    self._view = (stamps, self._load_months(months))
+                return _shared(self._view[1])
+            df = self._load_months(self._months(start, end))
+        return _filter_dates(df, start, end)
+
+    def save_sessions(self, df: pd.DataFrame):
+        self._write_all(df)
+        if not df.empty:
+            with self._lock:
+                self._ids["sessions"] = max(self._ids["sessions"], int(pd.to_numeric(df["id"]).max()))
+                self._save_ids(self._ids)
+
+    def insert_session(self, row: dict) -> dict:
+        row = dict(row, id=self._allocate_id("sessions"))
+        self._append_rows(pd.DataFrame([row]))
+        return row
+
+    def insert_sessions(self, df: pd.DataFrame) -> pd.DataFrame:
+        self._writable()
+        with self._lock:
+            first = self._ids["sessions"] + 1
+            self._ids["sessions"] += len(df)
+            self._save_ids(self._ids)
+            df = df.assign(id=np.arange(first, first + len(df)))
+            self._append_rows(df)
+        return df
+
+    def delete_session(self, row_id: int):
+        self._writable()
+        row_id = int(row_id)
+        with self._lock:
+            for month, e in sorted(self._manifest.items()):
+                if e["min_id"] is None or not e["min_id"] <= row_id <= e["max_id"]:
+                    continue
+                if not (self._part(month)["id"] == row_id).any():
+                    continue
+                df = self._read_csv(self._part_path(month), "sessions")
+                df = df[df["id"] != row_id]
+                if df.empty:
+                    os.remove(self._part_path(month))
+                    del self._manifest[month]
+                else:
+                    replace_file(self._part_path(month), lambda f: df.to_csv(f, index=False))
+                    self._manifest[month] = _entry(df)
+                self._save_manifest()
+                self._parts_changed()
+                return
+
+    def load_session_notes(self, ids=None) -> pd.Series:
+        with self._lock:
+            if ids is None:
+                months = self._months()
+            else:
+                ids = [int(i) for i in ids]
+                lo, hi = (min(ids), max(ids)) if ids else (0, -1)
+                months = [m for m, e in sorted(self._manifest.items())
+                          if e["min_id"] is not None and e["min_id"] <= hi and e["max_id"] >= lo]
+            parts = []
+            for month in months:
+                stamp = self._stat(self._part_path(month))
+                cached = self._notes.get(month)
+                if cached is None or cached[0] != stamp:
+                    raw = pd.read_csv(self._part_path(month), usecols=["id", "notes"], dtype={"notes": str},
+                                      keep_default_na=False)
+                    cached = self._notes[month] = (stamp, _session_notes(raw))
+                parts.append(cached[1])
+        notes = pd.concat(parts) if parts else pd.Series(dtype=object)
+        return notes if ids is None else notes.reindex(ids).fillna("")
+
+    def iter_sessions(self, chunksize=100_000):
+        with self._lock:
+            months = self._months()
+        for month in months:
+            try:
+                reader = pd.read_csv(self._part_path(month), chunksize=chunksize, low_memory=False)
+            except (OSError, pd.errors.EmptyDataError):
+                continue
+            for chunk in reader:
+                yield chunk
+
+    def session_totals(self) -> pd.DataFrame:
+        """Per-subject sessions and minutes straight from the manifest; no partition is read."""
+        with self._lock:
+            self._sync()
+            total = {}
+            for e in self._manifest.values():
+                for s, v in e["subjects"].items():
+                    cur = total.setdefault(s, [0, 0.0])
+                    cur[0] += v["sessions"]
+                    cur[1] += v["minutes"]
+        return pd.DataFrame([(s, n, m) for s, (n, m) in sorted(total.items())],
+                            columns=["subject", "sessions", "minutes"])
+
+    def partitions(self) -> pd.DataFrame:
+        """The manifest as a frame: one row per month with its date/id range and row count."""
+        with self._lock:
+            self._sync()
+            rows = [{"month": m, **{k: v for k, v in e.items() if k != "subjects"}} for m, e in sorted(self._manifest.items())]
+        return pd.DataFrame(rows, columns=["month", "rows", "min_date", "max_date", "min_id", "max_id"])
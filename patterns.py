@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+SLOTS = 7 * 24  # hour-of-week slots, Monday 00:00 is slot 0
+MINUTES_PER_DAY = 24 * 60
+
+def week_spans(day, start_min, end_min, duration_min):
+    """Minute of the week each session starts at, and how many clock minutes it spans.
+
+    The span runs from ``start_min`` to ``end_min`` (wrapping past midnight);
+    rows without an end time, or whose end equals the start, use
+    ``duration_min`` instead.
+    """
+    start = np.asarray(start_min, dtype=np.int64)
+    end = np.asarray(end_min, dtype=np.int64)
+    span = np.where(end >= 0, (end - start) % MINUTES_PER_DAY, 0)
+    span = np.where(span > 0, span, np.asarray(duration_min, dtype=np.int64))
+    weekday = (np.asarray(day, dtype=np.int64) + 3) % 7  # day 0 (1970-01-01) was a Thursday
+    return weekday * MINUTES_PER_DAY + start, span
+
+def spread(t0, span):
+    """``(slot, minutes, row)`` for every hour-of-week slot a session overlaps.
+
+    A session from 09:40 to 11:10 gives three entries: 20 minutes in the 09
+    slot, 60 in the 10 slot and 10 in the 11 slot. Sessions running past
+    Sunday midnight wrap to Monday. Zero-length sessions give none.
+    """
+    t0 = np.asarray(t0, dtype=np.int64)
+    span = np.asarray(span, dtype=np.int64)
+    first = t0 // 60
+    count = np.where(span > 0, (t0 + span - 1) // 60 - first + 1, 0)
+    row = np.repeat(np.arange(len(t0)), count)
+    hour = first[row] + np.arange(len(row)) - np.repeat(np.cumsum(count) - count, count)
+    lo = np.maximum(t0[row], hour * 60)
+    hi = np.minimum(t0[row] + span[row], (hour + 1) * 60)
+    return hour % SLOTS, hi - lo, row
+
+def week_sums(t0, span, mood, energy):
+    """Per-slot ``(sessions, minutes, mood_sum, energy_sum)``.
+
+    Sessions are counted in the slot they start in; mood and energy are
+    weighted by the minutes spent in each slot.
+    """
+    slot, minutes, row = spread(t0, span)
+    return (np.bincount(np.asarray(t0, dtype=np.int64) // 60 % SLOTS, minlength=SLOTS),
+            np.bincount(slot, weights=minutes, minlength=SLOTS),
+            np.bincount(slot, weights=minutes * np.asarray(mood, dtype=float)[row], minlength=SLOTS),
+            np.bincount(slot, weights=minutes * np.asarray(energy, dtype=float)[row], minlength=SLOTS))
+
+def heatmap_table(n, minutes, mood, energy) -> pd.DataFrame:
+    """All 168 slots as ``weekday, hour, sessions, minutes, avg_mood, avg_energy`` (NaN where unstudied)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_mood = np.where(minutes > 0, mood / minutes, np.nan)
+        avg_energy = np.where(minutes > 0, energy / minutes, np.nan)
+    return pd.DataFrame({
+        "weekday": np.repeat(np.arange(7), 24), "hour": np.tile(np.arange(24), 7),
+        "sessions": np.asarray(n, dtype=np.int64), "minutes": np.asarray(minutes, dtype=float),
+        "avg_mood": avg_mood, "avg_energy": avg_energy,
+    })
+
+def best_window(table: pd.DataFrame, span=2, min_share=0.1):
+    """``(weekday, hour)`` starting the ``span``-hour block with the best minute-weighted mood/energy.
+
+    Blocks stay within one day. Blocks with less than ``min_share`` of the
+    busiest block's minutes are ignored, so one lucky session does not win.
+    Returns None if nothing has been studied.
+    """
+    minutes = table["minutes"].to_numpy(dtype=float).reshape(7, 24)
+    score = (table["avg_mood"].fillna(0).to_numpy() * 0.6
+             + table["avg_energy"].fillna(0).to_numpy() * 0.4).reshape(7, 24) * minutes
+
+    def windows(a):
+        c = np.concatenate([np.zeros((7, 1)), np.cumsum(a, axis=1)], axis=1)
+        return (c[:, span:] - c[:, :-span]).ravel()
+    win_min, win_score = windows(minutes), windows(score)
+    if win_min.max(initial=0) <= 0:
+        return None
+    ok = win_min >= max(min_share * win_min.max(), 1e-9)
+    avg = np.where(ok, win_score / np.where(ok, win_min, 1), -np.inf)
+    best = np.lexsort((win_min, avg))[-1]
+    return divmod(int(best), 25 - span)
+
+def streaks(days, today=None) -> dict:
+    """Streak and gap stats over study days (day numbers, any order).
+
+    ``current`` counts the run of consecutive study days ending today or
+    yesterday (0 otherwise); ``today`` defaults to the latest study day.
+    Gaps are runs of days without study between two study days.
+    """
+    d = np.unique(np.asarray(days, dtype=np.int64))
+    if not len(d):
+        return {"study_days": 0, "current": 0, "longest": 0, "longest_gap": 0, "mean_gap": 0.0,
+                "days_since": None, "active_ratio": 0.0}
+    step = np.diff(d)
+    runs = np.bincount(np.concatenate([[0], np.cumsum(step > 1)]))
+    gaps = step[step > 1] - 1
+    today = int(d[-1]) if today is None else int(today)
+    since = today - int(d[-1])
+    return {
+        "study_days": int(len(d)),
+        "current": int(runs[-1]) if 0 <= since <= 1 else 0,
+        "longest": int(runs.max()),
+        "longest_gap": int(gaps.max()) if len(gaps) else 0,
+        "mean_gap": round(float(gaps.mean()), 1) if len(gaps) else 0.0,
+        "days_since": since,
+        "active_ratio": round(len(d) / float(d[-1] - d[0] + 1), 3),
+    }
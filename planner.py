@@ -0,0 +1,195 @@
+from bisect import bisect_left, insort
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from aggregates import OPEN_STATUSES
+from analytics import PRIORITY_RANK
+from schema import parse_day, day_to_iso, parse_hhmm
+from storage import DEFAULT_SETTINGS
+
+# Hours tried, in this order, on weekdays (and hours) with no study history
+DEFAULT_HOURS = (9, 10, 11, 14, 15, 16, 17, 19, 20, 8, 13, 18, 21)
+NO_DEADLINE = 1 << 40
+PLAN_COLUMNS = ["date", "start", "end", "task_id", "title", "subject", "block", "deadline", "late"]
+_CLOCK = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60 + 1)], dtype=object)
+
+def hour_scores(heatmap: pd.DataFrame) -> np.ndarray:
+    """7×24 mood/energy score per weekday and hour from ``analytics.focus_heatmap``.
+
+    Hours never studied on a weekday take that hour's score over the whole
+    week; hours never studied at all stay NaN.
+    """
+    if heatmap is None or len(heatmap) != 7 * 24:
+        return np.full((7, 24), np.nan)
+    minutes = heatmap["minutes"].to_numpy(dtype=float).reshape(7, 24)
+    score = (heatmap["avg_mood"].to_numpy(dtype=float) * 0.6
+             + heatmap["avg_energy"].to_numpy(dtype=float) * 0.4).reshape(7, 24)
+    weighted = np.nan_to_num(score) * minutes
+    with np.errstate(invalid="ignore", divide="ignore"):
+        week = np.where(minutes.sum(axis=0) > 0, weighted.sum(axis=0) / minutes.sum(axis=0), np.nan)
+    return np.where(minutes > 0, score, week)
+
+def day_blocks(scores: np.ndarray, count: int, pomodoro: int, short_break: int, long_break: int, every: int) -> np.ndarray:
+    """Start minutes of up to ``count`` Pomodoro blocks in one day, in the best-scoring hours.
+
+    Hours are taken best first until the blocks fit; blocks run back to back
+    through adjacent chosen hours with a short break after each and a long
+    break after every ``every``-th. Nothing crosses midnight.
+    """
+    scored = [int(h) for h in np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind="stable") if not np.isnan(scores[h])]
+    ranked = scored + [h for h in DEFAULT_HOURS if h not in scored]
+    chosen = []
+    starts = []
+    for h in ranked:
+        chosen.append(h)
+        starts = _layout(sorted(chosen), count, pomodoro, short_break, long_break, every)
+        if len(starts) >= count:
+            break
+    return np.array(starts, dtype=np.int64)
+
+def _layout(hours, count, pomodoro, short_break, long_break, every):
+    starts, t, done = [], 0, 0
+    run_start = 0
+    for i, h in enumerate(hours):
+        if i == 0 or h != hours[i - 1] + 1:
+            run_start = h * 60
+        if i + 1 < len(hours) and hours[i + 1] == h + 1:
+            continue
+        # [run_start, run_end) is one stretch of adjacent chosen hours
+        run_end = h * 60 + 60
+        t = max(t, run_start)
+        while t + pomodoro <= run_end and len(starts) < count:
+            starts.append(t)
+            done += 1
+            t += pomodoro + (long_break if every > 0 and done % every == 0 else short_break)
+    return starts
+
+class Planner:
+    """Open tasks packed into Pomodoro blocks, earliest deadline first.
+
+    The open tasks are kept sorted by ``(deadline, priority, id)``, updated
+    in place by ``add_task``/``remove_task``/``update_task`` the way
+    :class:`aggregates.AggregateStore` is, so an edit costs one bisect.
+    Every task is available now, so earliest-deadline-first is this order;
+    tasks without a deadline come last, by priority. ``plan()`` lays the
+    tasks over the day's remaining blocks and then each weekday's block
+    template (from the focus heatmap) with prefix sums, so re-planning is a
+    few array passes. A task gets ``ceil(estimated_min / pomodoro_min)``
+    blocks (at least one); its last block is shortened to what is left.
+    """
+    def __init__(self):
+        self._tasks = {}   # id -> (key, title, subject, deadline, estimated_min, row) for open tasks
+        self._order = []   # sorted keys of open tasks
+        self._closed = {}  # id -> row of tasks that are not open, kept for status changes
+
+    def add_task(self, row: dict):
+        rid = int(row["id"])
+        self.remove_task(rid)
+        if row.get("status") not in OPEN_STATUSES:
+            self._closed[rid] = dict(row)
+            return
+        deadline = row.get("deadline")
+        deadline = deadline if isinstance(deadline, str) and deadline.strip() else None
+        day = parse_day(deadline) if deadline else None
+        key = (NO_DEADLINE if day is None else day, PRIORITY_RANK.get(str(row.get("priority")), len(PRIORITY_RANK)), rid)
+        try:
+            est = float(row.get("estimated_min") or 0)
+        except (TypeError, ValueError):
+            est = 0.0
+        subject = row.get("subject")
+        self._tasks[rid] = (key, str(row.get("title", "")), None if subject is None or subject != subject else str(subject),
+                            deadline, 0.0 if est != est else est, dict(row))
+        insort(self._order, key)
+
+    def add_tasks(self, tasks: pd.DataFrame):
+        for row in tasks.astype(object).where(tasks.notna(), None).to_dict("records"):
+            self.add_task(row)
+
+    def remove_task(self, row_id: int):
+        rid = int(row_id)
+        self._closed.pop(rid, None)
+        entry = self._tasks.pop(rid, None)
+        if entry is not None:
+            i = bisect_left(self._order, entry[0])
+            del self._order[i]
+
+    def update_task(self, row_id: int, **fields):
+        rid = int(row_id)
+        entry = self._tasks.get(rid)
+        row = entry[5] if entry is not None else self._closed.get(rid)
+        if row is not None:
+            self.add_task({**row, **fields})
+
+    def __len__(self):
+        return len(self._order)
+
+    @classmethod
+    def from_frame(cls, tasks: pd.DataFrame) -> "Planner":
+        planner = cls()
+        if tasks is not None and not tasks.empty:
+            planner.add_tasks(tasks)
+        return planner
+
+    # --- Planning ---
+    def plan(self, settings: dict, heatmap=None, daily_min=120, now=None) -> pd.DataFrame:
+        """One row per work block: ``date, start, end, task_id, title, subject, block, deadline, late``.
+
+        ``daily_min`` is the planned study time per day. Planning starts at
+        ``now`` (default: the current time), skipping today's blocks that have
+        already begun. ``late`` marks blocks of tasks that finish after their
+        deadline.
+        """
+        if not self._order:
+            return pd.DataFrame(columns=PLAN_COLUMNS)
+        settings = {**DEFAULT_SETTINGS, **settings}
+        pomodoro = max(1, int(settings["pomodoro_min"]))
+        breaks = (int(settings["short_break_min"]), int(settings["long_break_min"]), int(settings["long_break_every"]))
+        count = max(1, int(round(daily_min / pomodoro)))
+        scores = hour_scores(heatmap)
+        templates = [day_blocks(scores[wd], count, pomodoro, *breaks) for wd in range(7)]
+        now = now or datetime.now()
+        today = parse_day(now.strftime("%Y-%m-%d"))
+        now_min = parse_hhmm(now.strftime("%H:%M"))
+        first = templates[(today + 3) % 7]
+        first = first[first >= now_min]
+        # One week of blocks from tomorrow, as (day offset, start); later weeks repeat it
+        week = [(d, s) for d in range(1, 8) for s in templates[(today + d + 3) % 7].tolist()]
+        if not week:
+            return pd.DataFrame(columns=PLAN_COLUMNS)
+        week_day = np.array([d for d, _ in week], dtype=np.int64)
+        week_start = np.array([s for _, s in week], dtype=np.int64)
+
+        ids = np.array([k[2] for k in self._order], dtype=np.int64)
+        entries = [self._tasks[i] for i in ids.tolist()]
+        est = np.array([e[4] for e in entries])
+        blocks = np.maximum(np.ceil(est / pomodoro), 1).astype(np.int64)
+        task = np.repeat(np.arange(len(ids)), blocks)
+        nth = np.arange(len(task)) - np.repeat(np.cumsum(blocks) - blocks, blocks)
+        length = np.where(nth == blocks[task] - 1, est[task] - (blocks[task] - 1) * pomodoro, pomodoro)
+        length = np.where(length > 0, length, pomodoro).astype(np.int64)
+
+        # Block g goes to today's remaining blocks first, then to the repeating week
+        g = np.arange(len(task))
+        later = np.maximum(g - len(first), 0)
+        pos = later % len(week)
+        day = np.where(g < len(first), today, today + (later // len(week)) * 7 + week_day[pos])
+        start = np.where(g < len(first), np.append(first, 0)[np.minimum(g, len(first))], week_start[pos])
+        deadline_day = np.array([e[0][0] for e in entries], dtype=np.int64)
+        finish = day[np.cumsum(blocks) - 1]
+        late = (finish > deadline_day)[task]
+
+        days, inv = np.unique(day, return_inverse=True)
+        # "n/of" labels through the few distinct pairs rather than per-row string ops
+        base = int(blocks.max()) + 1
+        pairs, pair_inv = np.unique((nth + 1) * base + blocks[task], return_inverse=True)
+        labels = np.array([f"{p // base}/{p % base}" for p in pairs.tolist()], dtype=object)
+        return pd.DataFrame({
+            "date": np.array([day_to_iso(d) for d in days.tolist()], dtype=object)[inv],
+            "start": _CLOCK[start], "end": _CLOCK[np.minimum(start + length, 24 * 60)],
+            "task_id": ids[task],
+            "title": np.array([e[1] for e in entries], dtype=object)[task],
+            "subject": np.array([e[2] for e in entries], dtype=object)[task],
+            "block": labels[pair_inv],
+            "deadline": np.array([e[3] for e in entries], dtype=object)[task],
+            "late": late,
+        }, columns=PLAN_COLUMNS)
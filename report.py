@@ -0,0 +1,153 @@
+import io
+import json
+import pandas as pd
+from aggregates import AggregateStore
+from analytics import (productivity_by_hour, subject_pareto, forecast_hours_needed, best_focus_window,
+                       rolling_capacity, task_etas, focus_heatmap, study_streaks)
+from patterns import WEEKDAYS
+from schema import normalize_sessions
+
+def stream_aggregates(storage, chunksize=100_000):
+    """Aggregate the sessions table chunk by chunk; memory is bounded by ``chunksize``.
+
+    The forecast uses the profile's ``forecast_window`` setting, as in the app.
+    Returns ``(aggregates, rows_read, rejected, rejects_sample)``.
+    """
+    window = int(storage.load_settings()["forecast_window"])
+    total = AggregateStore(track_rows=False, window=window)
+    rows, rejected, sample = 0, 0, []
+    for chunk in storage.iter_sessions(chunksize):
+        typed, rejects = normalize_sessions(chunk)
+        partial = AggregateStore(track_rows=False, window=window)
+        partial.add_sessions_typed(typed)
+        total.merge(partial)
+        rows += len(chunk)
+        rejected += len(rejects)
+        if len(sample) < 10 and not rejects.empty:
+            sample.extend(rejects[["id","reason"]].head(10 - len(sample)).to_dict("records"))
+    return total, rows, rejected, sample
+
+def build_report(storage, chunksize=100_000) -> dict:
+    """Everything the Analytics tab shows, computed without loading sessions whole."""
+    aggs, rows, rejected, sample = stream_aggregates(storage, chunksize)
+    tasks = storage.load_tasks()
+    aggs.add_tasks(tasks)
+    prod = productivity_by_hour(aggs)
+    heat = focus_heatmap(aggs)
+    return {
+        "sessions": rows,
+        "open_tasks": aggs.open_tasks,
+        "forecast_hours": forecast_hours_needed(aggs),
+        "best_window": best_focus_window(heat),
+        "productivity": prod,
+        "pareto": subject_pareto(aggs),
+        "capacity": rolling_capacity(aggs),
+        "task_etas": task_etas(tasks, aggs),
+        "heatmap": heat,
+        "streaks": study_streaks(aggs),
+        "rejected": rejected,
+        "rejects": sample,
+    }
+
+def insight_lines(prod, pareto, hours, best, rejected=0, rejects=(), capacity=None, etas=None,
+                  heatmap=None, streaks=None) -> list:
+    """The human-readable insight report shared by the Analytics tab and the CLI.
+
+    ``rejected`` counts unparsable session rows; ``rejects`` is a sample of
+    them as ``{"id", "reason"}`` dicts. ``capacity``, ``etas``, ``heatmap``
+    and ``streaks`` come from the ``analytics`` functions of the same names.
+    """
+    lines = []
+    lines.append("🔥 Key Insights")
+    lines.append("")
+    lines.append(f"• Estimated hours needed to finish remaining tasks: {hours}")
+    lines.append(f"• Best focus window (based on mood/energy): {best}")
+    if capacity:
+        lines.append(f"• Pace: {capacity['last_7d']:.0f} min/day (7d), {capacity['last_30d']:.0f} min/day (30d), "
+                     f"~{capacity['next_7d']:.0f} min expected next week")
+    if streaks and streaks["study_days"]:
+        lines.append(f"• Streak: {streaks['current']} day(s) now, longest {streaks['longest']}; "
+                     f"longest gap {streaks['longest_gap']} day(s), studied on {streaks['active_ratio']:.0%} of days")
+    lines.append("")
+    lines.append("📌 Productivity by Hour:")
+    if prod.empty:
+        lines.append("  - Not enough data yet.")
+    else:
+        for _,r in prod.iterrows():
+            lines.append(f"  - {int(r['hour']):02d}:00 → avg mood {r['avg_mood']:.1f}, energy {r['avg_energy']:.1f}, total {int(r['total_min'])} min")
+    if heatmap is not None:
+        lines += slot_lines(heatmap)
+    lines.append("")
+    lines.append("📌 Subject Pareto:")
+    if pareto.empty:
+        lines.append("  - Not enough data yet.")
+    else:
+        for _,r in pareto.iterrows():
+            lines.append(f"  - {r['subject']}: {int(r['minutes_spent'])} min spent, {int(r['open_tasks'])} tasks open")
+    if etas is not None and not etas.empty:
+        lines.append("")
+        lines.append("📌 Task ETAs (deadline order, current pace):")
+        for _,r in etas.head(15).iterrows():
+            mark = "✅" if r["on_track"] else "⚠️"
+            lines.append(f"  - {mark} {r['title']}: due {r['deadline'] or 'no deadline'}, ETA {r['eta'] or 'n/a'}")
+    return lines + reject_lines(rejected, rejects)
+
+def slot_lines(heatmap, top=5) -> list:
+    # Best weekday × hour cells by mood/energy, among slots with a fair share of the study time
+    h = heatmap[heatmap["minutes"] >= 0.1 * heatmap["minutes"].max()]
+    if h.empty:
+        return []
+    h = h.assign(score=h["avg_mood"] * 0.6 + h["avg_energy"] * 0.4).sort_values(["score", "minutes"], ascending=False)
+    lines = ["", "📌 Best Weekly Slots:"]
+    for _,r in h.head(top).iterrows():
+        lines.append(f"  - {WEEKDAYS[int(r['weekday'])]} {int(r['hour']):02d}:00 → avg mood {r['avg_mood']:.1f}, "
+                     f"energy {r['avg_energy']:.1f}, total {int(r['minutes'])} min")
+    return lines
+
+def reject_lines(count, sample) -> list:
+    if not count:
+        return []
+    lines = ["", f"⚠️ {count} session row(s) could not be parsed and are left out:"]
+    for r in list(sample)[:10]:
+        lines.append(f"  - id {r['id']}: {r['reason']}")
+    return lines
+
+# --- Output formats ---
+def to_text(report: dict) -> str:
+    lines = insight_lines(report["productivity"], report["pareto"], report["forecast_hours"], report["best_window"],
+                          report["rejected"], report["rejects"], report["capacity"], report["task_etas"],
+                          report["heatmap"], report["streaks"])
+    lines += ["", f"Sessions: {report['sessions']}   Open tasks: {report['open_tasks']}"]
+    return "\n".join(lines) + "\n"
+
+def to_json(report: dict) -> str:
+    out = dict(report)
+    for key in ("productivity", "pareto", "task_etas", "heatmap"):
+        df = report[key]
+        out[key] = df.astype(object).where(df.notna(), None).to_dict("records")  # NaN is not valid JSON
+    return json.dumps(out, indent=2, ensure_ascii=False, default=lambda o: o.item() if hasattr(o, "item") else str(o)) + "\n"
+
+def to_csv(report: dict) -> str:
+    """Long format: one ``section,key,metric,value`` row per number."""
+    rows = [("summary", "", k, report[k]) for k in ("sessions", "open_tasks", "forecast_hours", "best_window", "rejected")]
+    for _, r in report["productivity"].iterrows():
+        for m in ("avg_mood", "avg_energy", "total_min"):
+            rows.append(("productivity", int(r["hour"]), m, r[m]))
+    for _, r in report["pareto"].iterrows():
+        for m in ("minutes_spent", "open_tasks"):
+            rows.append(("pareto", r["subject"], m, r[m]))
+    for m, v in report["capacity"].items():
+        rows.append(("capacity", "", m, v))
+    for m, v in report["streaks"].items():
+        rows.append(("streaks", "", m, v))
+    for _, r in report["heatmap"].query("sessions > 0 or minutes > 0").iterrows():
+        for m in ("sessions", "minutes", "avg_mood", "avg_energy"):
+            rows.append(("heatmap", f"{WEEKDAYS[int(r['weekday'])]} {int(r['hour']):02d}", m, r[m]))
+    for _, r in report["task_etas"].iterrows():
+        for m in ("cumulative_min", "eta", "on_track"):
+            rows.append(("task_eta", int(r["id"]), m, r[m]))
+    buf = io.StringIO()
+    pd.DataFrame(rows, columns=["section","key","metric","value"]).to_csv(buf, index=False)
+    return buf.getvalue()
+
+FORMATS = {"text": to_text, "json": to_json, "csv": to_csv}
@@ -0,0 +1,78 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+class RefreshScheduler:
+    """Debounced, off-thread refresh for one Tk widget.
+
+    ``request()`` may be called any number of times; calls within
+    ``delay_ms`` of each other collapse into one run. ``compute()`` runs on a
+    worker thread and must not touch Tk. Its result is handed to ``apply()``
+    on the Tk thread via ``after()``, unless ``version()`` moved on while it
+    was computing, in which case the result is dropped and the work re-run.
+    ``on_busy(bool)`` is called on the Tk thread when work starts and ends;
+    exceptions from ``compute()`` go to ``on_error`` instead of ``apply()``.
+    """
+    POLL_MS = 30
+
+    def __init__(self, widget, compute, apply, version=lambda: None, delay_ms=150, on_busy=None, on_error=None):
+        self.widget = widget
+        self.compute = compute
+        self.apply = apply
+        self.version = version
+        self.delay_ms = delay_ms
+        self.on_busy = on_busy or (lambda busy: None)
+        self.on_error = on_error or (lambda e: None)
+        self._after = None
+        self._running = False
+        self._again = False
+        self._results = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refresh")
+
+    def request(self):
+        """Schedule a refresh, restarting the debounce window."""
+        if self._after is not None:
+            self.widget.after_cancel(self._after)
+        self._after = self.widget.after(self.delay_ms, self._start)
+
+    def _start(self):
+        self._after = None
+        if self._running:
+            # One run is enough to catch up with everything requested meanwhile
+            self._again = True
+            return
+        self._running = True
+        self._again = False
+        self.on_busy(True)
+        token = self.version()
+        self._pool.submit(self._work, token)
+        self.widget.after(self.POLL_MS, self._poll)
+
+    def _work(self, token):
+        try:
+            self._results.put((token, self.compute(), None))
+        except Exception as e:
+            self._results.put((token, None, e))
+
+    def _poll(self):
+        try:
+            token, result, error = self._results.get_nowait()
+        except queue.Empty:
+            self.widget.after(self.POLL_MS, self._poll)
+            return
+        self._running = False
+        if token != self.version():
+            self._again = True
+        else:
+            self.on_busy(False)
+            if error is not None:
+                self.on_error(error)
+            else:
+                self.apply(result)
+        if self._again:
+            self._start()
+
+    def shutdown(self):
+        if self._after is not None:
+            self.widget.after_cancel(self._after)
+            self._after = None
+        self._pool.shutdown(wait=False)
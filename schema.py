@@ -0,0 +1,289 @@
+import re
+import numpy as np
+import pandas as pd
+from datetime import date, datetime
+
+TYPED_SESSION_COLUMNS = ["id","day","start_min","end_min","duration_min","subject","mood","energy"]
+REQUIRED_SESSION_COLUMNS = ["date","start_time","duration_min","subject","mood","energy"]
+TASK_STATUSES = ("Todo", "In Progress", "Done")
+_EPOCH = date(1970, 1, 1).toordinal()
+_HHMM = re.compile(r"^\s*(\d{1,2}):(\d{2})")
+
+def parse_hhmm(x):
+    """'HH:MM' -> minutes of day, or None."""
+    m = _HHMM.match(str(x))
+    if not m:
+        return None
+    h, mi = int(m.group(1)), int(m.group(2))
+    return h * 60 + mi if h < 24 and mi < 60 else None
+
+def parse_day(x):
+    """'YYYY-MM-DD' -> days since 1970-01-01, or None."""
+    try:
+        return datetime.strptime(str(x).strip(), "%Y-%m-%d").toordinal() - _EPOCH
+    except ValueError:
+        return None
+
+def day_to_iso(day: int) -> str:
+    return date.fromordinal(int(day) + _EPOCH).isoformat()
+
+def _small_int(x, lo=0, hi=10):
+    try:
+        v = float(x)
+    except (TypeError, ValueError):
+        return None
+    return int(v) if v == int(v) and lo <= v <= hi else None
+
+def parse_session(row: dict) -> dict:
+    """Typed values for one session row; raises ValueError naming the first bad field."""
+    out = {"id": row.get("id"), "day": parse_day(row.get("date")), "start_min": parse_hhmm(row.get("start_time"))}
+    end = parse_hhmm(row.get("end_time"))
+    out["end_min"] = -1 if end is None else end
+    out["duration_min"] = _small_int(row.get("duration_min"), 0, 24 * 60)
+    out["mood"] = _small_int(row.get("mood"))
+    out["energy"] = _small_int(row.get("energy"))
+    for col, src in (("day", "date"), ("start_min", "start_time"), ("duration_min", "duration_min"),
+                     ("mood", "mood"), ("energy", "energy")):
+        if out[col] is None:
+            raise ValueError(f"Invalid {src}: {row.get(src)!r}")
+    subject = row.get("subject")
+    out["subject"] = None if subject is None or (isinstance(subject, float) and np.isnan(subject)) else str(subject)
+    return out
+
+def normalize_sessions(df: pd.DataFrame):
+    """Parse a raw sessions frame once into typed columns.
+
+    Returns ``(typed, rejects)``. ``typed`` holds int32 ``day`` numbers,
+    int16 ``start_min``/``end_min`` (minutes of day, -1 if no end time),
+    int32 ``duration_min``, categorical ``subject`` and int8 ``mood``/``energy``.
+    ``rejects`` holds the raw rows that failed to parse plus a ``reason``.
+    """
+    missing = [c for c in REQUIRED_SESSION_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing session column(s): {', '.join(missing)}")
+    if df.empty:
+        typed = pd.DataFrame({
+            "id": np.array([], dtype=np.int64), "day": np.array([], dtype=np.int32),
+            "start_min": np.array([], dtype=np.int16), "end_min": np.array([], dtype=np.int16),
+            "duration_min": np.array([], dtype=np.int32), "subject": pd.Categorical([]),
+            "mood": np.array([], dtype=np.int8), "energy": np.array([], dtype=np.int8),
+        })
+        return typed, df.assign(reason=pd.Series(dtype=object))
+
+    dt = _text_values(df["date"], lambda t: pd.to_datetime(t.str.strip(), errors="coerce", format="%Y-%m-%d"))
+    day = dt.to_numpy().astype("datetime64[D]").astype(np.int64)
+    day_ok = dt.notna().to_numpy()
+
+    def minutes(text):
+        parts = text.str.extract(r"^\s*(\d{1,2}):(\d{2})")
+        h = pd.to_numeric(parts[0], errors="coerce").to_numpy()
+        m = pd.to_numeric(parts[1], errors="coerce").to_numpy()
+        ok = ~np.isnan(h) & ~np.isnan(m) & (h < 24) & (m < 60)
+        return pd.Series(np.where(ok, np.nan_to_num(h) * 60 + np.nan_to_num(m), -1))
+
+    def hhmm(col):
+        v = _text_values(df[col], minutes).to_numpy()
+        return v.astype(np.int16), v >= 0
+
+    start, start_ok = hhmm("start_time")
+    if "end_time" in df.columns:
+        end, _ = hhmm("end_time")
+    else:
+        end = np.full(len(df), -1, dtype=np.int16)
+
+    def small_int(col, lo, hi):
+        v = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+        ok = ~np.isnan(v) & (v >= lo) & (v <= hi) & (v == np.floor(v))
+        return np.where(ok, v, 0), ok
+
+    duration, duration_ok = small_int("duration_min", 0, 24 * 60)
+    mood, mood_ok = small_int("mood", 0, 10)
+    energy, energy_ok = small_int("energy", 0, 10)
+
+    reason = np.full(len(df), None, dtype=object)
+    # Report the first failing field per row, in column order
+    for ok, label in ((energy_ok, "energy"), (mood_ok, "mood"), (duration_ok, "duration_min"),
+                      (start_ok, "start_time"), (day_ok, "date")):
+        reason[~ok] = f"invalid {label}"
+    good = day_ok & start_ok & duration_ok & mood_ok & energy_ok
+
+    typed = pd.DataFrame({
+        "id": (pd.to_numeric(df["id"], errors="coerce").to_numpy() if "id" in df.columns
+               else np.arange(len(df)))[good].astype(np.int64),
+        "day": day[good].astype(np.int32),
+        "start_min": start[good],
+        "end_min": end[good],
+        "duration_min": duration[good].astype(np.int32),
+        "subject": (df["subject"].iloc[good].cat.remove_unused_categories().array
+                    if isinstance(df["subject"].dtype, pd.CategoricalDtype) else pd.Categorical(df["subject"].to_numpy()[good])),
+        "mood": mood[good].astype(np.int8),
+        "energy": energy[good].astype(np.int8),
+    })
+    cats = typed["subject"].cat.categories
+    if not all(isinstance(c, str) for c in cats):
+        typed["subject"] = typed["subject"].cat.rename_categories([str(c) for c in cats])
+    rejects = df[~good].assign(reason=reason[~good])
+    return typed, rejects
+
+def _hhmm_text(minutes: np.ndarray) -> pd.Series:
+    m = pd.Series(minutes, dtype=np.int64)
+    text = (m // 60).astype(str).str.zfill(2) + ":" + (m % 60).astype(str).str.zfill(2)
+    return text.where(m >= 0, "")
+
+def typed_to_rows(typed: pd.DataFrame, notes=None) -> pd.DataFrame:
+    """Canonical raw session rows (ISO date, HH:MM times, ints) for a typed frame."""
+    return pd.DataFrame({
+        "id": typed["id"].to_numpy(),
+        "date": typed["day"].to_numpy().astype("datetime64[D]").astype(str),
+        "start_time": _hhmm_text(typed["start_min"].to_numpy()).to_numpy(),
+        "end_time": _hhmm_text(typed["end_min"].to_numpy()).to_numpy(),
+        "duration_min": typed["duration_min"].to_numpy().astype(np.int64),
+        "subject": typed["subject"].astype(object).to_numpy(),
+        "mood": typed["mood"].to_numpy().astype(np.int64),
+        "energy": typed["energy"].to_numpy().astype(np.int64),
+        "notes": [""] * len(typed) if notes is None else notes,
+    })
+
+# --- Compact in-memory frames ---
+SESSION_CATEGORIES = ("date", "start_time", "end_time", "subject")
+SESSION_INTS = {"mood": np.int8, "energy": np.int8, "duration_min": np.int32}
+TASK_CATEGORIES = ("subject", "deadline", "priority", "status")
+TASK_INTS = {"estimated_min": np.int32}
+
+def _categorical(s: pd.Series) -> pd.Series:
+    # Categories are kept sorted so sorting by the column sorts by its text
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        cats = s.cat.categories
+        return s if cats.is_monotonic_increasing else s.cat.reorder_categories(cats.sort_values())
+    text = s.where(s.isna(), s.astype(str)) if s.dtype == object else s
+    return pd.Series(pd.Categorical(text), index=s.index, name=s.name)
+
+def _small(s: pd.Series, dtype) -> pd.Series:
+    # Only downcast when it is lossless; junk values stay as read so they can be reported as rejects
+    if s.dtype == dtype:
+        return s
+    v = pd.to_numeric(s, errors="coerce")
+    info = np.iinfo(dtype)
+    if v.isna().any() or not ((v == np.floor(v)) & (v >= info.min) & (v <= info.max)).all():
+        return s
+    return v.astype(dtype)
+
+def compact_frame(df: pd.DataFrame, categories=(), ints=None) -> pd.DataFrame:
+    """Repetitive text columns as categoricals and small integer columns downcast, losslessly."""
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if col in categories and not pd.api.types.is_numeric_dtype(s.dtype):
+            s = _categorical(s)
+        elif ints and col in ints:
+            s = _small(s, ints[col])
+        out[col] = s
+    return pd.DataFrame(out, index=df.index)
+
+def compact_sessions(df: pd.DataFrame) -> pd.DataFrame:
+    return compact_frame(df, SESSION_CATEGORIES, SESSION_INTS)
+
+def compact_tasks(df: pd.DataFrame) -> pd.DataFrame:
+    return compact_frame(df, TASK_CATEGORIES, TASK_INTS)
+
+def concat_compact(base: pd.DataFrame, *more: pd.DataFrame) -> pd.DataFrame:
+    """Append the rows of ``more`` to a compact frame without widening its dtypes back to object/int64."""
+    more = [m.reindex(columns=base.columns) for m in more]
+    out = {}
+    for col in base.columns:
+        parts = [base[col]] + [m[col] for m in more]
+        fast = _append_fast(parts)
+        if fast is not None:
+            out[col] = fast
+        elif isinstance(parts[0].dtype, pd.CategoricalDtype):
+            parts = [_categorical(p) for p in parts]
+            # An all-missing column has empty categories of whatever dtype it was read as; align it with the rest
+            dtype = next((p.cat.categories.dtype for p in parts if len(p.cat.categories)), None)
+            if dtype is not None:
+                parts = [p if len(p.cat.categories) else p.cat.set_categories(pd.Index([], dtype=dtype))
+                         for p in parts]
+            out[col] = pd.api.types.union_categoricals([p.array for p in parts], sort_categories=True)
+        else:
+            values = pd.concat(parts, ignore_index=True)
+            out[col] = _small(values, parts[0].dtype) if pd.api.types.is_integer_dtype(parts[0].dtype) else values
+    return pd.DataFrame(out)
+
+def _append_fast(parts):
+    # A few new rows that fit the base column as is (known categories, in-range ints): append the
+    # raw codes/values instead of re-unioning categories and re-checking every row
+    base, rest = parts[0], parts[1:]
+    if sum(len(p) for p in rest) > len(base) // 8:
+        return None
+    if isinstance(base.dtype, pd.CategoricalDtype):
+        cats = base.cat.categories
+        if not cats.is_monotonic_increasing or any(isinstance(p.dtype, pd.CategoricalDtype) for p in rest):
+            return None
+        codes = [cats.get_indexer(p.where(p.isna(), p.astype(str)) if p.dtype == object else p) for p in rest]
+        if any(((c < 0) & p.notna().to_numpy()).any() for c, p in zip(codes, rest)):
+            return None  # a new category
+        return pd.Series(pd.Categorical.from_codes(np.concatenate([base.cat.codes.to_numpy()] + codes),
+                                                   dtype=base.dtype), name=base.name)
+    if pd.api.types.is_integer_dtype(base.dtype) and not pd.api.types.is_extension_array_dtype(base.dtype):
+        rest = [_small(p, base.dtype.type) for p in rest]
+        if all(p.dtype == base.dtype for p in rest):
+            return pd.Series(np.concatenate([base.to_numpy()] + [p.to_numpy() for p in rest]), name=base.name)
+    return None
+
+def set_value(df: pd.DataFrame, mask, col, value):
+    """``df.loc[mask, col] = value`` that also works when ``value`` is a new category."""
+    if isinstance(df[col].dtype, pd.CategoricalDtype) and value not in df[col].cat.categories:
+        cats = df[col].cat.categories.append(pd.Index([value]))
+        try:
+            cats = cats.sort_values()  # same order concat_compact gives, so sorting matches a fresh load
+        except TypeError:
+            pass
+        df[col] = df[col].cat.set_categories(cats)
+    df.loc[mask, col] = value
+
+def category_mask(s: pd.Series, predicate) -> np.ndarray:
+    """Evaluate ``predicate`` on the distinct values of a categorical only, then map to rows."""
+    ok = np.asarray(predicate(pd.Series(s.cat.categories)), dtype=bool)
+    codes = s.cat.codes.to_numpy()
+    return np.append(ok, False)[codes]  # code -1 (missing) maps to the trailing False
+
+def _text_values(s: pd.Series, fn):
+    # Parse text once per distinct value when the column is categorical
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        parsed = fn(pd.Series(s.cat.categories.astype(str)))
+        codes = s.cat.codes.to_numpy()
+        missing = fn(pd.Series(["nan"]))
+        return pd.concat([parsed, missing], ignore_index=True).iloc[codes].reset_index(drop=True)
+    return fn(s.astype(str)).reset_index(drop=True)
+
+def normalize_tasks(df: pd.DataFrame):
+    """Validate and coerce a raw tasks frame.
+
+    Returns ``(clean, rejects)``: ``clean`` has the task columns with an int
+    ``estimated_min`` and defaults filled in (priority Medium, status Todo);
+    ``rejects`` holds rows without a title or with a bad estimate/status,
+    plus a ``reason``.
+    """
+    if "title" not in df.columns:
+        raise ValueError("Missing task column: title")
+    n = len(df)
+    def col(name, default=""):
+        return df[name].fillna(default).astype(str).str.strip() if name in df.columns else pd.Series([default] * n, index=df.index)
+    title = col("title")
+    status = col("status", "Todo").replace("", "Todo")
+    raw_est = col("estimated_min")
+    est = pd.to_numeric(raw_est.replace("", "0"), errors="coerce")
+    reason = pd.Series(None, index=df.index, dtype=object)
+    reason[~status.isin(TASK_STATUSES)] = "invalid status"
+    reason[est.isna() | (est < 0) | (est != np.floor(est))] = "invalid estimated_min"
+    est = est.fillna(0)
+    reason[title == ""] = "missing title"
+    good = reason.isna().to_numpy()
+    clean = pd.DataFrame({
+        "title": title[good].to_numpy(),
+        "subject": col("subject")[good].to_numpy(),
+        "deadline": col("deadline")[good].to_numpy(),
+        "priority": col("priority", "Medium").replace("", "Medium")[good].to_numpy(),
+        "estimated_min": est[good].astype(np.int64).to_numpy(),
+        "status": status[good].to_numpy(),
+    })
+    return clean, df[~good].assign(reason=reason[~good])
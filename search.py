@@ -0,0 +1,160 @@
+import re
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+
+TOKEN = re.compile(r"\w+")
+
+def tokens(text) -> list:
+    """Lower-cased word tokens of ``text``; anything that is not a string has none."""
+    return TOKEN.findall(text.lower()) if isinstance(text, str) else []
+
+class InvertedIndex:
+    """Word -> ids index over one text column, for search-as-you-type.
+
+    The bulk of the postings is a sorted token list with one id array per
+    token, stored back to back (``_offsets`` into ``_postings``), so all
+    tokens sharing a prefix are one contiguous slice. Ids added later go to a
+    small per-token delta and removed or re-added ids to a tombstone set that
+    hides their old postings; both are folded into the arrays once they pass
+    ``MERGE_EVERY``. Every query term matches
+    as a word prefix and terms are ANDed, each term marking a bitmap over
+    the id range, so a query costs a few array passes whatever the hit count.
+    """
+    MERGE_EVERY = 5000
+
+    def __init__(self):
+        self._tokens = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._postings = np.zeros(0, dtype=np.int64)
+        self._delta = {}        # token -> [ids] added since the last merge
+        self._delta_docs = {}   # id -> text, to rebuild on merge
+        self._removed = set()   # ids whose postings in the arrays are stale
+        self._max_id = 0
+        self._base_max = 0      # highest id in the arrays; later ids are only in the delta
+
+    @classmethod
+    def from_texts(cls, ids, texts) -> "InvertedIndex":
+        idx = cls()
+        idx._build(np.asarray(ids, dtype=np.int64), pd.Series(texts, dtype=object))
+        return idx
+
+    def _build(self, ids: np.ndarray, texts: pd.Series):
+        # Tokenize each distinct text once, then expand to (word, id) pairs with array ops
+        text_code, distinct = pd.factorize(texts)
+        words = [tokens(t) for t in distinct]
+        lens = np.array([len(w) for w in words] + [0], dtype=np.int64)  # the extra 0 is for missing texts (code -1)
+        word_code, vocab = pd.factorize(np.array([w for ws in words for w in ws], dtype=object), sort=True)
+        starts = np.concatenate([[0], np.cumsum(lens[:-1])])
+        per_row = lens[text_code]
+        total = int(per_row.sum())
+        first = np.repeat(np.cumsum(per_row) - per_row, per_row)
+        at = np.repeat(starts[text_code], per_row) + np.arange(total) - first
+        self._set_pairs(word_code[at], vocab, np.repeat(ids, per_row))
+        self._max_id = self._base_max = int(ids.max()) if len(ids) else 0
+
+    def __len__(self):
+        return len(self._tokens)
+
+    # --- Updates ---
+    def add(self, row_id: int, text):
+        """Index ``text`` under ``row_id``; an id already indexed gets its text replaced."""
+        row_id = int(row_id)
+        self._forget(row_id)
+        self._delta_docs[row_id] = text
+        for word in set(tokens(text)):
+            self._delta.setdefault(word, []).append(row_id)
+        self._max_id = max(self._max_id, row_id)
+        self._maybe_merge()
+
+    def add_many(self, ids, texts):
+        for row_id, text in zip(ids, texts):
+            self.add(row_id, text)
+
+    def remove(self, row_id: int):
+        self._forget(int(row_id))
+        self._maybe_merge()
+
+    def _forget(self, row_id: int):
+        # Hide the id's postings in the arrays and drop its delta entries
+        if row_id <= self._base_max:
+            self._removed.add(row_id)
+        text = self._delta_docs.pop(row_id, None)
+        for word in set(tokens(text)):
+            ids = self._delta[word]
+            ids.remove(row_id)
+            if not ids:
+                del self._delta[word]
+
+    def _maybe_merge(self):
+        if len(self._delta_docs) + len(self._removed) < self.MERGE_EVERY:
+            return
+        # Rebuild from the postings themselves: token -> ids pairs, minus tombstones, plus the delta
+        per_token = np.diff(self._offsets)
+        words = np.repeat(np.array(self._tokens, dtype=object), per_token)
+        owner = self._postings
+        if self._removed:
+            alive = ~np.isin(owner, np.fromiter(self._removed, dtype=np.int64))
+            words, owner = words[alive], owner[alive]
+        extra = [(w, i) for w, ids in self._delta.items() for i in ids]
+        if extra:
+            words = np.concatenate([words, np.array([w for w, _ in extra], dtype=object)])
+            owner = np.concatenate([owner, np.array([i for _, i in extra], dtype=np.int64)])
+        max_id = self._max_id
+        codes, vocab = pd.factorize(words, sort=True)
+        self._set_pairs(codes, vocab, owner)
+        self._max_id = self._base_max = max_id
+
+    def _set_pairs(self, codes, vocab, owner):
+        # (word code, id) pairs -> sorted, de-duplicated CSR postings
+        self.__init__()
+        order = np.lexsort((owner, codes))
+        codes, owner = codes[order], owner[order]
+        # A word repeated in one text is posted once
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (owner[1:] != owner[:-1])
+        self._tokens = list(vocab)
+        self._offsets = np.searchsorted(codes[keep], np.arange(len(vocab) + 1))
+        self._postings = owner[keep].astype(np.int64)
+
+    # --- Queries ---
+    def _term(self, prefix: str, gone: np.ndarray) -> np.ndarray:
+        lo = bisect_left(self._tokens, prefix)
+        hi = bisect_left(self._tokens, prefix + "\U0010ffff", lo)
+        mask = np.zeros(self._max_id + 1, dtype=bool)
+        mask[self._postings[self._offsets[lo]:self._offsets[hi]]] = True
+        # Tombstones only cover the arrays; the delta holds current texts
+        mask[gone] = False
+        for word, ids in self._delta.items():
+            if word.startswith(prefix):
+                mask[ids] = True
+        return mask
+
+    def match(self, query: str):
+        """Bool array indexed by id (``mask[id]``) for rows containing every term; None if no terms."""
+        terms = tokens(query)
+        if not terms:
+            return None
+        gone = np.fromiter(self._removed, dtype=np.int64, count=len(self._removed))
+        mask = None
+        for term in sorted(set(terms), key=len, reverse=True):
+            hit = self._term(term, gone)
+            mask = hit if mask is None else mask & hit
+            if not mask.any():
+                break
+        return mask
+
+    def search(self, query: str) -> np.ndarray:
+        """Ids, ascending, of rows containing every term of ``query`` as a word prefix."""
+        mask = self.match(query)
+        return np.zeros(0, dtype=np.int64) if mask is None else np.flatnonzero(mask)
+
+def in_mask(ids: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """``mask[ids]`` for an id bitmap, False for ids beyond it."""
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(ids):
+        return np.zeros(0, dtype=bool)
+    hi = int(ids.max())
+    if hi >= len(mask):
+        mask = np.concatenate([mask, np.zeros(hi + 1 - len(mask), dtype=bool)])
+    return mask[ids]
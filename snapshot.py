@@ -0,0 +1,42 @@
+import threading
+from analytics import (productivity_by_hour, subject_pareto, forecast_hours_needed, best_focus_window,
+                       rolling_capacity, task_etas, focus_heatmap, study_streaks)
+
+# name -> function(snapshot); metrics may read other metrics through snapshot.get
+METRICS = {
+    "productivity": lambda s: productivity_by_hour(s.aggs),
+    "pareto": lambda s: subject_pareto(s.aggs),
+    "forecast_hours": lambda s: forecast_hours_needed(s.aggs),
+    "heatmap": lambda s: focus_heatmap(s.aggs),
+    "best_window": lambda s: best_focus_window(s.get("heatmap")),
+    "streaks": lambda s: study_streaks(s.aggs),
+    "capacity": lambda s: rolling_capacity(s.aggs),
+    "task_etas": lambda s: task_etas(s.storage.load_tasks(), s.aggs),
+    "open_tasks": lambda s: s.aggs.open_tasks,
+    "rejects": lambda s: s.storage.session_rejects(),
+}
+
+class AnalyticsSnapshot:
+    """Derived analytics for one data version, shared by every tab.
+
+    Holds a frozen copy of the aggregates, so values stay consistent while
+    the controller keeps applying writes. Each metric is computed on first
+    ``get()`` and then memoized; metrics nobody asks for are never computed.
+    """
+    def __init__(self, version, aggs, storage=None):
+        self.version = version
+        self.aggs = aggs
+        self.storage = storage
+        self._values = {}
+        self._lock = threading.RLock()
+
+    def get(self, name):
+        with self._lock:
+            if name not in self._values:
+                self._values[name] = METRICS[name](self)
+            return self._values[name]
+
+    def computed(self):
+        """Names of the metrics evaluated so far."""
+        with self._lock:
+            return list(self._values)
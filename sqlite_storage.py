@@ -0,0 +1,220 @@
+import os
+import sqlite3
+import threading
+from urllib.request import pathname2url
+import pandas as pd
+from storage import StorageBackend, CsvBackend, SESSION_COLUMNS, TASK_COLUMNS, _sample_rows, _shared
+from schema import compact_sessions, compact_tasks
+
+# Columns held in memory; session notes are read on demand
+_LOADED = {"sessions": [c for c in SESSION_COLUMNS if c != "notes"], "tasks": TASK_COLUMNS}
+_COMPACT = {"sessions": compact_sessions, "tasks": compact_tasks}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT, start_time TEXT, end_time TEXT, duration_min INTEGER,
+    subject TEXT, mood INTEGER, energy INTEGER, notes TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT, subject TEXT, deadline TEXT, priority TEXT,
+    estimated_min INTEGER, status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_date ON sessions(date);
+CREATE INDEX IF NOT EXISTS idx_sessions_subject ON sessions(subject);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+"""
+
+class SqliteBackend(StorageBackend):
+    """SQLite store (WAL mode) with indexes on session date/subject and task status.
+
+    Point updates and deletes are single-row statements. A new database is
+    filled from the CSV files in ``csv_dir`` when they exist, otherwise it is
+    seeded with the sample rows. ``read_only`` opens an existing database
+    with a read-only connection and never creates one.
+    """
+    def __init__(self, path, csv_dir=None, read_only=False):
+        self.path = path
+        fresh = not os.path.exists(path)
+        if read_only and fresh:
+            raise FileNotFoundError(f"Missing database: {path}")
+        self._lock = threading.RLock()
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro", uri=True,
+                                        check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+        self._columns = {"sessions": SESSION_COLUMNS, "tasks": TASK_COLUMNS}
+        self._cache = {}
+        self._version = 0
+        self._db_version = None
+        if fresh:
+            if csv_dir and os.path.exists(os.path.join(csv_dir, "sessions.csv")):
+                migrate_csv_to_sqlite(csv_dir, backend=self)
+            else:
+                sessions, tasks = _sample_rows()
+                self.save_sessions(pd.DataFrame(sessions))
+                self.save_tasks(pd.DataFrame(tasks))
+
+    # --- Versioning ---
+    def _check(self):
+        # PRAGMA data_version moves when another connection commits
+        dv = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if dv != self._db_version:
+            self._db_version = dv
+            self._cache.clear()
+            self._version += 1
+
+    def _touch(self):
+        self._cache.clear()
+        self._version += 1
+
+    @property
+    def data_version(self) -> int:
+        with self._lock:
+            self._check()
+            return self._version
+
+    def _load(self, kind) -> pd.DataFrame:
+        with self._lock:
+            self._check()
+            if kind not in self._cache:
+                cols = ",".join(_LOADED[kind])
+                self._cache[kind] = _COMPACT[kind](pd.read_sql_query(f"SELECT {cols} FROM {kind} ORDER BY id", self.conn))
+            return _shared(self._cache[kind])
+
+    def _replace(self, kind, df: pd.DataFrame):
+        cols = [c for c in self._columns[kind] if c in df.columns]
+        with self._lock, self.conn:
+            self.conn.execute(f"DELETE FROM {kind}")
+            df[cols].to_sql(kind, self.conn, if_exists="append", index=False)
+            self._touch()
+
+    def _insert(self, kind, row: dict) -> dict:
+        cols = [c for c in self._columns[kind] if c != "id" and c in row]
+        sql = f"INSERT INTO {kind} ({','.join(cols)}) VALUES ({','.join('?' * len(cols))})"
+        with self._lock, self.conn:
+            cur = self.conn.execute(sql, [row[c] for c in cols])
+            self._touch()
+        return dict(row, id=cur.lastrowid)
+
+    def _insert_block(self, kind, df: pd.DataFrame) -> pd.DataFrame:
+        cols = self._columns[kind]
+        with self._lock, self.conn:
+            first = self._next_id(kind)
+            df = df.assign(id=range(first, first + len(df)))
+            df.reindex(columns=cols).to_sql(kind, self.conn, if_exists="append", index=False)
+            self._touch()
+        return df
+
+    def _delete(self, kind, row_id: int):
+        with self._lock, self.conn:
+            self.conn.execute(f"DELETE FROM {kind} WHERE id = ?", (int(row_id),))
+            self._touch()
+
+    def _next_id(self, kind) -> int:
+        with self._lock:
+            row = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (kind,)).fetchone()
+            return (row[0] if row else 0) + 1
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    # --- Sessions ---
+    def load_sessions(self, start=None, end=None) -> pd.DataFrame:
+        if start is None and end is None:
+            return self._load("sessions")
+        where, params = [], []
+        if start is not None:
+            where.append("date >= ?"); params.append(str(start))
+        if end is not None:
+            where.append("date <= ?"); params.append(str(end))
+        sql = f"SELECT {','.join(_LOADED['sessions'])} FROM sessions WHERE {' AND '.join(where)} ORDER BY id"
+        with self._lock:
+            return compact_sessions(pd.read_sql_query(sql, self.conn, params=params))
+
+    def load_session_notes(self, ids=None) -> pd.Series:
+        with self._lock:
+            if ids is None:
+                rows = self.conn.execute("SELECT id, notes FROM sessions ORDER BY id").fetchall()
+            else:
+                ids = [int(i) for i in ids]
+                rows = []
+                for i in range(0, len(ids), 500):
+                    part = ids[i:i + 500]
+                    rows += self.conn.execute(
+                        f"SELECT id, notes FROM sessions WHERE id IN ({','.join('?' * len(part))})", part).fetchall()
+        notes = pd.Series([n or "" for _, n in rows], index=[i for i, _ in rows], dtype=object)
+        return notes if ids is None else notes.reindex(ids).fillna("")
+
+    def save_sessions(self, df: pd.DataFrame):
+        self._replace("sessions", df)
+
+    def iter_sessions(self, chunksize=100_000):
+        with self._lock:
+            sql = f"SELECT {','.join(SESSION_COLUMNS)} FROM sessions ORDER BY id"
+            for chunk in pd.read_sql_query(sql, self.conn, chunksize=chunksize):
+                yield chunk
+
+    def insert_sessions(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self._insert_block("sessions", df)
+
+    def next_session_id(self) -> int:
+        return self._next_id("sessions")
+
+    def insert_session(self, row: dict) -> dict:
+        return self._insert("sessions", row)
+
+    def delete_session(self, row_id: int):
+        self._delete("sessions", row_id)
+
+    # --- Tasks ---
+    def load_tasks(self) -> pd.DataFrame:
+        return self._load("tasks")
+
+    def save_tasks(self, df: pd.DataFrame):
+        self._replace("tasks", df)
+
+    def next_task_id(self) -> int:
+        return self._next_id("tasks")
+
+    def insert_task(self, row: dict) -> dict:
+        return self._insert("tasks", row)
+
+    def insert_tasks(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self._insert_block("tasks", df)
+
+    def update_task(self, row_id: int, **fields):
+        cols = [c for c in fields if c in TASK_COLUMNS and c != "id"]
+        if not cols:
+            return
+        sql = f"UPDATE tasks SET {', '.join(c + ' = ?' for c in cols)} WHERE id = ?"
+        with self._lock, self.conn:
+            self.conn.execute(sql, [fields[c] for c in cols] + [int(row_id)])
+            self._touch()
+
+    def delete_task(self, row_id: int):
+        self._delete("tasks", row_id)
+
+def migrate_csv_to_sqlite(csv_dir="data", db_path=None, backend=None) -> SqliteBackend:
+    """Copy sessions and tasks (journal included) from a CSV data dir into SQLite.
+
+    IDs are preserved and the autoincrement sequences continue from the CSV ones.
+    """
+    csv = CsvBackend(csv_dir)
+    if backend is None:
+        backend = SqliteBackend(db_path or os.path.join(csv_dir, "neurostudy.db"))
+    sessions = csv.load_sessions()
+    sessions = sessions.assign(notes=csv.load_session_notes(sessions["id"]).to_numpy())
+    for kind, df, next_id in (("sessions", sessions, csv.next_session_id()),
+                              ("tasks", csv.load_tasks(), csv.next_task_id())):
+        backend._replace(kind, df)
+        with backend._lock, backend.conn:
+            backend.conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (kind,))
+            backend.conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (kind, next_id - 1))
+    return backend
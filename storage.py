@@ -1,78 +1,893 @@
 import os
+import json
+import atexit
+import threading
+import weakref
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from typing import Optional
+from schema import (normalize_sessions, compact_sessions, compact_tasks, concat_compact, set_value, category_mask,
+                    SESSION_CATEGORIES, TASK_CATEGORIES)
+from instrument import timed
 
-class Storage:
-    def __init__(self, base_dir="data"):
+SESSION_COLUMNS = ["id","date","start_time","end_time","duration_min","subject","mood","energy","notes"]
+TASK_COLUMNS = ["id","title","subject","deadline","priority","estimated_min","status"]
+DEFAULT_SETTINGS = {"pomodoro_min": 25, "short_break_min": 5, "long_break_min": 15, "long_break_every": 4,
+                    "forecast_window": 28, "plan_daily_min": 0}
+
+# Cached frames are handed out as shallow copies, which pandas 3's copy-on-write keeps
+# read-only; older pandas gets real copies instead of a process-wide option change
+_COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3
+
+def _shared(df: pd.DataFrame) -> pd.DataFrame:
+    """A copy of cached ``df`` that callers may modify without touching the cache."""
+    return df.copy(deep=not _COPY_ON_WRITE)
+
+def _sample_rows():
+    today = datetime.now().date().isoformat()
+    sessions = [
+        {"id": 1, "date": today, "start_time": "09:00", "end_time": "09:25",
+         "duration_min": 25, "subject": "Math", "mood": 7, "energy": 6, "notes": "Good warm-up."},
+        {"id": 2, "date": today, "start_time": "10:00", "end_time": "10:50",
+         "duration_min": 50, "subject": "Python", "mood": 8, "energy": 7, "notes": "Flow state!"},
+    ]
+    tasks = [
+        {"id": 1, "title": "Revise Calculus Ch.3", "subject": "Math", "deadline": "", "priority": "High", "estimated_min": 60, "status": "Todo"},
+        {"id": 2, "title": "Project: Tkinter UI", "subject": "Python", "deadline": "", "priority": "Medium", "estimated_min": 120, "status": "In Progress"},
+    ]
+    return sessions, tasks
+
+def _filter_dates(df: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    # ISO dates compare correctly as strings
+    if (start is None and end is None) or df.empty:
+        return df
+    def in_range(d):
+        d = d.astype(str)
+        mask = pd.Series(True, index=d.index)
+        if start is not None:
+            mask &= d >= str(start)
+        if end is not None:
+            mask &= d <= str(end)
+        return mask.to_numpy()
+    if isinstance(df["date"].dtype, pd.CategoricalDtype):
+        return df[category_mask(df["date"], in_range)]
+    return df[in_range(df["date"])]
+
+def write_synced(path, write, mode="w"):
+    """Open ``path``, let ``write(f)`` fill it, then fsync before closing."""
+    with open(path, mode, encoding="utf-8", newline="") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+
+def replace_file(path, write):
+    """Atomically replace ``path``: write a synced temp file, then ``os.replace`` it over the old one."""
+    tmp = path + ".tmp"
+    write_synced(tmp, write)
+    os.replace(tmp, path)
+
+# Backends with buffered writes, flushed at interpreter exit in case nobody called close()
+_BUFFERED = weakref.WeakSet()
+
+@atexit.register
+def _flush_all():
+    for backend in list(_BUFFERED):
+        try:
+            backend.flush()
+        except Exception:
+            pass
+
+def _session_notes(df: pd.DataFrame) -> pd.Series:
+    if "notes" not in df.columns:
+        return pd.Series([""] * len(df), index=df["id"].to_numpy(), dtype=object)
+    return pd.Series(df["notes"].fillna("").astype(str).to_numpy(), index=df["id"].to_numpy())
+
+class StorageBackend:
+    """Interface for the session/task store behind :class:`Storage`.
+
+    ``start``/``end`` are inclusive ISO dates. ``data_version`` must increase
+    whenever the stored rows may have changed. Loaded frames are compact (see
+    ``schema.compact_sessions``) and sessions come without their free-text
+    ``notes``, which are fetched separately with ``load_session_notes``.
+    """
+    data_version = 0
+
+    def load_sessions(self, start=None, end=None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def save_sessions(self, df: pd.DataFrame):
+        raise NotImplementedError
+
+    def next_session_id(self) -> int:
+        raise NotImplementedError
+
+    def insert_session(self, row: dict) -> dict:
+        raise NotImplementedError
+
+    def delete_session(self, row_id: int):
+        raise NotImplementedError
+
+    def insert_sessions(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Insert many rows in one commit; returns them with a contiguous block of new ids."""
+        raise NotImplementedError
+
+    def load_session_notes(self, ids=None) -> pd.Series:
+        """Session notes indexed by id (all of them, or those for ``ids`` in that order)."""
+        raise NotImplementedError
+
+    def session_totals(self) -> pd.DataFrame:
+        """Sessions and minutes per subject over the whole history."""
+        df = self.load_sessions()
+        minutes = pd.to_numeric(df["duration_min"], errors="coerce").fillna(0)
+        g = minutes.groupby(df["subject"].astype(str), observed=True).agg(["size", "sum"])
+        return pd.DataFrame({"subject": g.index.to_numpy(), "sessions": g["size"].to_numpy(),
+                             "minutes": g["sum"].to_numpy()})
+
+    def iter_sessions(self, chunksize=100_000):
+        """Yield the sessions table as DataFrame chunks of at most ``chunksize`` rows."""
+        df = self.load_sessions()
+        for i in range(0, len(df), chunksize):
+            yield df.iloc[i:i + chunksize]
+
+    def load_tasks(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def save_tasks(self, df: pd.DataFrame):
+        raise NotImplementedError
+
+    def next_task_id(self) -> int:
+        raise NotImplementedError
+
+    def insert_task(self, row: dict) -> dict:
+        raise NotImplementedError
+
+    def insert_tasks(self, df: pd.DataFrame) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def update_task(self, row_id: int, **fields):
+        raise NotImplementedError
+
+    def delete_task(self, row_id: int):
+        raise NotImplementedError
+
+    def compact(self):
+        pass
+
+    def flush(self):
+        """Write out anything buffered; a no-op for backends that write through."""
+        pass
+
+    def close(self):
+        pass
+
+class CsvBackend(StorageBackend):
+    """CSV snapshots plus an append-only journal per table.
+
+    Inserts, patches and deletes append one JSON line to ``<table>.journal``;
+    reads replay the journal over the snapshot. Once a journal grows past
+    ``COMPACT_EVERY`` records it is folded back into the snapshot on a
+    background thread, so a single write never rewrites the whole history.
+
+    Journal records and id-sequence updates are group-committed: they are
+    visible to reads at once, and everything queued within ``GROUP_COMMIT_MS``
+    goes to disk in one append + fsync (``flush()``; ``close()`` and
+    interpreter exit flush too). ``GROUP_COMMIT_MS = 0`` writes through.
+    Whole-file rewrites go through a synced temp file and ``os.replace``.
+
+    Parsed frames are cached per table, in compact form and without session
+    notes (read on demand), keyed on the (mtime, size, inode) of the backing
+    files. ``data_version`` increases on every write made
+    through this object and whenever the files change underneath it.
+
+    ``read_only`` opens existing files without creating, repairing or
+    writing anything; missing table files raise ``FileNotFoundError``.
+    """
+    COMPACT_EVERY = 500
+    GROUP_COMMIT_MS = 50
+    TABLES = ("sessions", "tasks")  # tables kept as snapshot + journal by this class
+
+    def __init__(self, base_dir="data", read_only=False):
         self.base_dir = base_dir
-        os.makedirs(self.base_dir, exist_ok=True)
+        self.read_only = read_only
         self.paths = {
             "sessions": os.path.join(self.base_dir, "sessions.csv"),
             "tasks": os.path.join(self.base_dir, "tasks.csv"),
-            "settings": os.path.join(self.base_dir, "settings.json"),
+            "ids": os.path.join(self.base_dir, "ids.json"),
         }
-        self._bootstrap()
+        if read_only:
+            missing = [self.paths[k] for k in self.TABLES if not os.path.exists(self.paths[k])]
+            if missing:
+                raise FileNotFoundError(f"Missing data file(s): {', '.join(missing)}")
+        else:
+            os.makedirs(self.base_dir, exist_ok=True)
+        self._columns = {"sessions": SESSION_COLUMNS, "tasks": TASK_COLUMNS}
+        self._compactors = {"sessions": compact_sessions, "tasks": compact_tasks}
+        self._categories = {"sessions": SESSION_CATEGORIES, "tasks": TASK_CATEGORIES}
+        self._lock = threading.RLock()
+        self._compacting = set()
+        self._cache = {}
+        self._version = 0
+        self._pending = {k: [] for k in self.TABLES}
+        if not read_only:
+            self._bootstrap()
+            for kind in self.TABLES:
+                self._repair_journal(kind)
+        self._ids_dirty = False
+        self._flush_timer = None
+        self._journal_len = {k: self._count_journal(k) for k in self.TABLES}
+        self._id_seq = None
+        _BUFFERED.add(self)
 
     def _bootstrap(self):
         # Create sample files if missing
-        if not os.path.exists(self.paths["sessions"]):
-            df = pd.DataFrame([
-                {"id": 1, "date": datetime.now().date().isoformat(), "start_time": "09:00", "end_time": "09:25",
-                 "duration_min": 25, "subject": "Math", "mood": 7, "energy": 6, "notes": "Good warm-up."},
-                {"id": 2, "date": datetime.now().date().isoformat(), "start_time": "10:00", "end_time": "10:50",
-                 "duration_min": 50, "subject": "Python", "mood": 8, "energy": 7, "notes": "Flow state!"},
-            ])
-            df.to_csv(self.paths["sessions"], index=False)
-        if not os.path.exists(self.paths["tasks"]):
-            df = pd.DataFrame([
-                {"id": 1, "title": "Revise Calculus Ch.3", "subject": "Math", "deadline": "", "priority": "High", "estimated_min": 60, "status": "Todo"},
-                {"id": 2, "title": "Project: Tkinter UI", "subject": "Python", "deadline": "", "priority": "Medium", "estimated_min": 120, "status": "In Progress"},
-            ])
-            df.to_csv(self.paths["tasks"], index=False)
-        if not os.path.exists(self.paths["settings"]):
-            import json
-            with open(self.paths["settings"], "w", encoding="utf-8") as f:
-                json.dump({"pomodoro_min": 25, "short_break_min": 5, "long_break_min": 15, "long_break_every": 4}, f)
+        samples = dict(zip(("sessions", "tasks"), _sample_rows()))
+        for kind in self.TABLES:
+            if not os.path.exists(self.paths[kind]):
+                df = pd.DataFrame(samples[kind])
+                replace_file(self.paths[kind], lambda f: df.to_csv(f, index=False))
 
-    # --- Sessions ---
-    def load_sessions(self) -> pd.DataFrame:
+    def _writable(self):
+        if self.read_only:
+            raise PermissionError(f"{self.base_dir} is open read-only")
+
+    # --- Journal ---
+    def _journal_path(self, kind, compacting=False):
+        suffix = ".journal.compacting" if compacting else ".journal"
+        return os.path.join(self.base_dir, kind + suffix)
+
+    def _repair_journal(self, kind):
+        # A crash mid-append can leave a torn last line; cut it off so the next
+        # append starts on a line of its own instead of being merged into it
+        for path in (self._journal_path(kind, True), self._journal_path(kind)):
+            try:
+                with open(path, "rb+") as f:
+                    end = f.seek(0, os.SEEK_END)
+                    if end == 0:
+                        continue
+                    f.seek(end - 1)
+                    if f.read(1) == b"\n":
+                        continue
+                    keep = end
+                    while keep > 0:
+                        start = max(0, keep - 4096)
+                        f.seek(start)
+                        i = f.read(keep - start).rfind(b"\n")
+                        keep = start if i < 0 else start + i + 1
+                        if i >= 0:
+                            break
+                    f.truncate(keep)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except FileNotFoundError:
+                continue
+
+    def _count_journal(self, kind) -> int:
+        n = len(self._pending[kind])
+        for path in (self._journal_path(kind, True), self._journal_path(kind)):
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    n += sum(1 for _ in f)
+        return n
+
+    def _read_journal(self, kind):
+        for path in (self._journal_path(kind, True), self._journal_path(kind)):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Torn tail from an interrupted write
+                        continue
+        with self._lock:
+            pending = list(self._pending[kind])
+        yield from pending
+
+    def _append(self, kind, record: dict):
+        self._writable()
+        with self._lock:
+            self._pending[kind].append(record)
+            self._journal_len[kind] += 1
+            self._touch(kind)
+            self._schedule_flush()
+            if self._journal_len[kind] >= self.COMPACT_EVERY and kind not in self._compacting:
+                self._compacting.add(kind)
+                threading.Thread(target=self._compact_worker, args=(kind,), daemon=True).start()
+
+    # --- Group commit ---
+    def _schedule_flush(self):
+        if self.GROUP_COMMIT_MS <= 0:
+            self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.GROUP_COMMIT_MS / 1000, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Commit queued journal records and id updates: one append + fsync per journal."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            # Ids first, so a crash can never leave rows whose ids will be handed out again
+            if self._ids_dirty:
+                self._save_ids(self._ids)
+                self._ids_dirty = False
+            for kind, records in self._pending.items():
+                if not records:
+                    continue
+                before = self._stamp(kind)
+                lines = "".join(json.dumps(r) + "\n" for r in records)
+                write_synced(self._journal_path(kind), lambda f: f.write(lines), mode="a")
+                self._pending[kind] = []
+                # Reads already saw these records; only the file stamp moved
+                c = self._cache.get(kind)
+                if c is not None and c["stamp"] == before:
+                    c["stamp"] = self._stamp(kind)
+
+    def close(self):
+        self.flush()
+
+    @staticmethod
+    def _split_ops(records):
+        adds, patches, dels = [], {}, set()
+        for rec in records:
+            op = rec.get("op")
+            if op == "add":
+                adds.append(rec["row"])
+            elif op == "patch":
+                patches.setdefault(rec["id"], {}).update(rec["fields"])
+            elif op == "del":
+                dels.add(rec["id"])
+        return adds, patches, dels
+
+    def _replay(self, kind, df: pd.DataFrame, records) -> pd.DataFrame:
+        adds, patches, dels = self._split_ops(records)
+        if adds:
+            new = pd.DataFrame(adds, columns=self._columns[kind])
+            # Adds are idempotent so a half-finished compaction never duplicates rows
+            if not df.empty:
+                new = new[~new["id"].isin(df["id"])]
+            df = new if df.empty else concat_compact(df, new)
+        if dels:
+            df = df[~df["id"].isin(dels)].reset_index(drop=True)
+        if patches:
+            df = df.copy()
+        for rid, fields in patches.items():
+            mask = df["id"] == rid
+            for col, val in fields.items():
+                if col in df.columns:
+                    set_value(df, mask, col, val)
+        return df
+
+    def _read_snapshot(self, kind, notes=True) -> pd.DataFrame:
+        return self._read_csv(self.paths[kind], kind, notes)
+
+    def _read_csv(self, path, kind, notes=True) -> pd.DataFrame:
+        # notes=False is the in-memory read: skip notes, parse repetitive text straight into categoricals
+        usecols = None if notes else (lambda c: c != "notes")
+        dtype = None if notes else {c: "category" for c in self._categories[kind]}
         try:
-            return pd.read_csv(self.paths["sessions"])
+            return pd.read_csv(path, low_memory=False, usecols=usecols, dtype=dtype)
         except Exception:
-            return pd.DataFrame(columns=["id","date","start_time","end_time","duration_min","subject","mood","energy","notes"])
+            return pd.DataFrame(columns=[c for c in self._columns[kind] if notes or c != "notes"])
+
+    def _in_memory(self, kind, df: pd.DataFrame) -> pd.DataFrame:
+        # What the cache holds: compact dtypes, notes left on disk
+        return self._compactors[kind](df.drop(columns=["notes"], errors="ignore"))
+
+    def _load(self, kind) -> pd.DataFrame:
+        with self._lock:
+            self._check(kind)
+            c = self._cache[kind]
+            if c["view"] is None:
+                if c["snap"] is None:
+                    c["snap"] = self._in_memory(kind, self._read_snapshot(kind, notes=False))
+                c["view"] = self._in_memory(kind, self._replay(kind, c["snap"], self._read_journal(kind)))
+            return _shared(c["view"])
+
+    # --- Cache ---
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            return None
+
+    def _stamp(self, kind):
+        return (self._stat(self.paths[kind]), self._stat(self._journal_path(kind, True)),
+                self._stat(self._journal_path(kind)))
+
+    def _check(self, kind):
+        """Drop cached frames for ``kind`` if its files changed behind our back."""
+        stamp = self._stamp(kind)
+        c = self._cache.get(kind)
+        if c is not None and c["stamp"] == stamp:
+            return
+        if c is None or c["stamp"][0] != stamp[0]:
+            c = {"snap": None, "view": None}
+        else:
+            c["view"] = None
+        c["stamp"] = stamp
+        self._cache[kind] = c
+        self._version += 1
+
+    def _touch(self, kind, snap: Optional[pd.DataFrame] = None):
+        """Record a write of our own: keep the parsed snapshot, drop the merged view."""
+        c = self._cache.get(kind)
+        stamp = self._stamp(kind)
+        if c is None or snap is not None or c["stamp"][0] != stamp[0]:
+            c = {"snap": snap, "view": None}
+        else:
+            c["view"] = None
+        c["stamp"] = stamp
+        self._cache[kind] = c
+        self._version += 1
+
+    @property
+    def data_version(self) -> int:
+        """Monotonic counter that changes whenever session or task data may have changed."""
+        with self._lock:
+            for kind in self.TABLES:
+                self._check(kind)
+            return self._version
+
+    def _compact_worker(self, kind):
+        try:
+            self.compact(kind)
+        finally:
+            with self._lock:
+                self._compacting.discard(kind)
+
+    def compact(self, kind: Optional[str] = None):
+        """Fold the journal of ``kind`` (or every table) back into its CSV snapshot."""
+        if self.read_only:
+            return
+        for k in ([kind] if kind else list(self.TABLES)):
+            live, frozen = self._journal_path(k), self._journal_path(k, True)
+            with self._lock:
+                self.flush()
+                before = self._stamp(k)
+                # Freeze the current journal; new writes go to a fresh one meanwhile
+                if os.path.exists(live):
+                    if os.path.exists(frozen):
+                        with open(live, "r", encoding="utf-8") as src, open(frozen, "a", encoding="utf-8") as dst:
+                            dst.write(src.read())
+                        os.remove(live)
+                    else:
+                        os.replace(live, frozen)
+                # Same records under a new name: the cached view is still current
+                c = self._cache.get(k)
+                if c is not None and c["stamp"] == before:
+                    c["stamp"] = self._stamp(k)
+                if not os.path.exists(frozen):
+                    continue
+                stale = self._stamp(k)
+                snap_stamp = stale[0]
+            records = []
+            with open(frozen, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+            df = self._replay(k, self._read_snapshot(k), records)
+            tmp = self.paths[k] + ".tmp"
+            write_synced(tmp, lambda f: df.to_csv(f, index=False))
+            with self._lock:
+                if self._stat(self.paths[k]) != snap_stamp:
+                    # A bulk insert appended to the snapshot meanwhile; retry on the next compaction
+                    os.remove(tmp)
+                    continue
+                # The cache is current if every change since the freeze was our own
+                # write to the fresh journal, recorded by _touch/flush
+                c = self._cache.get(k)
+                current = c is not None and c["stamp"] == self._stamp(k) and c["stamp"][:2] == stale[:2]
+                os.replace(tmp, self.paths[k])
+                os.remove(frozen)
+                self._journal_len[k] = self._count_journal(k)
+                # Same rows, new files: keep the merged view and adopt the compacted snapshot
+                if current:
+                    c["snap"], c["stamp"] = self._in_memory(k, df), self._stamp(k)
+                    c["notes"] = _session_notes(df) if k == "sessions" else None
+
+    # --- ID sequences ---
+    @property
+    def _ids(self) -> dict:
+        # Loaded on first write so read-only users never scan the tables for it
+        with self._lock:
+            if self._id_seq is None:
+                self._id_seq = self._load_ids()
+            return self._id_seq
+
+    def _load_ids(self) -> dict:
+        try:
+            with open(self.paths["ids"], "r", encoding="utf-8") as f:
+                return {k: int(v) for k, v in json.load(f).items()}
+        except Exception:
+            ids = {}
+            for kind in self.TABLES:
+                df = self._load(kind)
+                ids[kind] = int(df["id"].max()) if not df.empty else 0
+            if not self.read_only:
+                self._save_ids(ids)
+            return ids
+
+    def _save_ids(self, ids: dict):
+        replace_file(self.paths["ids"], lambda f: json.dump(ids, f))
+
+    def _allocate_id(self, kind) -> int:
+        # Persisted with the next group commit, ahead of the journal lines using it
+        self._writable()
+        with self._lock:
+            self._ids[kind] += 1
+            self._ids_dirty = True
+            self._schedule_flush()
+            return self._ids[kind]
+
+    def _replace(self, kind, df: pd.DataFrame):
+        self._writable()
+        with self._lock:
+            self.flush()
+            replace_file(self.paths[kind], lambda f: df.to_csv(f, index=False))
+            for path in (self._journal_path(kind, True), self._journal_path(kind)):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._journal_len[kind] = 0
+            self._touch(kind, snap=self._in_memory(kind, df))
+            if not df.empty:
+                self._ids[kind] = max(self._ids[kind], int(df["id"].max()))
+                self._save_ids(self._ids)
+
+    def _insert_block(self, kind, df: pd.DataFrame) -> pd.DataFrame:
+        # Bulk rows go straight onto the end of the snapshot, not through the journal
+        self._writable()
+        path = self.paths[kind]
+        with self._lock:
+            self.flush()
+            first = self._ids[kind] + 1
+            self._ids[kind] += len(df)
+            self._save_ids(self._ids)
+            df = df.assign(id=np.arange(first, first + len(df)))
+            header = None
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                with open(path, "rb") as f:
+                    header = f.readline().decode("utf-8").strip().split(",")
+                    f.seek(-1, os.SEEK_END)
+                    needs_newline = f.read(1) != b"\n"
+            if header:
+                def write(f):
+                    if needs_newline:
+                        f.write("\n")
+                    df.reindex(columns=header).to_csv(f, header=False, index=False)
+                write_synced(path, write, mode="a")
+            else:
+                replace_file(path, lambda f: df.reindex(columns=self._columns[kind]).to_csv(f, index=False))
+            self._touch(kind)
+        return df
+
+    # --- Sessions ---
+    def load_sessions(self, start=None, end=None) -> pd.DataFrame:
+        return _filter_dates(self._load("sessions"), start, end)
 
     def save_sessions(self, df: pd.DataFrame):
-        df.to_csv(self.paths["sessions"], index=False)
+        self._replace("sessions", df)
 
     def next_session_id(self) -> int:
-        df = self.load_sessions()
-        return (df["id"].max() if not df.empty else 0) + 1
+        return self._ids["sessions"] + 1
+
+    def insert_session(self, row: dict) -> dict:
+        row = dict(row, id=self._allocate_id("sessions"))
+        self._append("sessions", {"op": "add", "row": row})
+        return row
+
+    def delete_session(self, row_id: int):
+        self._append("sessions", {"op": "del", "id": int(row_id)})
+
+    def load_session_notes(self, ids=None) -> pd.Series:
+        with self._lock:
+            self._check("sessions")
+            c = self._cache["sessions"]
+            # The journal is merged in once per data version; the table asks for a few ids on every scroll
+            merged = c.get("notes_view")
+            if merged is None or merged[0] != self._version:
+                merged = c["notes_view"] = (self._version, self._merged_notes(c))
+            notes = merged[1]
+        return notes if ids is None else notes.reindex(list(ids)).fillna("")
+
+    def _merged_notes(self, c) -> pd.Series:
+        if c.get("notes") is None:
+            try:
+                c["notes"] = _session_notes(pd.read_csv(self.paths["sessions"], usecols=["id", "notes"],
+                                                        dtype={"notes": str}, keep_default_na=False))
+            except (OSError, ValueError, pd.errors.EmptyDataError):
+                c["notes"] = pd.Series(dtype=object)
+        notes = c["notes"]
+        adds, _, dels = self._split_ops(self._read_journal("sessions"))
+        if adds:
+            added = pd.Series([str(r.get("notes") or "") for r in adds], index=[int(r["id"]) for r in adds])
+            notes = pd.concat([notes, added])
+            notes = notes[~notes.index.duplicated(keep="last")]
+        if dels:
+            notes = notes[~notes.index.isin(list(dels))]
+        return notes
+
+    def iter_sessions(self, chunksize=100_000):
+        # Stream the snapshot; only the (bounded) journal is held in memory
+        with self._lock:
+            adds, patches, dels = self._split_ops(list(self._read_journal("sessions")))
+        pending = {int(r["id"]): r for r in adds}
+        try:
+            reader = pd.read_csv(self.paths["sessions"], chunksize=chunksize, low_memory=False)
+        except (OSError, pd.errors.EmptyDataError):
+            reader = []
+        for chunk in reader:
+            if dels:
+                chunk = chunk[~chunk["id"].isin(dels)]
+            for rid in chunk["id"][chunk["id"].isin(list(pending))].tolist():
+                pending.pop(rid)
+            yield self._replay("sessions", chunk, [{"op": "patch", "id": k, "fields": v} for k, v in patches.items()])
+        rows = [r for rid, r in pending.items() if rid not in dels]
+        if rows:
+            yield self._replay("sessions", pd.DataFrame(rows, columns=SESSION_COLUMNS),
+                               [{"op": "patch", "id": k, "fields": v} for k, v in patches.items()])
+
+    def insert_sessions(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self._insert_block("sessions", df)
 
     # --- Tasks ---
     def load_tasks(self) -> pd.DataFrame:
+        return self._load("tasks")
+
+    def save_tasks(self, df: pd.DataFrame):
+        self._replace("tasks", df)
+
+    def next_task_id(self) -> int:
+        return self._ids["tasks"] + 1
+
+    def insert_task(self, row: dict) -> dict:
+        row = dict(row, id=self._allocate_id("tasks"))
+        self._append("tasks", {"op": "add", "row": row})
+        return row
+
+    def insert_tasks(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self._insert_block("tasks", df)
+
+    def update_task(self, row_id: int, **fields):
+        self._append("tasks", {"op": "patch", "id": int(row_id), "fields": fields})
+
+    def delete_task(self, row_id: int):
+        self._append("tasks", {"op": "del", "id": int(row_id)})
+
+
+class Storage:
+    """Settings file plus a pluggable session/task backend.
+
+    ``backend`` is ``"csv"`` (default), ``"sqlite"``, ``"partitioned"``
+    (monthly session files, see ``partitioned_storage``) or a ready
+    :class:`StorageBackend` instance. ``read_only`` is for analytics over
+    existing data: nothing is created or written (no sample rows, no
+    settings file), missing data raises ``FileNotFoundError`` and writes
+    raise ``PermissionError``.
+    """
+    def __init__(self, base_dir="data", backend="csv", read_only=False):
+        self.base_dir = base_dir
+        self.read_only = read_only
+        if read_only and not os.path.isdir(base_dir):
+            raise FileNotFoundError(f"Data directory not found: {base_dir}")
+        if not read_only:
+            os.makedirs(self.base_dir, exist_ok=True)
+        self.paths = {
+            "settings": os.path.join(self.base_dir, "settings.json"),
+            "rollup": os.path.join(self.base_dir, "daily_rollup.csv"),
+        }
+        self.backend = self._make_backend(backend)
+        self._typed = None    # (version, typed sessions, rejects)
+        self._rejects = None  # (version, rejects), carried across this object's own writes
+        self._typed_lock = threading.Lock()
+        self._parse_lock = threading.Lock()  # one full parse at a time; writers never wait for it
+        if not read_only:
+            self._bootstrap()
+
+    def _make_backend(self, backend) -> StorageBackend:
+        if isinstance(backend, StorageBackend):
+            return backend
+        if backend == "csv":
+            return CsvBackend(self.base_dir, read_only=self.read_only)
+        if backend == "sqlite":
+            from sqlite_storage import SqliteBackend
+            return SqliteBackend(os.path.join(self.base_dir, "neurostudy.db"), csv_dir=self.base_dir,
+                                 read_only=self.read_only)
+        if backend == "partitioned":
+            from partitioned_storage import PartitionedBackend
+            return PartitionedBackend(self.base_dir, read_only=self.read_only)
+        raise ValueError(f"Unknown storage backend: {backend!r}")
+
+    def _bootstrap(self):
+        if not os.path.exists(self.paths["settings"]):
+            replace_file(self.paths["settings"], lambda f: json.dump(DEFAULT_SETTINGS, f))
+
+    @property
+    def data_version(self) -> int:
+        return self.backend.data_version
+
+    @timed("storage.compact")
+    def compact(self):
+        self.backend.compact()
+
+    @timed("storage.flush")
+    def flush(self):
+        """Write out buffered edits now (the backend otherwise group-commits them shortly)."""
+        self.backend.flush()
+
+    def close(self):
+        self.backend.close()
+
+    # --- Sessions ---
+    @timed("storage.load_sessions")
+    def load_sessions(self, start=None, end=None) -> pd.DataFrame:
+        return self.backend.load_sessions(start, end)
+
+    @timed("storage.save_sessions")
+    def save_sessions(self, df: pd.DataFrame):
+        self.backend.save_sessions(df)
+
+    def _normalized(self):
+        # The parse runs outside _typed_lock and is cached only if no write landed during it
+        with self._parse_lock:
+            with self._typed_lock:
+                version = self.data_version
+                if self._typed is not None and self._typed[0] == version:
+                    return self._typed
+            typed, rejects = normalize_sessions(self.backend.load_sessions())
+            with self._typed_lock:
+                if self.data_version == version:
+                    self._typed = (version, typed, rejects)
+                    self._rejects = (version, rejects)
+            return version, typed, rejects
+
+    def _rejects_live(self) -> bool:
+        with self._typed_lock:
+            return self._rejects is not None and self._rejects[0] == self.data_version
+
+    def _rejects_apply(self, live: bool, added=None, deleted=None):
+        # Like AppController._aggs_apply: fold our own write into rejects that were current
+        # before it, so an edit does not re-parse the whole history
+        with self._typed_lock:
+            if not live:
+                return
+            rejects = self._rejects[1]
+            if deleted is not None and (rejects["id"] == deleted).any():
+                rejects = rejects[rejects["id"] != deleted]
+            if added is not None and len(added):
+                new = normalize_sessions(added)[1]
+                if len(new):
+                    rejects = pd.concat([rejects, new.reindex(columns=rejects.columns)], ignore_index=True)
+            self._rejects = (self.data_version, rejects)
+
+    @timed("storage.load_sessions_typed")
+    def load_sessions_typed(self) -> pd.DataFrame:
+        """Sessions parsed once per data version into typed columns (see ``schema``)."""
+        return _shared(self._normalized()[1])
+
+    def session_rejects(self) -> pd.DataFrame:
+        """Stored session rows that failed to parse, with a ``reason`` column."""
+        if self._rejects_live():
+            return _shared(self._rejects[1])
+        return _shared(self._normalized()[2])
+
+    def next_session_id(self) -> int:
+        return self.backend.next_session_id()
+
+    @timed("storage.insert_session")
+    def insert_session(self, row: dict) -> dict:
+        live = self._rejects_live()
+        row = self.backend.insert_session(row)
+        self._rejects_apply(live, added=pd.DataFrame([row]))
+        return row
+
+    @timed("storage.delete_session")
+    def delete_session(self, row_id: int):
+        live = self._rejects_live()
+        self.backend.delete_session(row_id)
+        self._rejects_apply(live, deleted=int(row_id))
+
+    @timed("storage.insert_sessions")
+    def insert_sessions(self, df: pd.DataFrame) -> pd.DataFrame:
+        live = self._rejects_live()
+        rows = self.backend.insert_sessions(df)
+        self._rejects_apply(live, added=rows)
+        return rows
+
+    def iter_sessions(self, chunksize=100_000):
+        return self.backend.iter_sessions(chunksize)
+
+    @timed("storage.load_session_notes")
+    def load_session_notes(self, ids=None) -> pd.Series:
+        return self.backend.load_session_notes(ids)
+
+    @timed("storage.session_totals")
+    def session_totals(self) -> pd.DataFrame:
+        return self.backend.session_totals()
+
+    # --- Daily rollup ---
+    @timed("storage.save_daily_rollup")
+    def save_daily_rollup(self, id_sum: int, df: pd.DataFrame):
+        """Persist the per-day rollup (see ``AggregateStore.rollup_table``) with its session id sum."""
+        if self.read_only:
+            return
+        def write(f):
+            f.write(f"# session_id_sum={int(id_sum)}\n")
+            df.to_csv(f, index=False)
+        replace_file(self.paths["rollup"], write)
+
+    @timed("storage.load_daily_rollup")
+    def load_daily_rollup(self):
+        """The last saved ``(session_id_sum, rollup)``, or None if there is none or it cannot be read."""
         try:
-            return pd.read_csv(self.paths["tasks"])
-        except Exception:
-            return pd.DataFrame(columns=["id","title","subject","deadline","priority","estimated_min","status"])
+            with open(self.paths["rollup"], "r", encoding="utf-8") as f:
+                head = f.readline()
+                if not head.startswith("# session_id_sum="):
+                    return None
+                return int(head.split("=", 1)[1]), pd.read_csv(f, dtype={"date": str})
+        except (OSError, ValueError):
+            return None
+
+    # --- Tasks ---
+    @timed("storage.load_tasks")
+    def load_tasks(self) -> pd.DataFrame:
+        return self.backend.load_tasks()
 
+    @timed("storage.save_tasks")
     def save_tasks(self, df: pd.DataFrame):
-        df.to_csv(self.paths["tasks"], index=False)
+        live = self._rejects_live()
+        self.backend.save_tasks(df)
+        self._rejects_apply(live)
 
     def next_task_id(self) -> int:
-        df = self.load_tasks()
-        return (df["id"].max() if not df.empty else 0) + 1
+        return self.backend.next_task_id()
+
+    @timed("storage.insert_task")
+    def insert_task(self, row: dict) -> dict:
+        live = self._rejects_live()
+        row = self.backend.insert_task(row)
+        self._rejects_apply(live)
+        return row
+
+    @timed("storage.insert_tasks")
+    def insert_tasks(self, df: pd.DataFrame) -> pd.DataFrame:
+        live = self._rejects_live()
+        rows = self.backend.insert_tasks(df)
+        self._rejects_apply(live)
+        return rows
+
+    @timed("storage.update_task")
+    def update_task(self, row_id: int, **fields):
+        live = self._rejects_live()
+        self.backend.update_task(row_id, **fields)
+        self._rejects_apply(live)
+
+    @timed("storage.delete_task")
+    def delete_task(self, row_id: int):
+        live = self._rejects_live()
+        self.backend.delete_task(row_id)
+        self._rejects_apply(live)
 
     # --- Settings ---
+    @timed("storage.load_settings")
     def load_settings(self) -> dict:
-        import json
+        """Saved settings over :data:`DEFAULT_SETTINGS`; the defaults alone if the file is unreadable."""
         try:
             with open(self.paths["settings"], "r", encoding="utf-8") as f:
-                return json.load(f)
+                return {**DEFAULT_SETTINGS, **json.load(f)}
         except Exception:
-            return {"pomodoro_min": 25, "short_break_min": 5, "long_break_min": 15, "long_break_every": 4}
+            return dict(DEFAULT_SETTINGS)
 
+    @timed("storage.save_settings")
     def save_settings(self, data: dict):
-        import json
-        with open(self.paths["settings"], "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        if self.read_only:
+            raise PermissionError(f"{self.base_dir} is open read-only")
+        replace_file(self.paths["settings"], lambda f: json.dump(data, f, indent=2))
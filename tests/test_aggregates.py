@@ -0,0 +1,77 @@
+from aggregates import AggregateStore
+from schema import normalize_sessions
+import pandas as pd
+
+def _sessions():
+    return pd.DataFrame({
+        "id": [1, 2, 3, 4, 5],
+        "date": ["2026-01-05", "2026-01-05", "2026-01-06", "2026-01-08", "2026-01-09"],
+        "start_time": ["09:00", "23:30", "10:00", "14:15", "08:00"],
+        "end_time": ["09:25", "00:20", "10:50", "15:00", "09:30"],
+        "duration_min": [25, 50, 50, 45, 90],
+        "subject": ["Math", "Python", "Math", "Physics", "Python"],
+        "mood": [7, 5, 8, 6, 9],
+        "energy": [6, 4, 7, 5, 8],
+        "notes": [""] * 5,
+    })
+
+def _tasks():
+    return pd.DataFrame({
+        "id": [1, 2, 3],
+        "title": ["Revise", "Project", "Lab"],
+        "subject": ["Math", "Python", "Physics"],
+        "deadline": ["2026-02-01", "", "2026-01-20"],
+        "priority": ["High", "Medium", "Low"],
+        "estimated_min": [60, 120, 30],
+        "status": ["Todo", "In Progress", "Done"],
+    })
+
+def test_saved_rollup_replaces_the_daily_regroup():
+    typed, _ = normalize_sessions(_sessions())
+    saved = AggregateStore.from_frames(_tasks(), typed)
+    rollup = (saved.session_id_sum, saved.rollup_table())
+    loaded = AggregateStore.from_frames(_tasks(), typed, rollup=rollup)
+    assert loaded.rollup_table().equals(saved.rollup_table())
+    assert loaded.forecast.trend() == saved.forecast.trend()
+    assert loaded.verify(_tasks(), typed)
+
+def test_stale_rollup_is_ignored():
+    typed, _ = normalize_sessions(_sessions())
+    old = AggregateStore.from_frames(None, typed)
+    rollup = (old.session_id_sum, old.rollup_table())
+    # One session moved to another day: same ids and totals, different rollup
+    moved = _sessions()
+    moved.loc[4, "date"] = "2026-01-10"
+    typed, _ = normalize_sessions(moved)
+    agg = AggregateStore.from_frames(_tasks(), typed, rollup=rollup)
+    assert agg.verify(_tasks(), typed)
+    assert agg.rollup_table()["date"].iloc[-1] == "2026-01-10"
+
+def test_incremental_edits_match_a_rebuild():
+    sessions, tasks = _sessions(), _tasks()
+    typed, _ = normalize_sessions(sessions.iloc[:3])
+    agg = AggregateStore.from_frames(tasks, typed)
+    for row in sessions.iloc[3:].to_dict("records"):
+        agg.add_session(row)
+    agg.remove_session(2)  # from the bulk-loaded block
+    agg.remove_session(4)  # added one by one
+    agg.update_task(3, status="Todo")
+    agg.remove_task(1)
+    agg.add_task({"id": 4, "title": "Essay", "subject": "English", "deadline": "", "priority": "Low",
+                  "estimated_min": 45, "status": "In Progress"})
+
+    sessions = sessions[~sessions["id"].isin([2, 4])]
+    tasks = tasks[tasks["id"] != 1].assign(status=["In Progress", "Todo"])
+    tasks.loc[len(tasks) + 1] = [4, "Essay", "English", "", "Low", 45, "In Progress"]
+    assert agg.verify(tasks, sessions)
+    ref = AggregateStore.from_frames(tasks, sessions)
+    assert agg.forecast.trend() == ref.forecast.trend()
+    assert agg.session_id_sum == ref.session_id_sum == 9
+    assert agg.open_tasks == 3
+
+def test_verify_spots_a_missed_edit():
+    typed, _ = normalize_sessions(_sessions())
+    agg = AggregateStore.from_frames(_tasks(), typed)
+    assert agg.verify(_tasks(), typed)
+    agg.remove_session(5)
+    assert not agg.verify(_tasks(), typed)
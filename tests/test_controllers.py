@@ -0,0 +1,23 @@
+import threading
+from storage import Storage
+from controllers import AppController
+
+def test_writes_go_on_during_a_rebuild(tmp_path):
+    storage = Storage(str(tmp_path))
+    controller = AppController(storage)
+    build, written = controller._build_aggregates, []
+
+    def racing_build():
+        # A UI write lands while the aggregates are being rebuilt
+        controller._build_aggregates = build
+        writer = threading.Thread(target=lambda: written.append(controller.update_task_status(1, "Done")))
+        writer.start()
+        writer.join(timeout=5)
+        return build()
+
+    controller._build_aggregates = racing_build
+    aggs = controller.aggregates()
+    assert written == [None]
+    assert controller._aggs_live()
+    assert aggs.open_tasks == 1
+    assert aggs.verify(storage.load_tasks(), storage.load_sessions_typed())
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from forecast import TrailingForecast
+
+def _same(a: TrailingForecast, b: TrailingForecast):
+    assert a.end == b.end
+    for name in ("sy", "sy2", "sdy", "sew"):
+        assert getattr(a, name) == pytest.approx(getattr(b, name), abs=1e-6)
+    assert a.projected() == pytest.approx(b.projected(), abs=1e-6)
+
+def test_incremental_changes_match_rebuild():
+    rng = np.random.default_rng(7)
+    day_min, live = {}, TrailingForecast(window=7)
+    # Edits inside the window, slides of a few days, jumps past it and removals of the latest day
+    for day in rng.integers(19000, 19040, size=300).tolist():
+        old = day_min.get(day, 0)
+        new = 0 if old and rng.random() < 0.3 else old + int(rng.integers(10, 60))
+        if new:
+            day_min[day] = new
+        else:
+            del day_min[day]
+        live.change(day_min, day, old, new)
+        ref = TrailingForecast(window=7)
+        ref.rebuild(day_min)
+        _same(live, ref)
+
+def test_trend_matches_polyfit_over_the_window():
+    day_min = {100: 30, 101: 45, 103: 60, 104: 20, 106: 90}
+    f = TrailingForecast(window=5)
+    f.rebuild(day_min)
+    y = [day_min.get(d, 0) for d in range(102, 107)]
+    slope, intercept = np.polyfit(np.arange(5), y, 1)
+    assert f.trend() == pytest.approx((slope, intercept))
+    assert f.mean() == pytest.approx(np.mean(y))
+
+def test_empty_forecast():
+    f = TrailingForecast()
+    f.rebuild({})
+    assert f.trend() is None and f.mean() == 0.0 and f.ewma() == 0.0 and f.projected() == 0.0
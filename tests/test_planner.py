@@ -0,0 +1,42 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from planner import Planner
+from storage import DEFAULT_SETTINGS
+
+NOW = datetime(2026, 3, 2, 13, 40)
+
+def _task(row_id, rng):
+    deadline = "" if rng.random() < 0.3 else f"2026-03-{int(rng.integers(1, 29)):02d}"
+    return {"id": row_id, "title": f"Task {row_id}", "subject": str(rng.choice(["Math", "Python", "Art"])),
+            "deadline": deadline, "priority": str(rng.choice(["High", "Medium", "Low"])),
+            "estimated_min": int(rng.choice([0, 20, 25, 60, 130])),
+            "status": str(rng.choice(["Todo", "In Progress", "Done"]))}
+
+def test_incremental_planner_matches_from_frame():
+    rng = np.random.default_rng(11)
+    rows = {i: _task(i, rng) for i in range(1, 31)}
+    planner = Planner.from_frame(pd.DataFrame(list(rows.values())))
+    next_id = 31
+    for step in range(80):
+        op = rng.integers(3)
+        if op == 0:
+            rows[next_id] = _task(next_id, rng)
+            planner.add_task(rows[next_id])
+            next_id += 1
+        elif op == 1 and rows:
+            row_id = int(rng.choice(list(rows)))
+            del rows[row_id]
+            planner.remove_task(row_id)
+        elif rows:
+            row_id = int(rng.choice(list(rows)))
+            fields = {"status": str(rng.choice(["Todo", "In Progress", "Done"]))}
+            if rng.random() < 0.5:
+                fields["deadline"] = f"2026-03-{int(rng.integers(1, 29)):02d}"
+                fields["priority"] = str(rng.choice(["High", "Medium", "Low"]))
+            rows[row_id].update(fields)
+            planner.update_task(row_id, **fields)
+
+        ref = Planner.from_frame(pd.DataFrame(list(rows.values()), columns=list(_task(0, rng))))
+        assert planner._order == ref._order
+        assert planner.plan(DEFAULT_SETTINGS, None, 120, NOW).equals(ref.plan(DEFAULT_SETTINGS, None, 120, NOW))
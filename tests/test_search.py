@@ -0,0 +1,54 @@
+import re
+import numpy as np
+import pandas as pd
+import pytest
+from search import InvertedIndex, tokens
+
+def _brute(texts: pd.Series, query: str) -> list:
+    # Every query word must start a word of the text
+    hit = pd.Series(True, index=texts.index)
+    for term in tokens(query):
+        hit &= texts.str.contains(r"(?<!\w)" + re.escape(term), case=False, regex=True)
+    return sorted(texts.index[hit].tolist())
+
+QUERIES = ["", "flow", "fl", "review exam", "Exam", "tired focus", "no-such", "s", "not"]
+
+def _check(index: InvertedIndex, texts: pd.Series):
+    for query in QUERIES:
+        if not tokens(query):
+            assert index.match(query) is None
+        else:
+            assert index.search(query).tolist() == _brute(texts, query), query
+
+@pytest.mark.parametrize("merge_every", [1000, 3])
+def test_index_matches_brute_force_through_edits(merge_every, monkeypatch):
+    monkeypatch.setattr(InvertedIndex, "MERGE_EVERY", merge_every)
+    rng = np.random.default_rng(3)
+    words = ["flow", "Flashcards", "review", "exam", "tired", "focus", "notes", "not", "summary"]
+    texts = pd.Series([" ".join(rng.choice(words, 3)) + "." for _ in range(40)], index=range(1, 41))
+    texts[5], texts[6] = "", None
+    index = InvertedIndex.from_texts(texts.index.to_numpy(), texts.to_numpy())
+    texts[6] = ""
+    _check(index, texts)
+    next_id = 41
+    for step in range(60):
+        op = rng.integers(3)
+        if op == 0:
+            text = " ".join(rng.choice(words, 2)) + "!"
+            index.add(next_id, text)
+            texts[next_id] = text
+            next_id += 1
+        elif op == 1:
+            row_id = int(rng.choice(texts.index))
+            index.remove(row_id)
+            texts = texts.drop(row_id)
+        else:
+            # An edit: the row keeps its id, its text changes
+            row_id = int(rng.choice(texts.index))
+            text = "edited " + " ".join(rng.choice(words, 2))
+            index.remove(row_id)
+            index.add(row_id, text)
+            texts[row_id] = text
+        _check(index, texts)
+    # Small MERGE_EVERY: the delta and tombstones were folded into the postings on the way
+    assert len(index._delta_docs) + len(index._removed) < merge_every
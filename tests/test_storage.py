@@ -0,0 +1,91 @@
+import json
+import os
+from storage import CsvBackend
+
+def _session(date="2026-01-05"):
+    return {"date": date, "start_time": "09:00", "end_time": "09:25", "duration_min": 25,
+            "subject": "Math", "mood": 7, "energy": 6, "notes": ""}
+
+def test_append_after_torn_journal_line_is_kept(tmp_path):
+    backend = CsvBackend(str(tmp_path))
+    backend.insert_session(_session())
+    backend.close()
+    journal = os.path.join(str(tmp_path), "sessions.journal")
+    # A crash mid-append leaves a partial last line without its newline
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "row": {"id": 9')
+
+    backend = CsvBackend(str(tmp_path))
+    row = backend.insert_session(_session("2026-01-06"))
+    backend.close()
+
+    with open(journal, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert all(json.loads(line) for line in lines)
+    ids = CsvBackend(str(tmp_path)).load_sessions()["id"].tolist()
+    assert row["id"] in ids
+
+def test_journal_without_any_newline_is_emptied(tmp_path):
+    backend = CsvBackend(str(tmp_path))
+    backend.close()
+    journal = os.path.join(str(tmp_path), "tasks.journal")
+    with open(journal, "w", encoding="utf-8") as f:
+        f.write('{"op": "del"')
+
+    backend = CsvBackend(str(tmp_path))
+    backend.update_task(1, status="Done")
+    backend.close()
+
+    tasks = CsvBackend(str(tmp_path)).load_tasks()
+    assert tasks.loc[tasks["id"] == 1, "status"].tolist() == ["Done"]
+
+def test_compact_keeps_data_version(tmp_path):
+    backend = CsvBackend(str(tmp_path))
+    for day in ("2026-01-05", "2026-01-06", "2026-01-07"):
+        backend.insert_session(_session(day))
+    backend.load_sessions()
+    version = backend.data_version
+    backend.compact()
+    assert backend.data_version == version
+    assert not os.path.exists(os.path.join(str(tmp_path), "sessions.journal"))
+
+def test_compact_keeps_rows(tmp_path):
+    backend = CsvBackend(str(tmp_path))
+    for day in ("2026-01-05", "2026-01-06", "2026-01-07"):
+        backend.insert_session(_session(day))
+    backend.delete_session(1)
+    backend.update_task(2, status="Done")
+    sessions, tasks = backend.load_sessions(), backend.load_tasks()
+    version = backend.data_version
+    backend.compact()
+    assert backend.data_version == version
+    assert backend.load_sessions().equals(sessions)
+    assert backend.load_tasks().equals(tasks)
+    reopened = CsvBackend(str(tmp_path))
+    assert reopened.load_sessions()["id"].tolist() == sessions["id"].tolist()
+    assert reopened.load_tasks()["status"].tolist() == tasks["status"].tolist()
+
+class _EditDuringCompaction(CsvBackend):
+    # Runs ``edit`` between the journal freeze and the snapshot swap
+    edit = None
+
+    def _read_snapshot(self, kind, notes=True):
+        if notes and self.edit is not None:
+            edit, self.edit = self.edit, None
+            edit()
+        return super()._read_snapshot(kind, notes)
+
+def test_edits_during_compaction_are_kept(tmp_path):
+    backend = _EditDuringCompaction(str(tmp_path))
+    for day in ("2026-01-05", "2026-01-06"):
+        backend.insert_session(_session(day))
+    backend.load_sessions()
+    added = []
+    backend.edit = lambda: added.append(backend.insert_session(_session("2026-01-08")))
+    version = backend.data_version
+    backend.compact("sessions")
+    assert backend.data_version == version + 1
+    ids = backend.load_sessions()["id"].tolist()
+    assert added and added[0]["id"] in ids
+    backend.close()
+    assert CsvBackend(str(tmp_path)).load_sessions()["id"].tolist() == ids
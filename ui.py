@@ -1,31 +1,61 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-import pandas as pd
-from analytics import productivity_by_hour, subject_pareto, forecast_hours_needed, best_focus_window
-
-def _df_to_tree(tree: ttk.Treeview, df: pd.DataFrame):
+from scheduler import RefreshScheduler
+import instrument
+from instrument import timed
+import warmstart
+# pandas (and widgets/report, which need it) load on first use, so the window can paint first
+
+@timed("ui.df_to_tree")
+def _df_to_tree(tree: ttk.Treeview, df):
+    _rows_to_tree(tree, list(df.columns), df.astype(object).values.tolist())
+
+def _subjects(df) -> list:
+    s = df["subject"]
+    return list(s.cat.categories) if hasattr(s, "cat") else s.dropna().unique().tolist()
+
+def _search_scheduler(tab, compute):
+    # Searches run off the Tk thread (the first one builds the index) and land in the tab's table
+    return RefreshScheduler(
+        tab, compute, tab.table.set_frame,
+        version=lambda: tab.controller.storage.data_version,
+        on_error=lambda e: messagebox.showerror("Search", str(e)))
+
+def _rows_to_tree(tree: ttk.Treeview, columns, rows):
     tree.delete(*tree.get_children())
-    tree["columns"] = list(df.columns)
+    tree["columns"] = columns
     tree["show"] = "headings"
-    for col in df.columns:
+    for col in columns:
         tree.heading(col, text=col)
         tree.column(col, anchor="center", width=120)
-    for _, row in df.iterrows():
-        tree.insert("", "end", values=[row.get(c, "") for c in df.columns])
+    for row in rows:
+        tree.insert("", "end", values=row)
 
 class DashboardTab(ttk.Frame):
-    def __init__(self, master, controller):
+    """KPIs and the hour/subject tables.
+
+    ``controller`` may be None while the data layer is still loading; the
+    tab can already show a cached snapshot (``show_cached``) and refreshes
+    once ``attach()`` hands it the controller. Every computed state is saved
+    as the next start's cached snapshot.
+    """
+    SHOWS = ("sessions", "tasks", "settings")  # controller change kinds that make the tab stale
+
+    def __init__(self, master, controller=None):
         super().__init__(master)
         self.controller = controller
+        self._saved_version = None
 
         top = ttk.Frame(self); top.pack(fill="x", padx=12, pady=12)
         self.kpi_hours = ttk.Label(top, text="Hours Needed: --", font=("Segoe UI", 12, "bold"))
         self.kpi_best = ttk.Label(top, text="Best Focus Window: --", font=("Segoe UI", 12, "bold"))
         self.kpi_tasks = ttk.Label(top, text="Open Tasks: --", font=("Segoe UI", 12, "bold"))
+        self.kpi_pace = ttk.Label(top, text="Pace: --", font=("Segoe UI", 12, "bold"))
         self.kpi_hours.pack(side="left", padx=10)
         self.kpi_best.pack(side="left", padx=10)
         self.kpi_tasks.pack(side="left", padx=10)
+        self.kpi_pace.pack(side="left", padx=10)
 
         mid = ttk.Frame(self); mid.pack(fill="both", expand=True, padx=12, pady=6)
         # Productivity by hour table
@@ -40,27 +70,74 @@ class DashboardTab(ttk.Frame):
         self.tree_pareto = ttk.Treeview(right, height=12)
         self.tree_pareto.pack(fill="both", expand=True, padx=6, pady=6)
 
-        btn = ttk.Button(self, text="Refresh", command=self.refresh)
-        btn.pack(pady=8)
+        bottom = ttk.Frame(self); bottom.pack(pady=8)
+        ttk.Button(bottom, text="Refresh", command=self.refresh).pack(side="left")
+        self.status = ttk.Label(bottom, text="")
+        self.status.pack(side="left", padx=10)
 
-    def refresh(self):
-        tasks = self.controller.list_tasks()
-        sessions = self.controller.list_sessions()
+        self.scheduler = RefreshScheduler(
+            self, self._compute, self._apply,
+            version=lambda: self.controller.storage.data_version,
+            on_busy=lambda busy: self.status.config(text="computing…" if busy else ""),
+            on_error=lambda e: self.status.config(text=f"Error: {e}"))
 
-        prod = productivity_by_hour(sessions)
-        _df_to_tree(self.tree_prod, prod)
+    def attach(self, controller):
+        self.controller = controller
+        self.refresh()
 
-        pareto = subject_pareto(tasks, sessions)
+    @timed("ui.dashboard.refresh")
+    def refresh(self):
+        if self.controller is not None:
+            self.scheduler.request()
+
+    def show_cached(self, data: dict):
+        """Paint a snapshot saved by an earlier run (see ``warmstart``); needs no data layer."""
+        k = data["kpis"]
+        _rows_to_tree(self.tree_prod, data["productivity"]["columns"], data["productivity"]["rows"])
+        _rows_to_tree(self.tree_pareto, data["pareto"]["columns"], data["pareto"]["rows"])
+        self._set_kpis(k["hours"], k["best"], k["open_tasks"], k["pace"])
+        self.status.config(text=f"cached {data.get('saved_at', '')}, updating…")
+
+    def refresh_now(self):
+        """Synchronous refresh on the calling (Tk) thread, e.g. for profiling."""
+        self._apply(self._compute())
+
+    @timed("ui.dashboard.compute")
+    def _compute(self):
+        # Worker thread: no Tk calls here
+        snap = self.controller.snapshot()
+        result = (snap.get("productivity"), snap.get("pareto"), snap.get("forecast_hours"),
+                  snap.get("best_window"), snap.get("open_tasks"), snap.get("capacity"))
+        if snap.version != self._saved_version:
+            self._save_warm(snap.version, *result)
+        return result
+
+    def _save_warm(self, version, prod, pareto, hours, best, open_tasks, capacity):
+        try:
+            warmstart.save(self.controller.storage.base_dir, {
+                "version": str(version), "saved_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+                "kpis": {"hours": hours, "best": best, "open_tasks": open_tasks, "pace": capacity["last_7d"]},
+                "productivity": warmstart.table(prod), "pareto": warmstart.table(pareto)})
+            self._saved_version = version
+        except OSError:
+            pass  # only costs the next start its cached view
+
+    @timed("ui.dashboard.apply")
+    def _apply(self, result):
+        prod, pareto, hours, best, open_tasks, capacity = result
+        _df_to_tree(self.tree_prod, prod)
         _df_to_tree(self.tree_pareto, pareto)
+        self._set_kpis(hours, best, open_tasks, capacity["last_7d"])
 
-        hours = forecast_hours_needed(tasks, sessions)
-        best = best_focus_window(prod)
-        open_tasks = len(tasks[tasks["status"].isin(["Todo","In Progress"])])
+    def _set_kpis(self, hours, best, open_tasks, pace):
         self.kpi_hours.config(text=f"Hours Needed: {hours}")
         self.kpi_best.config(text=f"Best Focus Window: {best}")
         self.kpi_tasks.config(text=f"Open Tasks: {open_tasks}")
+        self.kpi_pace.config(text=f"Pace: {pace:.0f} min/day")
 
 class SessionsTab(ttk.Frame):
+    SHOWS = ("sessions",)
+
     def __init__(self, master, controller):
         super().__init__(master)
         self.controller = controller
@@ -86,9 +163,13 @@ class SessionsTab(ttk.Frame):
 
         table = ttk.Labelframe(self, text="Sessions")
         table.pack(fill="both", expand=True, padx=12, pady=(0,12))
-        self.tree = ttk.Treeview(table)
-        self.tree.pack(fill="both", expand=True, padx=6, pady=6)
-        self.refresh()
+        from widgets import VirtualTable, SearchBar
+        self.search = SearchBar(table, lambda *_: self.refresh(), date_label="Date")
+        self.search.pack(fill="x", padx=6, pady=(6,0))
+        # Notes stay out of the cached frame; fetch them for the rows on screen only
+        self.table = VirtualTable(table, lazy={"notes": self.controller.session_notes})
+        self.table.pack(fill="both", expand=True)
+        self.searcher = _search_scheduler(self, lambda: self.controller.search_sessions(*self._criteria))
 
     def _add(self):
         try:
@@ -101,31 +182,43 @@ class SessionsTab(ttk.Frame):
             energy = int(self.vars["energy"].get().strip() or "7")
             notes = self.vars["notes"].get().strip()
             self.controller.add_session(d, st, et, du, subj, mood, energy, notes)
-            self.event_generate("<<DataChanged>>", when="tail")
         except Exception as e:
             messagebox.showerror("Error", str(e))
-        self.refresh()
 
     def _delete(self):
         try:
-            item = self.tree.selection()[0]
-            vals = self.tree.item(item)["values"]
-            row_id = int(vals[0])
+            row = self.table.selected_row()
+            if row is None:
+                raise IndexError("Select a row to delete.")
+            row_id = int(row["id"])
             self.controller.delete_session(row_id)
-            self.event_generate("<<DataChanged>>", when="tail")
-            self.refresh()
         except IndexError:
             messagebox.showinfo("Info", "Select a row to delete.")
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    @timed("ui.sessions.on_change")
+    def on_change(self, change):
+        # Patch the table with the delta; a search result is re-run instead
+        if self.search.active() or not self.table.apply_changes(change.rows, change.deleted, change.updated, change.fields):
+            self.refresh()
+
+    @timed("ui.sessions.refresh")
     def refresh(self):
+        if self.search.active():
+            self._criteria = self.search.criteria()
+            self.searcher.request()
+            return
         df = self.controller.list_sessions()
         if df.empty:
-            df = pd.DataFrame(columns=["id","date","start_time","end_time","duration_min","subject","mood","energy","notes"])
-        _df_to_tree(self.tree, df)
+            import pandas as pd
+            df = pd.DataFrame(columns=["id","date","start_time","end_time","duration_min","subject","mood","energy"])
+        self.table.set_frame(df)
+        self.search.set_subjects(_subjects(df))
 
 class TasksTab(ttk.Frame):
+    SHOWS = ("tasks",)
+
     def __init__(self, master, controller):
         super().__init__(master)
         self.controller = controller
@@ -153,9 +246,12 @@ class TasksTab(ttk.Frame):
 
         table = ttk.Labelframe(self, text="Tasks")
         table.pack(fill="both", expand=True, padx=12, pady=(0,12))
-        self.tree = ttk.Treeview(table)
-        self.tree.pack(fill="both", expand=True, padx=6, pady=6)
-        self.refresh()
+        from widgets import VirtualTable, SearchBar
+        self.search = SearchBar(table, lambda *_: self.refresh(), date_label="Due")
+        self.search.pack(fill="x", padx=6, pady=(6,0))
+        self.table = VirtualTable(table)
+        self.table.pack(fill="both", expand=True)
+        self.searcher = _search_scheduler(self, lambda: self.controller.search_tasks(*self._criteria))
 
     def _add(self):
         try:
@@ -165,24 +261,19 @@ class TasksTab(ttk.Frame):
             vals.setdefault("priority", "Medium")
             vals.setdefault("status", "Todo")
             self.controller.add_task(**vals)
-            self.event_generate("<<DataChanged>>", when="tail")
-            self.refresh()
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
     def _selected_row_id(self):
-        item = self.tree.selection()
-        if not item:
+        row = self.table.selected_row()
+        if row is None:
             raise IndexError("Select a row first.")
-        vals = self.tree.item(item[0])["values"]
-        return int(vals[0])
+        return int(row["id"])
 
     def _update_status(self, status):
         try:
             rid = self._selected_row_id()
             self.controller.update_task_status(rid, status)
-            self.event_generate("<<DataChanged>>", when="tail")
-            self.refresh()
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -190,67 +281,139 @@ class TasksTab(ttk.Frame):
         try:
             rid = self._selected_row_id()
             self.controller.delete_task(rid)
-            self.event_generate("<<DataChanged>>", when="tail")
-            self.refresh()
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    @timed("ui.tasks.on_change")
+    def on_change(self, change):
+        # Patch the table with the delta; a search result is re-run instead
+        if self.search.active() or not self.table.apply_changes(change.rows, change.deleted, change.updated, change.fields):
+            self.refresh()
+
+    @timed("ui.tasks.refresh")
     def refresh(self):
+        if self.search.active():
+            self._criteria = self.search.criteria()
+            self.searcher.request()
+            return
         df = self.controller.list_tasks()
         if df.empty:
+            import pandas as pd
             df = pd.DataFrame(columns=["id","title","subject","deadline","priority","estimated_min","status"])
-        _df_to_tree(self.tree, df)
+        self.table.set_frame(df)
+        self.search.set_subjects(_subjects(df))
 
 class AnalyticsTab(ttk.Frame):
+    SHOWS = ("sessions", "tasks", "settings")
+
     def __init__(self, master, controller):
         super().__init__(master)
         self.controller = controller
 
         top = ttk.Frame(self); top.pack(fill="x", padx=12, pady=12)
         ttk.Button(top, text="Recompute Analytics", command=self.refresh).pack(side="left")
+        self.status = ttk.Label(top, text="")
+        self.status.pack(side="left", padx=10)
+
+        from widgets import Heatmap
+        heat_box = ttk.Labelframe(self, text="Focus by Weekday × Hour")
+        heat_box.pack(fill="x", padx=12, pady=(0,12))
+        self.heatmap = Heatmap(heat_box)
+        self.heatmap.pack(fill="x", padx=8, pady=8)
 
         self.box = ttk.Labelframe(self, text="Insights")
         self.box.pack(fill="both", expand=True, padx=12, pady=(0,12))
 
-        self.txt = tk.Text(self.box, height=18, wrap="word")
+        self.txt = tk.Text(self.box, height=14, wrap="word")
         self.txt.pack(fill="both", expand=True, padx=8, pady=8)
 
-    def refresh(self):
-        tasks = self.controller.list_tasks()
-        sessions = self.controller.list_sessions()
-        prod = productivity_by_hour(sessions)
-        pareto = subject_pareto(tasks, sessions)
-        hours = forecast_hours_needed(tasks, sessions)
-        best = best_focus_window(prod)
-
-        lines = []
-        lines.append("🔥 Key Insights")
-        lines.append("")
-        lines.append(f"• Estimated hours needed to finish remaining tasks: {hours}")
-        lines.append(f"• Best focus window (based on mood/energy): {best}")
-        lines.append("")
-        lines.append("📌 Productivity by Hour:")
-        if prod.empty:
-            lines.append("  - Not enough data yet.")
-        else:
-            for _,r in prod.iterrows():
-                lines.append(f"  - {int(r['hour']):02d}:00 → avg mood {r['avg_mood']:.1f}, energy {r['avg_energy']:.1f}, total {int(r['total_min'])} min")
-        lines.append("")
-        lines.append("📌 Subject Pareto:")
-        if pareto.empty:
-            lines.append("  - Not enough data yet.")
-        else:
-            for _,r in pareto.iterrows():
-                lines.append(f"  - {r['subject']}: {int(r['minutes_spent'])} min spent, {int(r['open_tasks'])} tasks open")
+        self.scheduler = RefreshScheduler(
+            self, self._compute, self._apply,
+            version=lambda: self.controller.storage.data_version,
+            on_busy=lambda busy: self.status.config(text="computing…" if busy else ""),
+            on_error=lambda e: self.status.config(text=f"Error: {e}"))
 
+    @timed("ui.analytics.refresh")
+    def refresh(self):
+        self.scheduler.request()
+
+    def refresh_now(self):
+        """Synchronous refresh on the calling (Tk) thread, e.g. for profiling."""
+        self._apply(self._compute())
+
+    @timed("ui.analytics.compute")
+    def _compute(self):
+        # Worker thread: build the whole report, leave only the text insert and drawing to Tk
+        snap = self.controller.snapshot()
+        prod = snap.get("productivity")
+        pareto = snap.get("pareto")
+        hours = snap.get("forecast_hours")
+        best = snap.get("best_window")
+        rejects = snap.get("rejects")
+        sample = rejects[["id","reason"]].head(10).to_dict("records")
+        from report import insight_lines
+        heat = snap.get("heatmap")
+        lines = insight_lines(prod, pareto, hours, best, len(rejects), sample,
+                              snap.get("capacity"), snap.get("task_etas"), heat, snap.get("streaks"))
+        return "\n".join(lines), heat
+
+    @timed("ui.analytics.apply")
+    def _apply(self, result):
+        text, heat = result
+        self.heatmap.set_frame(heat)
         self.txt.delete("1.0", "end")
-        self.txt.insert("1.0", "\n".join(lines))
+        self.txt.insert("1.0", text)
+
+class PlanTab(ttk.Frame):
+    """Open tasks laid out as Pomodoro blocks in the best focus hours, recomputed off the Tk thread."""
+    SHOWS = ("sessions", "tasks", "settings")  # the heatmap, the tasks and the Pomodoro lengths
+
+    def __init__(self, master, controller):
+        super().__init__(master)
+        self.controller = controller
+
+        top = ttk.Frame(self); top.pack(fill="x", padx=12, pady=12)
+        ttk.Button(top, text="Re-plan", command=self.refresh).pack(side="left")
+        self.summary = ttk.Label(top, text="")
+        self.summary.pack(side="left", padx=10)
+
+        box = ttk.Labelframe(self, text="Study Plan")
+        box.pack(fill="both", expand=True, padx=12, pady=(0,12))
+        from widgets import VirtualTable
+        self.table = VirtualTable(box)
+        self.table.pack(fill="both", expand=True)
+
+        self.scheduler = RefreshScheduler(
+            self, self._compute, self._apply,
+            version=lambda: self.controller.storage.data_version,
+            on_busy=lambda busy: self.summary.config(text="planning…") if busy else None,
+            on_error=lambda e: self.summary.config(text=f"Error: {e}"))
+
+    @timed("ui.plan.refresh")
+    def refresh(self):
+        self.scheduler.request()
+
+    @timed("ui.plan.compute")
+    def _compute(self):
+        plan = self.controller.plan()
+        if plan.empty:
+            return plan, "No open tasks to plan."
+        late = plan.loc[plan["late"], "task_id"].nunique()
+        text = (f"{plan['task_id'].nunique()} open task(s) in {len(plan)} block(s), "
+                f"{plan['date'].iloc[0]} to {plan['date'].iloc[-1]}")
+        return plan, text + (f"; {late} finish after their deadline" if late else "; every deadline is met")
+
+    def _apply(self, result):
+        plan, text = result
+        self.table.set_frame(plan)
+        self.summary.config(text=text)
 
 class SettingsTab(ttk.Frame):
     def __init__(self, master, controller):
         super().__init__(master)
         self.controller = controller
-        self.vars = {k: tk.StringVar() for k in ["pomodoro_min","short_break_min","long_break_min","long_break_every"]}
+        self.vars = {k: tk.StringVar() for k in ["pomodoro_min","short_break_min","long_break_min","long_break_every","forecast_window",
+                                                 "plan_daily_min"]}
 
         box = ttk.Labelframe(self, text="Pomodoro Settings")
         box.pack(fill="x", padx=12, pady=12)
@@ -260,18 +423,21 @@ class SettingsTab(ttk.Frame):
             ("Short Break (min)", "short_break_min"),
             ("Long Break (min)", "long_break_min"),
             ("Long Break Every (cycles)", "long_break_every"),
+            ("Forecast Window (days)", "forecast_window"),
+            ("Daily Plan (min, 0 = current pace)", "plan_daily_min"),
         ]
         for i,(lbl,key) in enumerate(grid):
             ttk.Label(box, text=lbl).grid(row=i, column=0, sticky="e", padx=6, pady=6)
             ttk.Entry(box, textvariable=self.vars[key], width=10).grid(row=i, column=1, sticky="w", padx=6, pady=6)
 
         ttk.Button(self, text="Save", command=self._save).pack(pady=8)
-        self.refresh()
 
+    @timed("ui.settings.refresh")
     def refresh(self):
+        from storage import DEFAULT_SETTINGS
         data = self.controller.get_settings()
         for k in self.vars:
-            self.vars[k].set(str(data.get(k, "")))
+            self.vars[k].set(str(data.get(k, DEFAULT_SETTINGS[k])))
 
     def _save(self):
         try:
@@ -280,3 +446,78 @@ class SettingsTab(ttk.Frame):
             messagebox.showinfo("Saved", "Settings saved.")
         except Exception as e:
             messagebox.showerror("Error", str(e))
+
+class DiagnosticsTab(ttk.Frame):
+    """Call counts and rolling latencies from ``instrument``, plus a one-shot cProfile of a refresh cycle."""
+    POLL_MS = 2000
+    COLUMNS = ["name","count","p50_ms","p95_ms","max_ms","total_ms"]
+
+    def __init__(self, master, controller, tabs=()):
+        super().__init__(master)
+        self.controller = controller
+        self.tabs = tabs
+
+        top = ttk.Frame(self); top.pack(fill="x", padx=12, pady=12)
+        self.enabled = tk.BooleanVar(value=instrument.enabled())
+        ttk.Checkbutton(top, text="Record timings", variable=self.enabled,
+                        command=lambda: instrument.enable(self.enabled.get())).pack(side="left")
+        ttk.Button(top, text="Refresh", command=self.refresh).pack(side="left", padx=4)
+        ttk.Button(top, text="Reset", command=self._reset).pack(side="left", padx=4)
+        ttk.Button(top, text="Export JSON…", command=self._export).pack(side="left", padx=4)
+        ttk.Button(top, text="Profile One Refresh…", command=self._profile).pack(side="left", padx=4)
+
+        table = ttk.Labelframe(self, text="Hot Paths (latencies over the last calls)")
+        table.pack(fill="both", expand=True, padx=12, pady=(0,6))
+        from widgets import VirtualTable
+        self.table = VirtualTable(table, key="name", height=14)
+        self.table.pack(fill="both", expand=True)
+
+        prof = ttk.Labelframe(self, text="Profile")
+        prof.pack(fill="both", expand=True, padx=12, pady=(0,12))
+        self.txt = tk.Text(prof, height=10, wrap="none", font=("Courier", 9))
+        self.txt.pack(fill="both", expand=True, padx=8, pady=8)
+
+        self.refresh()
+        self.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        if self.winfo_ismapped():
+            self.refresh()
+        self.after(self.POLL_MS, self._poll)
+
+    def refresh(self):
+        import pandas as pd
+        rows = [dict(name=name, **{k: round(v, 3) for k, v in s.items()}) for name, s in instrument.summary().items()]
+        self.table.set_frame(pd.DataFrame(rows, columns=self.COLUMNS))
+
+    def _reset(self):
+        instrument.reset()
+        self.refresh()
+
+    def _export(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")],
+                                            initialfile="diagnostics.json")
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(instrument.to_json({"data_version": self.controller.storage.data_version}))
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    def _profile(self):
+        path = filedialog.asksaveasfilename(defaultextension=".prof", filetypes=[("cProfile stats", "*.prof")],
+                                            initialfile="refresh.prof")
+        if not path:
+            return
+        def cycle():
+            for tab in (self.tabs() if callable(self.tabs) else self.tabs):
+                getattr(tab, "refresh_now", tab.refresh)()
+        try:
+            text = instrument.profile(cycle, path)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.txt.delete("1.0", "end")
+        self.txt.insert("1.0", text)
+        self.refresh()
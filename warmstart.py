@@ -0,0 +1,26 @@
+import json
+import os
+
+FILENAME = "warm_start.json"
+
+def path(base_dir) -> str:
+    return os.path.join(base_dir, FILENAME)
+
+def load(base_dir):
+    """The last saved dashboard snapshot, or None if there is none or it cannot be read."""
+    try:
+        with open(path(base_dir), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save(base_dir, data: dict):
+    """Write the snapshot through a synced temp file, so a crash never leaves a half-written one."""
+    # Imported here: loading a snapshot must not pull in the data layer
+    from storage import replace_file
+    replace_file(path(base_dir), lambda f: json.dump(
+        data, f, ensure_ascii=False, default=lambda o: o.item() if hasattr(o, "item") else str(o)))
+
+def table(df) -> dict:
+    """A DataFrame as plain ``{"columns", "rows"}`` lists."""
+    return {"columns": [str(c) for c in df.columns], "rows": df.astype(object).values.tolist()}
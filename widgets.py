@@ -0,0 +1,338 @@
+import tkinter as tk
+from tkinter import ttk
+import numpy as np
+import pandas as pd
+from schema import category_mask, concat_compact, set_value
+from patterns import WEEKDAYS
+
+class VirtualTable(ttk.Frame):
+    """Treeview that only materializes the rows in view.
+
+    The backing DataFrame is never copied into the widget: a fixed pool of
+    ``visible + buffer`` items is reused and refilled from the frame as the
+    user scrolls. Sorting (click a heading) and filtering work on an index
+    array over the frame, so redraw cost depends on the viewport, not on the
+    number of rows.
+
+    ``lazy`` maps extra column names to ``fetch(keys) -> values``; those
+    columns are not in the frame and are fetched for the visible rows only.
+    """
+    def __init__(self, master, key="id", buffer=10, filter_bar=True, lazy=None, **tree_kw):
+        super().__init__(master)
+        self._init_state(key, buffer, int(tree_kw.pop("height", 20)), lazy)
+
+        if filter_bar:
+            bar = ttk.Frame(self); bar.pack(fill="x", padx=6, pady=(6,0))
+            ttk.Label(bar, text="Filter").pack(side="left")
+            self.filter_col = tk.StringVar(value="(all)")
+            self.filter_text = tk.StringVar()
+            self._col_box = ttk.Combobox(bar, textvariable=self.filter_col, width=14, state="readonly", values=["(all)"])
+            self._col_box.pack(side="left", padx=4)
+            entry = ttk.Entry(bar, textvariable=self.filter_text, width=28)
+            entry.pack(side="left", padx=4)
+            self.count_label = ttk.Label(bar, text="")
+            self.count_label.pack(side="right")
+            self.filter_text.trace_add("write", lambda *_: self._apply_filter_vars())
+            self._col_box.bind("<<ComboboxSelected>>", lambda _e: self._apply_filter_vars())
+        else:
+            self.count_label = None
+
+        body = ttk.Frame(self); body.pack(fill="both", expand=True, padx=6, pady=6)
+        self.tree = ttk.Treeview(body, show="headings", height=self._visible, **tree_kw)
+        self.vsb = ttk.Scrollbar(body, orient="vertical", command=self._on_scrollbar)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.vsb.pack(side="right", fill="y")
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda _e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda _e: self.scroll(3))
+        self.tree.bind("<ButtonRelease-1>", self._remember_selection, add="+")
+        self.tree.bind("<KeyRelease-Up>", self._remember_selection, add="+")
+        self.tree.bind("<KeyRelease-Down>", self._remember_selection, add="+")
+
+    def _init_state(self, key, buffer, visible, lazy=None):
+        # Kept apart from widget construction so benchmarks can drive a mocked tree
+        self.key = key
+        self.buffer = buffer
+        self.lazy = dict(lazy or {})
+        self._df = pd.DataFrame()
+        self._order = np.arange(0)
+        self._top = 0
+        self._visible = visible
+        self._items = []
+        self._sort = (None, True)
+        self._filter = ("", None)
+        self._selected = None
+
+    # --- Data ---
+    def set_frame(self, df: pd.DataFrame):
+        """Point the table at a new backing frame, keeping sort, filter, selection and scroll offset."""
+        cols_changed = list(df.columns) != list(self._df.columns)
+        self._df = df.reset_index(drop=True)
+        if cols_changed:
+            self.tree["columns"] = list(df.columns) + list(self.lazy)
+            for col in list(df.columns) + list(self.lazy):
+                self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+                self.tree.column(col, anchor="center", width=120)
+            if self.count_label is not None:
+                self._col_box["values"] = ["(all)"] + list(df.columns)
+            self._sort = (None, True)
+        self._reindex()
+
+    def apply_changes(self, added=None, deleted=(), updated=(), fields=None) -> bool:
+        """Apply a row delta keyed by ``key`` instead of swapping the whole frame.
+
+        ``added`` is a frame of new rows, ``deleted`` and ``updated`` are keys
+        and ``fields`` the values set on every updated row. New rows go at the
+        end of the current order; sort, filter, selection and scroll offset
+        are kept. An edit to the sort column or a filtered column re-sorts.
+        Returns False if the table has no frame yet (use ``set_frame``).
+        """
+        df, order = self._df, self._order
+        if self.key not in df.columns:
+            return False
+        fields = {c: v for c, v in (fields or {}).items() if c in df.columns}
+        keys = df[self.key].to_numpy()
+        if len(deleted):
+            keep = ~np.isin(keys, np.asarray(deleted, dtype=np.int64))
+            if not keep.all():
+                kept = keep[order]
+                self._top -= int(np.count_nonzero(~kept[:self._top]))
+                order = (np.cumsum(keep) - 1)[order[kept]]
+                df, keys = df[keep].reset_index(drop=True), keys[keep]
+                if self._selected in set(int(d) for d in deleted):
+                    self._selected = None
+        touched = set()
+        if len(updated) and fields:
+            hit = np.isin(keys, np.asarray(updated, dtype=np.int64))
+            if hit.any():
+                df = df.copy(deep=False)
+                for col, value in fields.items():
+                    set_value(df, hit, col, value)
+                touched = set(fields)
+        if added is not None and len(added):
+            new_keys = added[self.key].to_numpy()
+            # Fresh ids are above every shown one; only check the rest (rows a reload already picked up)
+            fresh = new_keys > keys.max() if len(keys) else np.ones(len(new_keys), dtype=bool)
+            if not fresh.all():
+                fresh[~fresh] = ~np.isin(new_keys[~fresh], keys)
+            new = added[fresh]
+            n = len(df)
+            df = concat_compact(df, new)
+            order = np.append(order, n + np.flatnonzero(self._filter_mask(df.iloc[n:])))
+            if self._sort[0] is not None:
+                touched.add(self._sort[0])
+        self._df, self._order = df, order
+        text, col = self._filter
+        filtered = set(df.columns) if col not in df.columns else {col}
+        if self._sort[0] in touched or (text and touched & filtered):
+            self._reindex()
+            return True
+        self._show_count()
+        self._render()
+        return True
+
+    def _filter_mask(self, df):
+        text, col = self._filter
+        if not text or not len(df):
+            return np.ones(len(df), dtype=bool)
+        cols = [col] if col in df.columns else list(df.columns)
+        mask = np.zeros(len(df), dtype=bool)
+        match = lambda s: s.astype(str).str.contains(text, case=False, regex=False, na=False).to_numpy()
+        for c in cols:
+            # Categorical columns are matched once per distinct value
+            mask |= category_mask(df[c], match) if isinstance(df[c].dtype, pd.CategoricalDtype) else match(df[c])
+        return mask
+
+    def _reindex(self):
+        df = self._df
+        order = np.flatnonzero(self._filter_mask(df))
+        col, asc = self._sort
+        if col in df.columns and len(order):
+            ranked = df[col].iloc[order].sort_values(ascending=asc, kind="stable", na_position="last")
+            order = ranked.index.to_numpy()
+        self._order = order
+        self._top = min(self._top, max(0, len(order) - self._visible))
+        self._show_count()
+        self._render()
+
+    def _show_count(self):
+        if self.count_label is not None:
+            self.count_label.config(text=f"{len(self._order)} of {len(self._df)} rows")
+
+    def sort_by(self, col):
+        cur, asc = self._sort
+        self._sort = (col, not asc if cur == col else True)
+        arrow = " ▲" if self._sort[1] else " ▼"
+        for c in self._df.columns:
+            self.tree.heading(c, text=c + (arrow if c == col else ""))
+        self._reindex()
+
+    def set_filter(self, text: str, column=None):
+        self._filter = (text or "", column)
+        self._top = 0
+        self._reindex()
+
+    def _apply_filter_vars(self):
+        col = self.filter_col.get()
+        self.set_filter(self.filter_text.get().strip(), None if col == "(all)" else col)
+
+    # --- Viewport ---
+    def _on_resize(self, event):
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible = max(1, (event.height - 24) // rowheight)
+        if visible != self._visible:
+            self._visible = visible
+            self._render()
+
+    def _on_scrollbar(self, *args):
+        n = len(self._order)
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * n)
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self._visible if args[2] == "pages" else 1)
+            self._top += step
+        self._render()
+
+    def scroll(self, rows: int):
+        self._top += rows
+        self._render()
+        return "break"
+
+    def _render(self):
+        n = len(self._order)
+        self._top = max(0, min(self._top, max(0, n - self._visible)))
+        want = min(n - self._top, self._visible + self.buffer)
+        # Grow or shrink the item pool to the viewport, then refill it in place
+        while len(self._items) < want:
+            self._items.append(self.tree.insert("", "end"))
+        while len(self._items) > want:
+            self.tree.delete(self._items.pop())
+        pos = self._order[self._top:self._top + want]
+        window = self._df.iloc[pos]
+        rows = window.astype(object).where(window.notna(), "").values.tolist()
+        if self.lazy and len(rows) and self.key in window.columns:
+            keys = window[self.key].tolist()
+            extra = [list(fetch(keys)) for fetch in self.lazy.values()]
+            rows = [row + [col[i] for col in extra] for i, row in enumerate(rows)]
+        for iid, values in zip(self._items, rows):
+            self.tree.item(iid, values=values)
+        self._restore_selection(window)
+        if n:
+            self.vsb.set(self._top / n, min(1.0, (self._top + self._visible) / n))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    # --- Selection ---
+    def _remember_selection(self, _evt=None):
+        row = self._row_for(self.tree.selection())
+        self._selected = None if row is None else row.get(self.key)
+
+    def _restore_selection(self, window):
+        if self._selected is None or self.key not in window.columns:
+            self.tree.selection_set(())
+            return
+        hits = np.flatnonzero(window[self.key].to_numpy() == self._selected)
+        self.tree.selection_set([self._items[hits[0]]] if len(hits) else ())
+
+    def _row_for(self, items):
+        if not items or items[0] not in self._items:
+            return None
+        i = self._top + self._items.index(items[0])
+        if i >= len(self._order):
+            return None
+        return self._df.iloc[self._order[i]].to_dict()
+
+    def selected_row(self):
+        """The backing-frame row of the current selection as a dict, or None."""
+        return self._row_for(self.tree.selection())
+
+class SearchBar(ttk.Frame):
+    """Search text, subject and a from/to date range above a table.
+
+    Calls ``on_change(query, subject, start, end)`` on every edit, with
+    empty fields as ``""``; debouncing is up to the caller.
+    """
+    def __init__(self, master, on_change, date_label="Date"):
+        super().__init__(master)
+        self.on_change = on_change
+        self.vars = {k: tk.StringVar() for k in ("query", "subject", "start", "end")}
+        fields = (("Search", "query", 28), ("Subject", "subject", 14),
+                  (f"{date_label} from", "start", 11), ("to", "end", 11))
+        for label, key, width in fields:
+            ttk.Label(self, text=label).pack(side="left", padx=(6, 2))
+            if key == "subject":
+                self._subjects = ttk.Combobox(self, textvariable=self.vars[key], width=width, values=[""])
+                self._subjects.pack(side="left")
+                self._subjects.bind("<<ComboboxSelected>>", lambda _e: self._changed())
+            else:
+                ttk.Entry(self, textvariable=self.vars[key], width=width).pack(side="left")
+        ttk.Button(self, text="Clear", command=self.clear).pack(side="left", padx=6)
+        for var in self.vars.values():
+            var.trace_add("write", lambda *_: self._changed())
+
+    def criteria(self) -> tuple:
+        return tuple(self.vars[k].get().strip() for k in ("query", "subject", "start", "end"))
+
+    def active(self) -> bool:
+        return any(self.criteria())
+
+    def set_subjects(self, names):
+        self._subjects["values"] = [""] + sorted(str(n) for n in names)
+
+    def clear(self):
+        for var in self.vars.values():
+            var.set("")
+
+    def _changed(self):
+        self.on_change(*self.criteria())
+
+class Heatmap(ttk.Frame):
+    """Weekday × hour grid coloured by one metric of ``analytics.focus_heatmap``.
+
+    ``set_frame(df)`` takes the 168-row heatmap frame; the metric picker
+    redraws from it without recomputing. Unstudied cells are grey.
+    """
+    METRICS = {"Minutes": "minutes", "Mood": "avg_mood", "Energy": "avg_energy", "Sessions": "sessions"}
+    CELL_W, CELL_H, LEFT, TOP = 24, 18, 40, 18
+
+    def __init__(self, master):
+        super().__init__(master)
+        bar = ttk.Frame(self); bar.pack(fill="x")
+        ttk.Label(bar, text="Colour by").pack(side="left", padx=(0, 4))
+        self.metric = tk.StringVar(value="Minutes")
+        box = ttk.Combobox(bar, textvariable=self.metric, width=10, state="readonly", values=list(self.METRICS))
+        box.pack(side="left")
+        box.bind("<<ComboboxSelected>>", lambda _e: self.redraw())
+        self.canvas = tk.Canvas(self, width=self.LEFT + 24 * self.CELL_W + 2, height=self.TOP + 7 * self.CELL_H + 2,
+                                highlightthickness=0, background="white")
+        self.canvas.pack(anchor="w", pady=(4, 0))
+        self._df = None
+
+    def set_frame(self, df):
+        self._df = df
+        self.redraw()
+
+    def redraw(self):
+        c = self.canvas
+        c.delete("all")
+        for h in range(0, 24, 3):
+            c.create_text(self.LEFT + h * self.CELL_W + 2, self.TOP // 2, text=f"{h:02d}", anchor="w", font=("TkDefaultFont", 8))
+        for d, name in enumerate(WEEKDAYS):
+            c.create_text(self.LEFT - 6, self.TOP + d * self.CELL_H + self.CELL_H // 2, text=name, anchor="e")
+        if self._df is None or len(self._df) != 7 * 24:
+            return
+        values = pd.to_numeric(self._df[self.METRICS[self.metric.get()]], errors="coerce").to_numpy(dtype=float)
+        studied = self._df["minutes"].to_numpy() > 0
+        known = values[studied & ~np.isnan(values)]
+        lo, hi = (known.min(), known.max()) if len(known) else (0.0, 0.0)
+        for i, v in enumerate(values.tolist()):
+            d, h = divmod(i, 24)
+            if not studied[i] or v != v:
+                fill = "#eeeeee"
+            else:
+                t = (v - lo) / (hi - lo) if hi > lo else 1.0
+                fill = "#%02x%02x%02x" % (int(235 - 200 * t), int(245 - 140 * t), int(255 - 80 * t))
+            x, y = self.LEFT + h * self.CELL_W, self.TOP + d * self.CELL_H
+            c.create_rectangle(x, y, x + self.CELL_W - 1, y + self.CELL_H - 1, fill=fill, outline="")